@@ -0,0 +1,147 @@
+# agents/pipeline.py
+"""文档处理流水线 - 后台任务按 OCR → 分类 → 提取 → 持久化 分阶段并发执行
+
+调用 OCRWorkflow 的分阶段接口，处理结果与 process() / process_with_template() 一致；
+区别在于各阶段独立排队、独立并发：一个文档等待 LLM 时，OCR worker 已在处理下一个文档。
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from loguru import logger
+
+from config.settings import settings
+from services.stage_pipeline import PipelineStage, StagePipeline
+from services.template_service import template_service
+
+
+# 持久化回调: (document_id, result, template_id, tenant_id, **persist_options)
+PersistCallback = Callable[..., Awaitable[None]]
+
+
+class DocumentPipeline:
+    """文档处理流水线
+
+    Args:
+        workflow: OCRWorkflow 实例
+        persist: 保存处理结果（成功或失败）的回调
+    """
+
+    def __init__(self, workflow: Any, persist: PersistCallback):
+        self.workflow = workflow
+        self.persist = persist
+        queue_size = settings.PIPELINE_QUEUE_SIZE
+        self.pipeline = StagePipeline("document", [
+            PipelineStage("ocr", self._ocr_stage, settings.PIPELINE_OCR_WORKERS, queue_size),
+            PipelineStage("classify", self._classify_stage, settings.PIPELINE_CLASSIFY_WORKERS, queue_size),
+            PipelineStage("extract", self._extract_stage, settings.PIPELINE_EXTRACT_WORKERS, queue_size),
+            PipelineStage("persist", self._persist_stage, settings.PIPELINE_PERSIST_WORKERS, queue_size,
+                          run_on_error=True),
+        ])
+
+    def start(self) -> None:
+        self.pipeline.start()
+
+    async def stop(self) -> None:
+        await self.pipeline.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pipeline.stats()
+
+    async def submit(
+        self,
+        document_id: str,
+        file_path: str,
+        tenant_id: Optional[str] = None,
+        template_id: Optional[str] = None,
+        ocr_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        refresh_llm: bool = False,
+        **persist_options: Any
+    ) -> Dict[str, Any]:
+        """提交文档并等待处理和持久化完成
+
+        Args:
+            document_id: 文档ID
+            file_path: 文件路径
+            tenant_id: 租户ID
+            template_id: 模板ID（可选，有则使用模板化处理，否则自动分类）
+            ocr_text: 已保存的完整OCR文本（可选，提供时跳过OCR）
+            ocr_confidence: 已保存的OCR置信度（可选）
+            refresh_llm: 重新处理文档时跳过 LLM 响应缓存
+            persist_options: 透传给持久化回调的参数
+
+        Returns:
+            处理结果（与 OCRWorkflow.process / process_with_template 的返回格式一致）
+        """
+        job = await self.pipeline.submit({
+            "document_id": document_id,
+            "file_path": file_path,
+            "tenant_id": tenant_id,
+            "template_id": template_id,
+            "ocr_text": ocr_text,
+            "ocr_confidence": ocr_confidence,
+            "refresh_llm": refresh_llm,
+            "processing_start": datetime.now(),
+            "persist_options": persist_options,
+            "error": None,
+        })
+        return job.get("result") or self._failure_result(job)
+
+    def _failure_result(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "document_id": job["document_id"],
+            "error": job.get("error") or "处理失败",
+            "processing_time": (datetime.now() - job["processing_start"]).total_seconds()
+        }
+
+    async def _ocr_stage(self, job: Dict[str, Any]) -> None:
+        """OCR（模板化处理先加载模板；已有OCR文本时只解码条码、还原分页）"""
+        if job["template_id"]:
+            template = await template_service.get_template_with_details(job["template_id"])
+            if not template:
+                job["error"] = f"模板不存在: {job['template_id']}"
+                return
+            logger.info(f"使用模板 [{template['name']}] 处理文档")
+            job["template"] = template
+            job["ocr"] = await self.workflow.template_ocr_stage(
+                job["document_id"], job["file_path"], template, job["tenant_id"],
+                job["ocr_text"], job["ocr_confidence"]
+            )
+            return
+
+        state = await self.workflow.prepare_state(
+            job["document_id"], job["file_path"], job["tenant_id"], job["ocr_text"], job["ocr_confidence"],
+            refresh_llm=job["refresh_llm"], processing_start=job["processing_start"]
+        )
+        job["state"] = state
+        await self.workflow.ocr_stage(state)
+        job["error"] = state.get("error")
+
+    async def _classify_stage(self, job: Dict[str, Any]) -> None:
+        """文档分类（仅自动分类的 two_step 模式，其余模式在提取阶段完成）"""
+        state = job.get("state")
+        if state is None:
+            return
+        await self.workflow.classify_stage(state)
+        job["error"] = state.get("error")
+
+    async def _extract_stage(self, job: Dict[str, Any]) -> None:
+        """字段提取（single_call 模式在此一次完成分类和提取）"""
+        if "template" in job:
+            job["result"] = await self.workflow.template_extract_stage(
+                job["document_id"], job["template"], job["ocr"], job["processing_start"], job["refresh_llm"]
+            )
+            return
+
+        state = job["state"]
+        job["result"] = await self.workflow.extract_stage(state, reuse_ocr=bool(job["ocr_text"]))
+        job["error"] = state.get("error")
+
+    async def _persist_stage(self, job: Dict[str, Any]) -> None:
+        """保存处理结果（失败的任务也进入本阶段，记录失败状态）"""
+        result = job.get("result") or self._failure_result(job)
+        job["result"] = result
+        await self.persist(
+            job["document_id"], result, job["template_id"], job["tenant_id"], **job["persist_options"]
+        )
@@ -19,7 +19,12 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 from config.settings import settings
 from config.prompts import DOC_CLASSIFY_PROMPT
 from services.ocr_service import ocr_service
+from services.ocr_artifact import ocr_scope
+from services.llm_cache import llm_cache, prompt_key
 from services.template_service import template_service
+from services.tenant_service import tenant_service
+from services.text_compactor import compact_ocr_text, page_lines
+from services.doc_classifier import doc_classifier
 
 
 # LLM 可重试的异常类型
@@ -54,6 +59,12 @@ class WorkflowState(TypedDict):
     error: Optional[str]
     processing_start: Optional[datetime]
     tenant_id: Optional[str]  # 租户ID，用于查询模板配置
+    barcodes: list  # 条码/二维码解码结果
+    ocr_pages: list  # 按页拆分的 OCR 文本行，用于识别跨页重复的页眉页脚
+    text_compaction: Optional[dict]  # 送入 LLM 前的文本压缩统计
+    workflow_mode: str  # two_step / single_call
+    classify_source: Optional[str]  # 分类来源：local（本地分类器）/ llm / keyword
+    refresh_llm: bool  # 重新处理：不读取 LLM 响应缓存，重新调用并覆盖缓存
 
 
 class OCRWorkflow:
@@ -64,10 +75,17 @@ class OCRWorkflow:
             model=settings.LLM_MODEL_ID,
             api_key=settings.LLM_API_KEY,
             base_url=settings.LLM_BASE_URL,
-            temperature=settings.LLM_TEMPERATURE,
+            temperature=settings.llm_temperature,
         )
+        # 采样调用（temperature > 0）每次结果不同，不缓存
+        self.llm_cache = llm_cache if settings.llm_temperature == 0 else None
+        if llm_cache is not None and self.llm_cache is None:
+            logger.info("LLM_TEMPERATURE > 0，LLM响应缓存不生效（可设置 LLM_TEMPERATURE=0 或开启 LLM_DETERMINISTIC）")
         self.memory = MemorySaver()
         self.workflow = self._build_workflow()
+        self.text_workflow = self._build_text_workflow()
+        self.single_call_workflow = self._build_single_call_workflow(with_ocr=True)
+        self.single_call_text_workflow = self._build_single_call_workflow(with_ocr=False)
     
     def _build_workflow(self) -> StateGraph:
         workflow = StateGraph(WorkflowState)
@@ -85,6 +103,45 @@ class OCRWorkflow:
         
         return workflow.compile(checkpointer=self.memory)
     
+    def _build_text_workflow(self) -> StateGraph:
+        """构建跳过OCR的工作流（已有OCR文本时从分类节点开始）"""
+        workflow = StateGraph(WorkflowState)
+        workflow.add_node("doc_classify", self._classify_node)
+        workflow.add_node("extract", self._extract_node)
+        workflow.add_edge(START, "doc_classify")
+        workflow.add_edge("doc_classify", "extract")
+        workflow.add_edge("extract", END)
+        
+        return workflow.compile(checkpointer=self.memory)
+    
+    def _build_single_call_workflow(self, with_ocr: bool) -> StateGraph:
+        """构建单次 LLM 调用完成分类和提取的工作流（租户 workflow_mode=single_call）
+        
+        Args:
+            with_ocr: 是否包含 OCR 节点（已有OCR文本时不包含）
+        """
+        workflow = StateGraph(WorkflowState)
+        workflow.add_node("classify_extract", self._classify_extract_node)
+        if with_ocr:
+            workflow.add_node("ocr_extract", self._ocr_node)
+            workflow.add_edge(START, "ocr_extract")
+            workflow.add_edge("ocr_extract", "classify_extract")
+        else:
+            workflow.add_edge(START, "classify_extract")
+        workflow.add_edge("classify_extract", END)
+        
+        return workflow.compile(checkpointer=self.memory)
+    
+    def _select_workflow(self, workflow_mode: str, reuse_ocr: bool) -> tuple:
+        """按工作流模式选择图，返回 (图, checkpoint 线程后缀)"""
+        if workflow_mode == "single_call":
+            if reuse_ocr:
+                return self.single_call_text_workflow, "-single-text"
+            return self.single_call_workflow, "-single"
+        if reuse_ocr:
+            return self.text_workflow, "-text"
+        return self.workflow, ""
+    
     def _make_error_response(
         self, 
         error_type: WorkflowErrorType, 
@@ -108,17 +165,14 @@ class OCRWorkflow:
             "messages": [AIMessage(content=f"[{error_type.value}] {message}")]
         }
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(LLM_RETRYABLE_EXCEPTIONS),
-        reraise=True
-    )
-    async def _llm_invoke_with_retry(self, prompt: str) -> str:
-        """带重试的 LLM 调用
+    async def _llm_invoke_with_retry(self, prompt: str, refresh: bool = False) -> str:
+        """带重试的 LLM 调用（temperature=0 时先查响应缓存）
+        
+        只缓存能解析为 JSON 对象的响应，格式错误的输出不会在重新处理时被原样返回。
         
         Args:
             prompt: 提示词
+            refresh: 跳过缓存读取（重新处理文档时），新响应仍写入缓存
             
         Returns:
             LLM 响应内容
@@ -126,6 +180,31 @@ class OCRWorkflow:
         Raises:
             Exception: 重试耗尽后抛出最后一次异常
         """
+        if self.llm_cache is None:
+            return await self._llm_invoke(prompt)
+        
+        key = prompt_key(settings.LLM_MODEL_ID, settings.LLM_BASE_URL, settings.llm_temperature, prompt)
+        if not refresh:
+            cached = await asyncio.to_thread(self.llm_cache.get, key)
+            if cached is not None:
+                logger.debug(f"LLM响应缓存命中: {key[:12]}")
+                return cached
+        
+        content = await self._llm_invoke(prompt)
+        if self._is_json_response(content):
+            await asyncio.to_thread(self.llm_cache.put, key, settings.LLM_MODEL_ID, content)
+        else:
+            logger.warning(f"LLM响应不是合法JSON，不写入缓存: {key[:12]}")
+        return content
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type(LLM_RETRYABLE_EXCEPTIONS),
+        reraise=True
+    )
+    async def _llm_invoke(self, prompt: str) -> str:
+        """调用远程 LLM（网络异常时指数退避重试）"""
         response = await self.llm.ainvoke(prompt)
         return response.content
     
@@ -141,13 +220,21 @@ class OCRWorkflow:
             
             logger.info(f"开始OCR处理: {file_path}")
             
-            result = await ocr_service.process_document(file_path)
+            result = await ocr_service.process_document(
+                file_path,
+                ocr_profile=await self._resolve_ocr_profile(state.get("tenant_id"))
+            )
             
             logger.info(f"OCR完成，提取{result['total_lines']}行，置信度{result['confidence']:.2f}")
             
+            # 持久化 OCR 产物（含行坐标），供审核页面和重新提取复用
+            await ocr_service.save_artifact(state.get("document_id", ""), result)
+            
             return {
                 "ocr_text": result["text"],
                 "ocr_confidence": result["confidence"],
+                "barcodes": result.get("barcodes", []),
+                "ocr_pages": page_lines(result),
                 "step": "ocr_completed",
                 "messages": [AIMessage(content=f"OCR提取完成，共{result['total_lines']}行文本")]
             }
@@ -172,22 +259,44 @@ class OCRWorkflow:
             
             logger.info("开始文档分类...")
             
-            # 使用分类Prompt - 与MVP保持一致
-            prompt = DOC_CLASSIFY_PROMPT.format(ocr_result=ocr_text[:2000])
-            response_content = await self._llm_invoke_with_retry(prompt)
+            compact_text, _ = self._compact_text(ocr_text, state.get("ocr_pages"))
+            
+            # 本地分类器置信度足够时不调用 LLM
+            tenant_id = state.get("tenant_id")
+            if settings.DOC_CLASSIFIER_ENABLED and tenant_id:
+                # 只接受训练时租户自动分类候选模板中的类型，其余交给 LLM
+                prediction = await doc_classifier.predict(tenant_id, compact_text)
+                if prediction is not None:
+                    doc_type = prediction["document_type"]
+                    logger.info(
+                        f"文档分类结果（本地分类器）: {doc_type}，置信度{prediction['confidence']:.2f}"
+                    )
+                    return {
+                        "document_type": doc_type,
+                        "classify_source": "local",
+                        "step": "classified",
+                        "messages": [AIMessage(content=f"文档分类完成: {doc_type}")]
+                    }
+            
+            # 使用分类Prompt - 与MVP保持一致（先压缩，截取的前 2000 字符包含更多正文）
+            prompt = DOC_CLASSIFY_PROMPT.format(ocr_result=compact_text[:2000])
+            response_content = await self._llm_invoke_with_retry(prompt, refresh=state.get("refresh_llm", False))
             
             # 解析响应 - 与MVP逻辑一致
+            classify_source = "llm"
             try:
                 data = json.loads(response_content)
                 doc_type = data.get("文档类型", "未知")
             except json.JSONDecodeError:
                 # 回退：关键词匹配
                 doc_type = self._fallback_classify(ocr_text)
+                classify_source = "keyword"
             
             logger.info(f"文档分类结果: {doc_type}")
             
             return {
                 "document_type": doc_type,
+                "classify_source": classify_source,
                 "step": "classified",
                 "messages": [AIMessage(content=f"文档分类完成: {doc_type}")]
             }
@@ -230,34 +339,201 @@ class OCRWorkflow:
                     f"未找到文档类型 [{doc_type}] 的模板配置"
                 )
             
-            # 构建 prompt 并提取
-            prompt = template_service.build_extraction_prompt(template, ocr_text)
-            logger.info(f"使用数据库模板 [{template.get('name')}] 构建 prompt")
+            # 构建 prompt 并提取（条码字段直接填充）
+            compact_text, compaction = self._compact_text(ocr_text, state.get("ocr_pages"), template)
+            extraction_data = await self._extract_with_barcodes(
+                template, compact_text, state.get("barcodes") or [], refresh=state.get("refresh_llm", False)
+            )
+            logger.info(f"使用数据库模板 [{template.get('name')}] 提取")
+            
+            logger.info(f"字段提取完成: {len(extraction_data)}个字段")
+            
+            return {
+                "extraction_data": extraction_data,
+                "text_compaction": compaction,
+                "step": "completed",
+                "messages": [AIMessage(content=f"字段提取完成: {json.dumps(extraction_data, ensure_ascii=False)[:200]}...")]
+            }
+            
+        except Exception as e:
+            logger.error(f"提取失败: {e}")
+            return self._make_error_response(
+                WorkflowErrorType.EXTRACT_FAILED,
+                str(e)
+            )
+    
+    async def _classify_extract_node(self, state: WorkflowState) -> Dict[str, Any]:
+        """分类+提取节点 - 一次 LLM 调用，Prompt 包含租户全部候选模板的字段表"""
+        try:
+            ocr_text = state.get("ocr_text", "")
+            tenant_id = state.get("tenant_id")
+            
+            if not ocr_text:
+                return self._make_error_response(
+                    WorkflowErrorType.VALIDATION_ERROR,
+                    "OCR文本为空，无法分类"
+                )
+            if not tenant_id:
+                logger.error(f"分类提取失败: 文档 {state.get('document_id')} 缺少租户ID，请确保用户已选择所属部门")
+                return self._make_error_response(
+                    WorkflowErrorType.VALIDATION_ERROR,
+                    "缺少租户ID，用户未选择所属部门"
+                )
+            
+            templates = await template_service.get_candidate_templates(tenant_id)
+            if not templates:
+                return self._make_error_response(
+                    WorkflowErrorType.TEMPLATE_NOT_FOUND,
+                    "租户没有可用于自动分类的模板"
+                )
+            
+            logger.info(f"开始分类+提取（单次调用），候选模板 {len(templates)} 个")
             
-            response_content = await self._llm_invoke_with_retry(prompt)
+            barcodes = state.get("barcodes") or []
+            compact_text, compaction = self._compact_text(ocr_text, state.get("ocr_pages"))
+            prompt = template_service.build_classify_extract_prompt(templates, compact_text, barcodes)
+            response_content = await self._llm_invoke_with_retry(prompt, refresh=state.get("refresh_llm", False))
             
-            # 解析JSON
             try:
-                extraction_data = json.loads(response_content)
+                data = json.loads(response_content)
             except json.JSONDecodeError:
-                # 尝试清理后解析
-                extraction_data = self._clean_json_response(response_content)
+                data = self._clean_json_response(response_content)
             
-            logger.info(f"字段提取完成: {len(extraction_data)}个字段")
+            template = template_service.match_candidate_template(templates, str(data.get("document_type", "")))
+            if template is None:
+                return self._make_error_response(
+                    WorkflowErrorType.CLASSIFY_FAILED,
+                    f"LLM返回的文档类型不在候选模板中: {data.get('document_type')}"
+                )
+            
+            fields = data.get("fields")
+            if not isinstance(fields, dict):
+                fields = {}
+            # 只保留所选模板的字段，条码字段直接填充
+            field_keys = template_service.get_field_keys(template)
+            extraction_data = {key: fields.get(key, "") for key in field_keys} if field_keys else fields
+            barcode_values = template_service.match_barcode_fields(template, barcodes)
+            if barcode_values:
+                logger.info(f"条码直接填充字段: {list(barcode_values)}")
+            extraction_data.update(barcode_values)
+            
+            logger.info(f"分类+提取完成: {template.get('code')}，{len(extraction_data)}个字段")
             
             return {
+                "document_type": template.get("code"),
                 "extraction_data": extraction_data,
+                "text_compaction": compaction,
                 "step": "completed",
-                "messages": [AIMessage(content=f"字段提取完成: {json.dumps(extraction_data, ensure_ascii=False)[:200]}...")]
+                "messages": [AIMessage(content=f"分类+提取完成: {template.get('code')}")]
             }
             
         except Exception as e:
-            logger.error(f"提取失败: {e}")
+            logger.error(f"分类+提取失败: {e}")
             return self._make_error_response(
                 WorkflowErrorType.EXTRACT_FAILED,
                 str(e)
             )
     
+    async def _resolve_workflow_mode(self, tenant_id: Optional[str]) -> str:
+        """自动分类工作流模式：租户配置优先，其次 WORKFLOW_MODE_DEFAULT"""
+        tenant = await tenant_service.get_tenant(tenant_id) if tenant_id else None
+        return template_service.get_workflow_mode(tenant)
+    
+    async def _resolve_ocr_profile(
+        self,
+        tenant_id: Optional[str],
+        template: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """OCR 引擎配置档：模板配置优先，其次租户配置（未定义任何配置档时不查询）"""
+        if not settings.OCR_ENGINE_PROFILES.strip():
+            return None
+        profile = template_service.get_ocr_profile(template)
+        if profile is None and tenant_id:
+            profile = template_service.get_ocr_profile(await tenant_service.get_tenant(tenant_id))
+        return profile
+    
+    def _compact_text(
+        self,
+        ocr_text: str,
+        ocr_pages: Optional[list] = None,
+        template: Optional[Dict[str, Any]] = None
+    ) -> tuple:
+        """送入 LLM 前压缩 OCR 文本（未启用时原样返回）
+        
+        Args:
+            ocr_text: 完整 OCR 文本
+            ocr_pages: 按页拆分的文本行（可选，用于识别跨页重复的页眉页脚）
+            template: 模板信息（可选，提供时删除模板声明的固定文字）
+            
+        Returns:
+            (压缩后的文本, 压缩统计)，未启用时统计为 None
+        """
+        if not settings.LLM_TEXT_COMPACTION_ENABLED or not ocr_text:
+            return ocr_text, None
+        compact_text, stats = compact_ocr_text(
+            ocr_text,
+            pages=ocr_pages or None,
+            boilerplate=template_service.get_boilerplate_patterns(template),
+            repeat_ratio=settings.LLM_TEXT_COMPACTION_REPEAT_RATIO,
+            edge_lines=settings.LLM_TEXT_COMPACTION_EDGE_LINES,
+        )
+        if template is not None:
+            logger.info(
+                f"OCR文本压缩: 估算token {stats['tokens_before']}→{stats['tokens_after']}"
+                f"（节省 {stats['tokens_saved']}，页眉页脚 {stats['repeated_lines']} 行，"
+                f"页码 {stats['page_number_lines']} 行，固定文字 {stats['boilerplate_lines']} 行）"
+            )
+        return compact_text, stats
+    
+    async def _load_ocr_pages(self, document_id: str) -> tuple:
+        """复用 OCR 文本时从 OCR 产物还原按页拆分的文本行和识别范围
+        
+        Returns:
+            (按页文本行, 识别范围)；无产物时为 ([], None)，复用的是数据库中的整篇文本
+        """
+        artifact = ocr_service.load_artifact(document_id)
+        if artifact is None:
+            return [], None
+        try:
+            result = await asyncio.to_thread(artifact.to_result)
+            return page_lines(result), artifact.scope
+        except Exception as e:
+            logger.warning(f"读取OCR产物失败，按单页压缩文本: {document_id} - {e}")
+            return [], None
+    
+    async def _extract_with_barcodes(
+        self,
+        template: Dict[str, Any],
+        ocr_text: str,
+        barcodes: list,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """按模板提取字段：配置了 barcode_pattern 的字段直接用条码值填充
+        
+        全部字段都能由条码填充时不调用 LLM；否则把解码结果写入 Prompt，
+        LLM 提取后再用条码值覆盖对应字段。
+        """
+        barcode_values = template_service.match_barcode_fields(template, barcodes)
+        field_keys = template_service.get_field_keys(template)
+        if barcode_values:
+            logger.info(f"条码直接填充字段: {list(barcode_values)}")
+        
+        if field_keys and all(key in barcode_values for key in field_keys):
+            return dict(barcode_values)
+        
+        prompt = template_service.build_extraction_prompt(template, ocr_text, barcodes)
+        response_content = await self._llm_invoke_with_retry(prompt, refresh=refresh)
+        
+        # 解析JSON
+        try:
+            extraction_data = json.loads(response_content)
+        except json.JSONDecodeError:
+            # 尝试清理后解析
+            extraction_data = self._clean_json_response(response_content)
+        
+        extraction_data.update(barcode_values)
+        return extraction_data
+    
     def _fallback_classify(self, text: str) -> str:
         """关键词回退分类"""
         if any(kw in text for kw in ["运单号", "快递单号", "收件人", "寄件人", "物流"]):
@@ -269,6 +545,11 @@ class OCRWorkflow:
         else:
             return "未知"
     
+    def _is_json_response(self, content: str) -> bool:
+        """响应能否解析为 JSON 对象（允许 Markdown 代码块包裹）"""
+        data = self._clean_json_response(content)
+        return isinstance(data, dict) and "raw_response" not in data
+    
     def _clean_json_response(self, content: str) -> dict:
         """清理LLM响应中的JSON"""
         content = content.strip()
@@ -289,7 +570,10 @@ class OCRWorkflow:
         self, 
         document_id: str, 
         file_path: str,
-        tenant_id: Optional[str] = None
+        tenant_id: Optional[str] = None,
+        ocr_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        refresh_llm: bool = False
     ) -> Dict[str, Any]:
         """执行工作流 - 主入口（自动分类模式）
         
@@ -297,44 +581,25 @@ class OCRWorkflow:
             document_id: 文档ID
             file_path: 文件路径
             tenant_id: 租户ID（可选，用于从数据库获取模板配置）
+            ocr_text: 已有的完整OCR文本（可选，提供时跳过OCR，从分类节点开始）
+            ocr_confidence: 已有OCR文本的置信度（可选）
+            refresh_llm: 重新处理文档时跳过 LLM 响应缓存
             
         Returns:
             处理结果字典
         """
         processing_start = datetime.now()
-        
-        initial_state: WorkflowState = {
-            "messages": [],
-            "document_id": document_id,
-            "file_path": file_path,
-            "ocr_text": "",
-            "ocr_confidence": 0.0,
-            "document_type": "",
-            "extraction_data": {},
-            "step": "start",
-            "error": None,
-            "processing_start": processing_start,
-            "tenant_id": tenant_id
-        }
-        
-        config = {"configurable": {"thread_id": document_id}}
+        reuse_ocr = bool(ocr_text)
+        initial_state = await self._initial_state(
+            document_id, file_path, tenant_id, ocr_text, ocr_confidence, processing_start, refresh_llm
+        )
+        workflow_mode = initial_state["workflow_mode"]
+        workflow, thread_suffix = self._select_workflow(workflow_mode, reuse_ocr)
+        config = {"configurable": {"thread_id": f"{document_id}{thread_suffix}"}}
         
         try:
-            final_state = await self.workflow.ainvoke(initial_state, config=config)
-            
-            processing_time = (datetime.now() - processing_start).total_seconds()
-            
-            return {
-                "success": final_state.get("error") is None,
-                "document_id": document_id,
-                "document_type": final_state.get("document_type"),
-                "extraction_data": final_state.get("extraction_data"),
-                "ocr_text": final_state.get("ocr_text", "")[:500] + "...",  # 截断
-                "ocr_confidence": final_state.get("ocr_confidence"),
-                "processing_time": processing_time,
-                "step": final_state.get("step"),
-                "error": final_state.get("error")
-            }
+            final_state = await workflow.ainvoke(initial_state, config=config)
+            return self._workflow_result(final_state, reuse_ocr)
             
         except Exception as e:
             logger.error(f"工作流执行失败: {e}")
@@ -345,6 +610,70 @@ class OCRWorkflow:
                 "processing_time": (datetime.now() - processing_start).total_seconds()
             }
     
+    async def _initial_state(
+        self,
+        document_id: str,
+        file_path: str,
+        tenant_id: Optional[str],
+        ocr_text: Optional[str],
+        ocr_confidence: Optional[float],
+        processing_start: datetime,
+        refresh_llm: bool = False
+    ) -> WorkflowState:
+        """构建自动分类工作流的初始状态（复用OCR文本时解码条码、还原分页）"""
+        reuse_ocr = bool(ocr_text)
+        state: WorkflowState = {
+            "messages": [],
+            "document_id": document_id,
+            "file_path": file_path,
+            "ocr_text": ocr_text or "",
+            "ocr_confidence": ocr_confidence or 0.0,
+            "document_type": "",
+            "extraction_data": {},
+            "step": "ocr_completed" if reuse_ocr else "start",
+            "error": None,
+            "processing_start": processing_start,
+            "tenant_id": tenant_id,
+            "barcodes": [],
+            "ocr_pages": [],
+            "text_compaction": None,
+            "workflow_mode": await self._resolve_workflow_mode(tenant_id),
+            "refresh_llm": refresh_llm
+        }
+        
+        if reuse_ocr:
+            logger.info(f"复用已有OCR文本，跳过OCR: {document_id}")
+            # 条码解码只读前几页，复用OCR文本时仍单独解码
+            state["barcodes"] = await ocr_service.decode_barcodes(file_path)
+            state["ocr_pages"], _ = await self._load_ocr_pages(document_id)
+        return state
+    
+    def _workflow_result(self, final_state: Dict[str, Any], reuse_ocr: bool) -> Dict[str, Any]:
+        """组装自动分类工作流的处理结果"""
+        document_id = final_state.get("document_id")
+        workflow_mode = final_state.get("workflow_mode")
+        processing_time = (datetime.now() - final_state["processing_start"]).total_seconds()
+        full_ocr_text = final_state.get("ocr_text", "")
+        logger.info(f"自动分类工作流完成 [{workflow_mode}]: {document_id} 耗时{processing_time:.2f}s")
+        
+        return {
+            "success": final_state.get("error") is None,
+            "document_id": document_id,
+            "document_type": final_state.get("document_type"),
+            "extraction_data": final_state.get("extraction_data"),
+            "ocr_text": full_ocr_text[:500] + "...",  # 截断
+            "ocr_full_text": full_ocr_text,  # 完整文本，用于持久化和重新处理时复用
+            "ocr_reused": reuse_ocr,
+            "ocr_confidence": final_state.get("ocr_confidence"),
+            "barcodes": final_state.get("barcodes", []),
+            "text_compaction": final_state.get("text_compaction"),
+            "workflow_mode": workflow_mode,
+            "classify_source": final_state.get("classify_source"),
+            "processing_time": processing_time,
+            "step": final_state.get("step"),
+            "error": final_state.get("error")
+        }
+    
     async def process_with_text(
         self, 
         document_id: str, 
@@ -364,6 +693,7 @@ class OCRWorkflow:
             处理结果字典
         """
         processing_start = datetime.now()
+        workflow_mode = await self._resolve_workflow_mode(tenant_id)
         
         # 直接从分类节点开始
         initial_state: WorkflowState = {
@@ -377,22 +707,16 @@ class OCRWorkflow:
             "step": "ocr_completed",
             "error": None,
             "processing_start": processing_start,
-            "tenant_id": tenant_id
+            "tenant_id": tenant_id,
+            "workflow_mode": workflow_mode
         }
         
-        # 构建一个简化的工作流（跳过OCR）
-        workflow = StateGraph(WorkflowState)
-        workflow.add_node("doc_classify", self._classify_node)
-        workflow.add_node("extract", self._extract_node)
-        workflow.add_edge(START, "doc_classify")
-        workflow.add_edge("doc_classify", "extract")
-        workflow.add_edge("extract", END)
-        
-        compiled = workflow.compile(checkpointer=self.memory)
-        config = {"configurable": {"thread_id": f"{document_id}-text"}}
+        # 使用简化的工作流（跳过OCR）
+        workflow, thread_suffix = self._select_workflow(workflow_mode, reuse_ocr=True)
+        config = {"configurable": {"thread_id": f"{document_id}{thread_suffix}"}}
         
         try:
-            final_state = await compiled.ainvoke(initial_state, config=config)
+            final_state = await workflow.ainvoke(initial_state, config=config)
             
             processing_time = (datetime.now() - processing_start).total_seconds()
             
@@ -401,6 +725,9 @@ class OCRWorkflow:
                 "document_id": document_id,
                 "document_type": final_state.get("document_type"),
                 "extraction_data": final_state.get("extraction_data"),
+                "text_compaction": final_state.get("text_compaction"),
+                "workflow_mode": workflow_mode,
+                "classify_source": final_state.get("classify_source"),
                 "processing_time": processing_time,
                 "step": final_state.get("step"),
                 "error": final_state.get("error")
@@ -422,7 +749,10 @@ class OCRWorkflow:
         document_id: str, 
         file_path: str, 
         template_id: str,
-        tenant_id: str
+        tenant_id: str,
+        ocr_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        refresh_llm: bool = False
     ) -> Dict[str, Any]:
         """使用模板配置执行工作流
         
@@ -431,6 +761,9 @@ class OCRWorkflow:
             file_path: 文件路径
             template_id: 模板ID
             tenant_id: 租户ID
+            ocr_text: 已有的完整OCR文本（可选，提供时跳过OCR直接提取）
+            ocr_confidence: 已有OCR文本的置信度（可选）
+            refresh_llm: 重新处理文档时跳过 LLM 响应缓存
             
         Returns:
             处理结果字典
@@ -449,40 +782,11 @@ class OCRWorkflow:
             
             logger.info(f"使用模板 [{template['name']}] 处理文档")
             
-            # 2. OCR 提取
-            logger.info(f"开始OCR处理: {file_path}")
-            ocr_result = await ocr_service.process_document(file_path)
-            ocr_text = ocr_result["text"]
-            ocr_confidence = ocr_result["confidence"]
-            logger.info(f"OCR完成，提取{ocr_result['total_lines']}行，置信度{ocr_confidence:.2f}")
-            
-            # 3. 使用模板动态构建 Prompt 并提取（带重试）
-            prompt = template_service.build_extraction_prompt(template, ocr_text)
-            response_content = await self._llm_invoke_with_retry(prompt)
-            
-            # 4. 解析结果
-            try:
-                extraction_data = json.loads(response_content)
-            except json.JSONDecodeError:
-                extraction_data = self._clean_json_response(response_content)
-            
-            processing_time = (datetime.now() - processing_start).total_seconds()
+            # 2. OCR 提取（已有OCR文本时跳过，仅重新提取）
+            ocr = await self.template_ocr_stage(document_id, file_path, template, tenant_id, ocr_text, ocr_confidence)
             
-            logger.info(f"模板化提取完成: {len(extraction_data)}个字段，耗时{processing_time:.2f}s")
-            
-            return {
-                "success": True,
-                "document_id": document_id,
-                "template_id": template_id,
-                "template_name": template.get("name"),
-                "document_type": template.get("code"),  # 使用模板 code 作为文档类型（解耦）
-                "extraction_data": extraction_data,
-                "ocr_text": ocr_text[:500] + "..." if len(ocr_text) > 500 else ocr_text,
-                "ocr_confidence": ocr_confidence,
-                "processing_time": processing_time,
-                "step": "completed",
-                "error": None
-            }
+            # 3. 使用模板动态构建 Prompt 并提取（带重试，条码字段直接填充）
+            return await self.template_extract_stage(document_id, template, ocr, processing_start, refresh_llm)
             
         except Exception as e:
             logger.error(f"模板化处理失败: {e}")
@@ -493,23 +797,160 @@ class OCRWorkflow:
                 "processing_time": (datetime.now() - processing_start).total_seconds()
             }
     
+    async def template_ocr_stage(
+        self,
+        document_id: str,
+        file_path: str,
+        template: Dict[str, Any],
+        tenant_id: str,
+        ocr_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """模板化处理的 OCR 步骤（已有OCR文本时只解码条码、还原分页）
+        
+        Returns:
+            {"ocr_text", "ocr_confidence", "ocr_pages", "ocr_scope", "barcodes", "ocr_reused"}
+        """
+        if ocr_text:
+            logger.info(f"复用已有OCR文本，跳过OCR: {document_id}")
+            ocr_pages, scope = await self._load_ocr_pages(document_id)
+            return {
+                "ocr_text": ocr_text,
+                "ocr_confidence": ocr_confidence or 0.0,
+                "ocr_pages": ocr_pages,
+                "ocr_scope": scope,
+                "barcodes": await ocr_service.decode_barcodes(file_path),
+                "ocr_reused": True
+            }
+        
+        # 模板声明了识别区域时只识别这些区域
+        regions = template_service.get_ocr_regions(template)
+        if regions:
+            logger.info(f"开始OCR处理（模板区域 {len(regions)} 个）: {file_path}")
+        else:
+            logger.info(f"开始OCR处理: {file_path}")
+        ocr_result = await ocr_service.process_document(
+            file_path,
+            regions=regions or None,
+            page_selection=template_service.get_page_selection(template),
+            ocr_profile=await self._resolve_ocr_profile(tenant_id, template)
+        )
+        barcodes = ocr_result.get("barcodes")
+        if barcodes is None:
+            barcodes = await ocr_service.decode_barcodes(file_path)
+        logger.info(f"OCR完成，提取{ocr_result['total_lines']}行，置信度{ocr_result['confidence']:.2f}")
+        await ocr_service.save_artifact(document_id, ocr_result)
+        return {
+            "ocr_text": ocr_result["text"],
+            "ocr_confidence": ocr_result["confidence"],
+            "ocr_pages": page_lines(ocr_result),
+            "ocr_scope": ocr_scope(ocr_result),
+            "barcodes": barcodes,
+            "ocr_reused": False
+        }
+    
+    async def template_extract_stage(
+        self,
+        document_id: str,
+        template: Dict[str, Any],
+        ocr: Dict[str, Any],
+        processing_start: datetime,
+        refresh_llm: bool = False
+    ) -> Dict[str, Any]:
+        """模板化处理的提取步骤（压缩文本、按模板提取字段），返回处理结果
+        
+        Args:
+            document_id: 文档ID
+            template: 模板详情（含字段）
+            ocr: template_ocr_stage 的返回值
+            processing_start: 处理开始时间
+            refresh_llm: 重新处理文档时跳过 LLM 响应缓存
+        """
+        compact_text, compaction = self._compact_text(ocr["ocr_text"], ocr["ocr_pages"], template)
+        extraction_data = await self._extract_with_barcodes(
+            template, compact_text, ocr["barcodes"], refresh=refresh_llm
+        )
+        processing_time = (datetime.now() - processing_start).total_seconds()
+        ocr_text = ocr["ocr_text"]
+        
+        logger.info(f"模板化提取完成: {len(extraction_data)}个字段，耗时{processing_time:.2f}s")
+        
+        return {
+            "success": True,
+            "document_id": document_id,
+            "template_id": template.get("id"),
+            "template_name": template.get("name"),
+            "document_type": template.get("code"),  # 使用模板 code 作为文档类型（解耦）
+            "extraction_data": extraction_data,
+            "ocr_text": ocr_text[:500] + "..." if len(ocr_text) > 500 else ocr_text,
+            "ocr_full_text": ocr_text,  # 完整文本，用于持久化和重新处理时复用
+            "ocr_reused": ocr["ocr_reused"],
+            "ocr_scope": ocr["ocr_scope"],  # 仅识别了模板区域/选定页时非空，此时文本不是整篇文本
+            "ocr_confidence": ocr["ocr_confidence"],
+            "barcodes": ocr["barcodes"],
+            "text_compaction": compaction,
+            "processing_time": processing_time,
+            "step": "completed",
+            "error": None
+        }
+    
+    # ============ 分阶段接口（文档处理流水线按阶段调度，结果与 process() 一致） ============
+    
+    async def prepare_state(
+        self,
+        document_id: str,
+        file_path: str,
+        tenant_id: Optional[str] = None,
+        ocr_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        refresh_llm: bool = False,
+        processing_start: Optional[datetime] = None
+    ) -> WorkflowState:
+        """构建自动分类处理的初始状态（参数同 process()），后续各阶段原地更新该状态"""
+        return await self._initial_state(
+            document_id, file_path, tenant_id, ocr_text, ocr_confidence,
+            processing_start or datetime.now(), refresh_llm
+        )
+    
+    async def ocr_stage(self, state: WorkflowState) -> None:
+        """OCR 阶段（复用已有OCR文本时跳过）"""
+        if state["step"] == "start":
+            state.update(await self._ocr_node(state))
+    
+    async def classify_stage(self, state: WorkflowState) -> None:
+        """分类阶段（仅 two_step 模式，single_call 模式在提取阶段一次完成分类和提取）"""
+        if state.get("error") or state["workflow_mode"] != "two_step":
+            return
+        state.update(await self._classify_node(state))
+    
+    async def extract_stage(self, state: WorkflowState, reuse_ocr: bool) -> Dict[str, Any]:
+        """提取阶段，返回与 process() 格式一致的处理结果"""
+        if not state.get("error"):
+            if state["workflow_mode"] == "single_call":
+                state.update(await self._classify_extract_node(state))
+            else:
+                state.update(await self._extract_node(state))
+        return self._workflow_result(state, reuse_ocr)
+    
     async def process_merge(
         self, 
         document_id: str, 
         files: list,  # [{file_path, doc_type}, ...]
         template_id: str,
-        tenant_id: str
+        tenant_id: str,
+        refresh_llm: bool = False
     ) -> Dict[str, Any]:
         """Merge 模式处理：多份文档分别提取后合并
         
-        用于照明事业部等场景：上传积分球+光分布两份文档，
-        分别用各自的子模板提取，然后合并结果。
+        用于照明事业部等场景：上传积分球+光分布等多份文档，
+        分别用各自的子模板并发提取（耗时取决于最慢的一份），然后合并结果。
         
         Args:
             document_id: 文档ID
-            files: 文件列表，每项包含 file_path 和 doc_type
+            files: 文件列表，每项包含 file_path、doc_type 及可选的原始文档 document_id
             template_id: 合并模板ID（process_mode='merge'）
             tenant_id: 租户ID
+            refresh_llm: 是否跳过 LLM 响应缓存
             
         Returns:
             合并后的处理结果
@@ -544,48 +985,44 @@ class OCRWorkflow:
                     "error": "合并规则配置缺失"
                 }
             
-            sub_template_a = template.get("sub_template_a")
-            sub_template_b = template.get("sub_template_b")
-            
-            # 3. 分别处理每份文档
-            result_a = None
-            result_b = None
-            ocr_texts = []
+            # 文档类型 -> 子模板（A、B 及额外子模板，按合并顺序）
+            sub_templates = template.get("sub_templates") or {
+                doc_type: sub_template
+                for doc_type, sub_template in (
+                    (merge_rule.get("doc_type_a"), template.get("sub_template_a")),
+                    (merge_rule.get("doc_type_b"), template.get("sub_template_b")),
+                )
+                if doc_type and sub_template
+            }
             
+            # 3. 各份文档并发执行 OCR + 提取，任一失败时取消其余
+            ocr_profile = await self._resolve_ocr_profile(tenant_id, template)
+            jobs = []
             for file_info in files:
                 file_path = file_info.get("file_path")
                 doc_type = file_info.get("doc_type", "")
-                
                 if not file_path:
                     continue
-                
-                # OCR 提取
-                logger.info(f"OCR处理文档: {file_path} (类型: {doc_type})")
-                ocr_result = await ocr_service.process_document(file_path)
-                ocr_text = ocr_result["text"]
-                ocr_texts.append(ocr_text)
-                
-                # 根据文档类型选择子模板（带重试）
-                if doc_type == merge_rule.get("doc_type_a") and sub_template_a:
-                    prompt = template_service.build_extraction_prompt(sub_template_a, ocr_text)
-                    response_content = await self._llm_invoke_with_retry(prompt)
-                    try:
-                        result_a = json.loads(response_content)
-                    except json.JSONDecodeError:
-                        result_a = self._clean_json_response(response_content)
-                    logger.info(f"文档A ({doc_type}) 提取完成: {len(result_a)}个字段")
-                    
-                elif doc_type == merge_rule.get("doc_type_b") and sub_template_b:
-                    prompt = template_service.build_extraction_prompt(sub_template_b, ocr_text)
-                    response_content = await self._llm_invoke_with_retry(prompt)
-                    try:
-                        result_b = json.loads(response_content)
-                    except json.JSONDecodeError:
-                        result_b = self._clean_json_response(response_content)
-                    logger.info(f"文档B ({doc_type}) 提取完成: {len(result_b)}个字段")
-            
-            # 4. 合并结果
-            merged_data = template_service.merge_extraction_results(result_a, result_b)
+                if doc_type not in sub_templates:
+                    logger.warning(f"文档类型 {doc_type} 没有对应的子模板，跳过: {file_path}")
+                    continue
+                jobs.append(self._process_merge_part(
+                    file_path, doc_type, sub_templates[doc_type], ocr_profile,
+                    source_document_id=file_info.get("document_id"),
+                    refresh_llm=refresh_llm
+                ))
+            
+            parts = await self._gather_or_cancel(jobs)
+            
+            # 4. 合并结果（按子模板顺序，同类型多份文档按上传顺序）
+            results_by_type = {
+                doc_type: template_service.merge_extraction_results(
+                    *[part["extraction_data"] for part in parts if part["doc_type"] == doc_type]
+                )
+                for doc_type in sub_templates
+                if any(part["doc_type"] == doc_type for part in parts)
+            }
+            merged_data = template_service.merge_extraction_results(*results_by_type.values())
             
             processing_time = (datetime.now() - processing_start).total_seconds()
             
@@ -599,9 +1036,11 @@ class OCRWorkflow:
                 "document_type": template.get("code"),  # 使用模板 code 作为文档类型（解耦）
                 "extraction_data": merged_data,
                 "sub_results": {
-                    "result_a": result_a,
-                    "result_b": result_b
+                    "result_a": results_by_type.get(merge_rule.get("doc_type_a")),
+                    "result_b": results_by_type.get(merge_rule.get("doc_type_b")),
+                    "by_doc_type": results_by_type
                 },
+                "text_compaction": [part["text_compaction"] for part in parts if part["text_compaction"]],
                 "processing_time": processing_time,
                 "step": "completed",
                 "error": None
@@ -616,6 +1055,66 @@ class OCRWorkflow:
                 "processing_time": (datetime.now() - processing_start).total_seconds()
             }
     
+    async def _process_merge_part(
+        self,
+        file_path: str,
+        doc_type: str,
+        sub_template: Dict[str, Any],
+        ocr_profile: Optional[str],
+        source_document_id: Optional[str] = None,
+        refresh_llm: bool = False
+    ) -> Dict[str, Any]:
+        """合并模式下处理一份文档：OCR 后按子模板提取
+        
+        Args:
+            source_document_id: 原始文档ID（有则保存 OCR 产物，供该文档重新处理时复用）
+            refresh_llm: 是否跳过 LLM 响应缓存
+        
+        Returns:
+            {"doc_type", "file_path", "extraction_data", "text_compaction", "processing_time"}
+        """
+        start = datetime.now()
+        logger.info(f"OCR处理文档: {file_path} (类型: {doc_type})")
+        ocr_result = await ocr_service.process_document(file_path, ocr_profile=ocr_profile)
+        if source_document_id:
+            await ocr_service.save_artifact(source_document_id, ocr_result)
+        
+        compact_text, compaction = self._compact_text(ocr_result["text"], page_lines(ocr_result), sub_template)
+        extraction_data = await self._extract_with_barcodes(
+            sub_template, compact_text, ocr_result.get("barcodes") or [], refresh=refresh_llm
+        )
+        processing_time = (datetime.now() - start).total_seconds()
+        logger.info(f"文档 ({doc_type}) 提取完成: {len(extraction_data)}个字段，耗时{processing_time:.2f}s")
+        
+        return {
+            "doc_type": doc_type,
+            "file_path": file_path,
+            "extraction_data": extraction_data,
+            "text_compaction": compaction,
+            "processing_time": processing_time
+        }
+    
+    async def _gather_or_cancel(self, coros: list) -> list:
+        """并发执行并按输入顺序返回结果；任一任务失败（或调用方被取消）时取消其余任务并等待其结束
+        
+        Raises:
+            Exception: 最先失败的任务的异常
+        """
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        if not tasks:
+            return []
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task in done and not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+            return [task.result() for task in tasks]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def process_auto(
         self,
         document_id: str,
@@ -2,19 +2,28 @@
 # api/main.py
 """FastAPI 主应用"""
 
+import time
+_IMPORT_START = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from loguru import logger
 import os
+import asyncio
+import importlib
 
 from config.settings import settings
 from services.ocr_service import ocr_service
 from services.supabase_service import supabase_service
+from services.readiness import readiness
 from api.routes import documents_router, health_router
 from api.routes.tenants import router as tenants_router
 
+# 模块导入耗时（OCR 模型、LangChain 等重型依赖不在此阶段加载）
+IMPORT_MS = int((time.perf_counter() - _IMPORT_START) * 1000)
+
 
 # 配置日志
 logger.add(
@@ -25,10 +34,47 @@ logger.add(
 )
 
 
+async def _load_workflow():
+    """导入 OCR 工作流（LangChain / LangGraph 及 LLM 客户端），在线程中执行不阻塞事件循环"""
+    module = await asyncio.to_thread(importlib.import_module, "agents.workflow")
+    return module.ocr_workflow
+
+
+async def _load_pipeline():
+    """启动文档处理流水线（后台任务的 OCR、分类、提取、持久化分阶段并发）"""
+    workflow = await readiness.get("workflow")
+    module = await asyncio.to_thread(importlib.import_module, "agents.pipeline")
+    from api.routes.documents.process import persist_processing_result
+    pipeline = module.DocumentPipeline(workflow, persist_processing_result)
+    pipeline.start()
+    return pipeline
+
+
+readiness.register("ocr", ocr_service.initialize)
+readiness.register("workflow", _load_workflow)
+if settings.PIPELINE_ENABLED:
+    readiness.register("pipeline", _load_pipeline)
+readiness.register("supabase", supabase_service.initialize)
+
+
+async def _log_startup_profile(startup_start: float, serving_ms: int):
+    """全部组件加载结束后记录启动耗时概览"""
+    components = await readiness.wait_all()
+    total_ms = int((time.perf_counter() - startup_start) * 1000) + IMPORT_MS
+    details = "，".join(
+        f"{name} {status['elapsed_ms']}ms" + ("" if status["state"] == "ready" else f"({status['state']})")
+        for name, status in components.items()
+    )
+    logger.info(
+        f"启动耗时: 模块导入 {IMPORT_MS}ms，API可用 {IMPORT_MS + serving_ms}ms，"
+        f"组件 [{details}]，全部完成 {total_ms}ms"
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时初始化服务
+    startup_start = time.perf_counter()
     logger.info("=" * 50)
     logger.info(f"正在启动 {settings.APP_NAME}...")
     logger.info("=" * 50)
@@ -38,19 +84,12 @@ async def lifespan(app: FastAPI):
     os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
     logger.info(f"✓ 上传目录: {settings.UPLOAD_FOLDER}")
     
-    # 初始化OCR服务
-    try:
-        await ocr_service.initialize()
-        logger.info("✓ OCR服务初始化成功")
-    except Exception as e:
-        logger.warning(f"⚠ OCR服务初始化失败（可稍后重试）: {e}")
-    
-    # 初始化Supabase服务
-    try:
-        await supabase_service.initialize()
-        logger.info("✓ Supabase服务初始化成功")
-    except Exception as e:
-        logger.warning(f"⚠ Supabase服务初始化失败（请检查配置）: {e}")
+    # 重型组件在后台加载，API 立即可用；健康检查返回各组件状态，
+    # 依赖未就绪组件的请求等待其加载完成（失败的组件在下次使用时重试）
+    readiness.start()
+    profile_task = asyncio.ensure_future(
+        _log_startup_profile(startup_start, int((time.perf_counter() - startup_start) * 1000))
+    )
     
     logger.info("=" * 50)
     logger.info(f"✓ {settings.APP_NAME} 启动完成")
@@ -62,6 +101,10 @@ async def lifespan(app: FastAPI):
     
     # 关闭时清理
     logger.info("正在关闭服务...")
+    profile_task.cancel()
+    if readiness.is_ready("pipeline"):
+        await (await readiness.get("pipeline")).stop()
+    await readiness.shutdown()
     await ocr_service.close()
     logger.info("服务已关闭")
 
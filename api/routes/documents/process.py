@@ -6,6 +6,7 @@ from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel
 from loguru import logger
+import asyncio
 import uuid
 import os
 
@@ -13,7 +14,9 @@ from config.settings import settings
 from services.supabase_service import supabase_service
 from services.template_service import template_service
 from services.feishu_service import feishu_service
-from agents.workflow import ocr_workflow
+from services.ocr_service import ocr_service
+from services.readiness import readiness
+from services.ocr_artifact import is_full_document, scope_matches
 from api.exceptions import DocumentNotFoundError, FileNotFoundError, ProcessingError, AppException
 from api.dependencies.auth import get_current_user, CurrentUser
 
@@ -30,18 +33,112 @@ class ProcessWithTemplateRequest(BaseModel):
     """模板化处理请求"""
     template_id: str
     sync: bool = False
+    force_ocr: bool = False  # 强制重新OCR（默认复用已保存的OCR文本）
+    refresh_llm: bool = False  # 跳过 LLM 响应缓存（默认命中缓存时直接复用）
 
 
 class ProcessMergeRequest(BaseModel):
     """合并模式处理请求"""
     template_id: str
     files: List[MergeFileInfo]
+    refresh_llm: bool = False  # 跳过 LLM 响应缓存（默认命中缓存时直接复用）
 
 router = APIRouter()
 
 
 # ============ 后台任务辅助函数 ============
 
+async def get_ocr_workflow():
+    """获取 OCR 工作流（LangChain / LangGraph 在后台加载，未就绪时等待）"""
+    return await readiness.get("workflow")
+
+
+def _load_artifact_ocr(
+    document_id: str,
+    regions: Optional[list],
+    page_selection: Optional[dict]
+) -> Optional[dict]:
+    """读取本地 OCR 产物中可复用的文本（读盘解压，需在线程中调用）
+    
+    Returns:
+        {"ocr_text": str, "ocr_confidence": float}；无产物返回 None，
+        产物不可复用返回 {}（不再回退数据库文本）
+    """
+    artifact = ocr_service.load_artifact(document_id)
+    if artifact is None:
+        return None
+    try:
+        if not scope_matches(artifact.scope, regions, page_selection):
+            # 上次只识别了模板区域或按其他规则选定的页，文本与本次所需范围不一致，需要重新OCR
+            logger.info(f"已保存的OCR产物识别范围与本次处理不一致，需重新OCR: {document_id}")
+            return {}
+        if artifact.text.strip():
+            return {
+                "ocr_text": artifact.text,
+                "ocr_confidence": artifact.confidence
+            }
+    except Exception as e:
+        logger.warning(f"读取OCR产物失败，回退数据库OCR文本: {document_id} - {e}")
+    return None
+
+
+async def _get_reusable_ocr(
+    document_id: str,
+    document: Optional[dict],
+    force_ocr: bool = False,
+    template: Optional[dict] = None
+) -> Optional[dict]:
+    """获取可复用的已保存OCR结果
+    
+    重新处理（切换模板、LLM失败后重试）时优先读取本地 OCR 产物，
+    其次使用标记为完整文本的 documents.ocr_text，跳过OCR只重新执行分类/提取。
+    
+    Args:
+        document_id: 文档ID
+        document: 文档记录
+        force_ocr: 是否强制重新OCR
+        template: 本次使用的模板（可选，部分识别的产物仅在识别区域和页面选择一致时复用）
+        
+    Returns:
+        {"ocr_text": str, "ocr_confidence": float}，无可复用结果时返回 None
+    """
+    if force_ocr:
+        return None
+    
+    regions = template_service.get_ocr_regions(template) if template else None
+    page_selection = template_service.get_page_selection(template) if template else None
+    artifact_ocr = await asyncio.to_thread(_load_artifact_ocr, document_id, regions, page_selection)
+    if artifact_ocr is not None:
+        return artifact_ocr or None
+    
+    if not document:
+        return None
+    
+    ocr_text = document.get("ocr_text") or ""
+    if not ocr_text.strip():
+        return None
+    
+    if not document.get("ocr_text_complete"):
+        # 旧版本只保存了前500字符的预览文本；部分识别的文本也不标记为完整，不能用于重新提取
+        logger.info(f"已保存的OCR文本未标记为完整文本，需重新OCR: {document.get('id')}")
+        return None
+    
+    return {
+        "ocr_text": ocr_text,
+        "ocr_confidence": document.get("ocr_confidence")
+    }
+
+
+def _ocr_text_fields(result: dict) -> dict:
+    """文档记录中的 OCR 文本字段（保存整篇完整文本时标记 ocr_text_complete，供重新处理复用）"""
+    full_text = result.get("ocr_full_text")
+    return {
+        "ocr_text": full_text or result.get("ocr_text", ""),
+        "ocr_text_complete": bool(full_text) and is_full_document(result.get("ocr_scope")),
+        "ocr_confidence": result.get("ocr_confidence"),
+    }
+
+
 async def _handle_processing_success(
     document_id: str,
     result: dict,
@@ -80,8 +177,7 @@ async def _handle_processing_success(
         "document_type": result.get("document_type") or result.get("template_name"),
         "template_id": template_id,
         "tenant_id": tenant_id,
-        "ocr_text": result.get("ocr_text", ""),
-        "ocr_confidence": result.get("ocr_confidence"),
+        **_ocr_text_fields(result),
         "processed_at": datetime.now().isoformat(),
         "error_message": None
     }
@@ -121,6 +217,8 @@ async def process_document(
     document_id: str,
     background_tasks: BackgroundTasks,
     sync: bool = False,
+    force_ocr: bool = False,
+    refresh_llm: bool = False,
     user: CurrentUser = Depends(get_current_user)
 ):
     """
@@ -128,6 +226,8 @@ async def process_document(
     
     - **document_id**: 文档ID
     - **sync**: 是否同步处理（默认异步后台处理）
+    - **force_ocr**: 是否强制重新OCR（默认复用已保存的OCR文本，只重新分类/提取）
+    - **refresh_llm**: 是否跳过 LLM 响应缓存（默认复用缓存的模型响应）
     
     如果文档关联了 template_id，将使用模板化处理流程；
     否则使用原有的自动分类处理流程（质量运营）。
@@ -162,19 +262,28 @@ async def process_document(
         if document and not document.get("tenant_id") and user.tenant_id:
             await supabase_service.update_document(document_id, {"tenant_id": user.tenant_id})
         
+        # 复用已保存的OCR结果（重新处理时只重跑分类/提取）
+        template = await template_service.get_template(template_id) if template_id and not force_ocr else None
+        reusable_ocr = await _get_reusable_ocr(document_id, document, force_ocr, template) or {}
+        
         if sync:
             # 同步处理
+            ocr_workflow = await get_ocr_workflow()
             if template_id:
                 # 使用模板化处理
                 result = await ocr_workflow.process_with_template(
                     document_id=document_id,
                     file_path=file_path,
                     template_id=template_id,
-                    tenant_id=tenant_id
+                    tenant_id=tenant_id,
+                    refresh_llm=refresh_llm,
+                    **reusable_ocr
                 )
             else:
                 # 原有流程（质量运营分类）
-                result = await ocr_workflow.process(document_id, file_path, tenant_id=tenant_id)
+                result = await ocr_workflow.process(
+                    document_id, file_path, tenant_id=tenant_id, refresh_llm=refresh_llm, **reusable_ocr
+                )
             
             # 保存结果到数据库
             if result["success"] and result.get("extraction_data"):
@@ -194,6 +303,7 @@ async def process_document(
                         "display_name": display_name,
                         "template_id": template_id,
                         "tenant_id": tenant_id,
+                        **_ocr_text_fields(result),
                         "error_message": None
                     })
                 except Exception as e:
@@ -207,7 +317,9 @@ async def process_document(
                 document_id=document_id,
                 file_path=file_path,
                 template_id=template_id,
-                tenant_id=tenant_id
+                tenant_id=tenant_id,
+                refresh_llm=refresh_llm,
+                **reusable_ocr
             )
             
             # 更新状态
@@ -221,7 +333,8 @@ async def process_document(
                 "status": "processing",
                 "message": "文档处理已开始（后台任务）",
                 "estimated_time": "30-60秒",
-                "use_template": template_id is not None
+                "use_template": template_id is not None,
+                "ocr_reused": bool(reusable_ocr)
             }
         
     except (DocumentNotFoundError, FileNotFoundError):
@@ -231,11 +344,57 @@ async def process_document(
         raise ProcessingError(f"处理失败: {str(e)}")
 
 
+async def persist_processing_result(
+    document_id: str,
+    result: dict,
+    template_id: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+    generate_display_name: bool = True
+) -> None:
+    """保存后台处理结果（后台任务和处理流水线的持久化阶段共用）
+    
+    Args:
+        document_id: 文档ID
+        result: 工作流处理结果
+        template_id: 模板ID（可选）
+        tenant_id: 租户ID（可选）
+        generate_display_name: 是否生成显示名称
+    """
+    try:
+        if result["success"] and result.get("extraction_data"):
+            await _handle_processing_success(
+                document_id=document_id,
+                result=result,
+                template_id=template_id,
+                tenant_id=tenant_id,
+                generate_display_name=generate_display_name
+            )
+        else:
+            await _handle_processing_failure(
+                document_id, 
+                result.get("error", "处理失败")
+            )
+    except Exception as e:
+        await _handle_processing_exception(document_id, e)
+
+
+async def _submit_to_pipeline(**kwargs) -> bool:
+    """提交到文档处理流水线（未启用时返回 False，由调用方直接执行工作流）"""
+    if not settings.PIPELINE_ENABLED:
+        return False
+    pipeline = await readiness.get("pipeline")
+    await pipeline.submit(**kwargs)
+    return True
+
+
 async def process_document_task(
     document_id: str, 
     file_path: str,
     template_id: Optional[str] = None,
-    tenant_id: Optional[str] = None
+    tenant_id: Optional[str] = None,
+    ocr_text: Optional[str] = None,
+    ocr_confidence: Optional[float] = None,
+    refresh_llm: bool = False
 ):
     """后台处理任务
     
@@ -244,34 +403,44 @@ async def process_document_task(
         file_path: 文件路径
         template_id: 模板ID（可选，有则使用模板化处理）
         tenant_id: 租户ID（可选）
+        ocr_text: 已保存的完整OCR文本（可选，提供时跳过OCR）
+        ocr_confidence: 已保存的OCR置信度（可选）
+        refresh_llm: 是否跳过 LLM 响应缓存（调用方显式要求时）
     """
     try:
         logger.info(f"开始后台处理: {document_id}, 模板: {template_id or '无(自动分类)'}")
         
+        if await _submit_to_pipeline(
+            document_id=document_id,
+            file_path=file_path,
+            tenant_id=tenant_id,
+            template_id=template_id,
+            ocr_text=ocr_text,
+            ocr_confidence=ocr_confidence,
+            refresh_llm=refresh_llm,
+            generate_display_name=True
+        ):
+            return
+        
         # 根据是否有模板选择处理方式
+        ocr_workflow = await get_ocr_workflow()
         if template_id:
             result = await ocr_workflow.process_with_template(
                 document_id=document_id,
                 file_path=file_path,
                 template_id=template_id,
-                tenant_id=tenant_id
-            )
-        else:
-            result = await ocr_workflow.process(document_id, file_path, tenant_id=tenant_id)
-        
-        if result["success"] and result.get("extraction_data"):
-            await _handle_processing_success(
-                document_id=document_id,
-                result=result,
-                template_id=template_id,
                 tenant_id=tenant_id,
-                generate_display_name=True
+                ocr_text=ocr_text,
+                ocr_confidence=ocr_confidence,
+                refresh_llm=refresh_llm
             )
         else:
-            await _handle_processing_failure(
-                document_id, 
-                result.get("error", "处理失败")
+            result = await ocr_workflow.process(
+                document_id, file_path, tenant_id=tenant_id,
+                ocr_text=ocr_text, ocr_confidence=ocr_confidence, refresh_llm=refresh_llm
             )
+        
+        await persist_processing_result(document_id, result, template_id, tenant_id, generate_display_name=True)
             
     except Exception as e:
         await _handle_processing_exception(document_id, e)
@@ -293,6 +462,7 @@ async def process_text_directly(
         
         doc_id = document_id or str(uuid.uuid4())
         
+        ocr_workflow = await get_ocr_workflow()
         result = await ocr_workflow.process_with_text(doc_id, text)
         
         return result
@@ -318,6 +488,8 @@ async def process_document_with_template(
     - **document_id**: 文档ID
     - **template_id**: 模板ID
     - **sync**: 是否同步处理（默认异步后台处理）
+    - **force_ocr**: 是否强制重新OCR（默认复用已保存的OCR文本，只重新提取）
+    - **refresh_llm**: 是否跳过 LLM 响应缓存（默认复用缓存的模型响应）
     """
     try:
         # 检查用户租户
@@ -342,13 +514,20 @@ async def process_document_with_template(
         if template.get("tenant_id") != user.tenant_id and not user.is_super_admin():
             raise HTTPException(status_code=403, detail="无权使用此模板")
         
+        # 复用已保存的OCR结果（切换模板时只重新提取）
+        reusable_ocr = await _get_reusable_ocr(document_id, document, request.force_ocr, template) or {}
+        refresh_llm = request.refresh_llm
+        
         if request.sync:
             # 同步处理
+            ocr_workflow = await get_ocr_workflow()
             result = await ocr_workflow.process_with_template(
                 document_id=document_id,
                 file_path=file_path,
                 template_id=request.template_id,
-                tenant_id=user.tenant_id
+                tenant_id=user.tenant_id,
+                refresh_llm=refresh_llm,
+                **reusable_ocr
             )
             
             # 保存结果
@@ -368,7 +547,9 @@ async def process_document_with_template(
                 document_id=document_id,
                 file_path=file_path,
                 template_id=request.template_id,
-                tenant_id=user.tenant_id
+                tenant_id=user.tenant_id,
+                refresh_llm=refresh_llm,
+                **reusable_ocr
             )
             
             await supabase_service.update_document_status(document_id, "processing")
@@ -377,7 +558,8 @@ async def process_document_with_template(
                 "document_id": document_id,
                 "template_id": request.template_id,
                 "status": "processing",
-                "message": "文档处理已开始（后台任务）"
+                "message": "文档处理已开始（后台任务）",
+                "ocr_reused": bool(reusable_ocr)
             }
         
     except (DocumentNotFoundError, FileNotFoundError, HTTPException):
@@ -391,32 +573,40 @@ async def process_document_with_template_task(
     document_id: str, 
     file_path: str,
     template_id: str,
-    tenant_id: str
+    tenant_id: str,
+    ocr_text: Optional[str] = None,
+    ocr_confidence: Optional[float] = None,
+    refresh_llm: bool = False
 ):
     """模板化处理后台任务"""
     try:
         logger.info(f"开始模板化后台处理: {document_id}, 模板: {template_id}")
         
+        # 模板化处理不生成显示名称
+        if await _submit_to_pipeline(
+            document_id=document_id,
+            file_path=file_path,
+            tenant_id=tenant_id,
+            template_id=template_id,
+            ocr_text=ocr_text,
+            ocr_confidence=ocr_confidence,
+            refresh_llm=refresh_llm,
+            generate_display_name=False
+        ):
+            return
+        
+        ocr_workflow = await get_ocr_workflow()
         result = await ocr_workflow.process_with_template(
             document_id=document_id,
             file_path=file_path,
             template_id=template_id,
-            tenant_id=tenant_id
+            tenant_id=tenant_id,
+            ocr_text=ocr_text,
+            ocr_confidence=ocr_confidence,
+            refresh_llm=refresh_llm
         )
         
-        if result["success"] and result.get("extraction_data"):
-            await _handle_processing_success(
-                document_id=document_id,
-                result=result,
-                template_id=template_id,
-                tenant_id=tenant_id,
-                generate_display_name=False  # 模板化处理不生成显示名称
-            )
-        else:
-            await _handle_processing_failure(
-                document_id, 
-                result.get("error", "处理失败")
-            )
+        await persist_processing_result(document_id, result, template_id, tenant_id, generate_display_name=False)
             
     except Exception as e:
         await _handle_processing_exception(document_id, e)
@@ -434,6 +624,7 @@ async def process_merge_documents(
     
     - **template_id**: 合并模板ID（process_mode='merge'）
     - **files**: 文件列表，每项包含 file_path 和 doc_type
+    - **refresh_llm**: 是否跳过 LLM 响应缓存（默认复用缓存的模型响应）
     """
     document_id = None
     try:
@@ -464,14 +655,15 @@ async def process_merge_documents(
         for file_info in request.files:
             if not os.path.exists(file_info.file_path):
                 raise FileNotFoundError(file_info.file_path)
-            files.append({
-                "file_path": file_info.file_path,
-                "doc_type": file_info.doc_type
-            })
-            # 根据文件路径查找原始文档ID
+            # 根据文件路径查找原始文档ID（OCR 产物按原始文档保存）
             source_doc = await supabase_service.get_document_by_file_path(file_info.file_path)
             if source_doc:
                 source_doc_ids.append(source_doc["id"])
+            files.append({
+                "file_path": file_info.file_path,
+                "doc_type": file_info.doc_type,
+                "document_id": source_doc["id"] if source_doc else None
+            })
         
         # 生成合并文档 ID
         document_id = str(uuid.uuid4())
@@ -497,11 +689,13 @@ async def process_merge_documents(
         await supabase_service.create_document(merged_doc_data)
         
         # 执行合并处理
+        ocr_workflow = await get_ocr_workflow()
         result = await ocr_workflow.process_merge(
             document_id=document_id,
             files=files,
             template_id=template_uuid,  # 使用真实的模板 UUID
-            tenant_id=user.tenant_id
+            tenant_id=user.tenant_id,
+            refresh_llm=request.refresh_llm
         )
         
         # 检查处理结果 - 失败时抛出业务异常而非返回带无效 ID 的响应
@@ -584,8 +778,7 @@ async def _save_template_extraction_result(
             "document_type": result.get("template_name"),
             "template_id": template.get("id"),
             "tenant_id": user.tenant_id,
-            "ocr_text": result.get("ocr_text", ""),
-            "ocr_confidence": result.get("ocr_confidence"),
+            **_ocr_text_fields(result),
             "processed_at": datetime.now().isoformat(),
             "error_message": None
         })
@@ -8,6 +8,7 @@ from loguru import logger
 import os
 
 from services.supabase_service import supabase_service
+from services.ocr_service import ocr_service
 from api.dependencies.auth import get_current_user, get_user_client, CurrentUser
 from api.exceptions import DocumentNotFoundError, FileNotFoundError, ProcessingError, AuthenticationError
 
@@ -218,6 +219,43 @@ async def download_document(
         raise ProcessingError(f"下载失败: {str(e)}")
 
 
+@router.get("/{document_id}/ocr")
+async def get_document_ocr(
+    document_id: str,
+    user: CurrentUser = Depends(get_current_user)
+):
+    """
+    获取文档的 OCR 产物（需要登录）
+    
+    返回完整文本及每行的坐标、置信度和页码，供审核页面做版面定位；
+    数据来自本地 OCR 产物，无需重新 OCR 或读取数据库大字段。
+    """
+    try:
+        user_client = get_user_client(user)
+        
+        # 仅查询 id 做权限校验（RLS），不拉取 ocr_text 大字段
+        result = user_client.table("documents").select("id").eq("id", document_id).execute()
+        if not result.data:
+            raise DocumentNotFoundError(document_id)
+        
+        artifact = ocr_service.load_artifact(document_id)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="OCR 结果不存在，请先处理文档")
+        
+        return {
+            "document_id": document_id,
+            **artifact.to_result()
+        }
+        
+    except (DocumentNotFoundError, HTTPException):
+        raise
+    except Exception as e:
+        if _is_auth_error(e):
+            logger.warning(f"Token 认证失败，需要重新登录: {e}")
+            raise AuthenticationError("登录已过期，请重新登录")
+        raise ProcessingError(f"获取OCR结果失败: {str(e)}")
+
+
 @router.get("/")
 async def list_documents(
     page: int = 1,
@@ -292,6 +330,9 @@ async def delete_document(
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
         
+        # 删除 OCR 产物
+        ocr_service.artifacts.delete(document_id)
+        
         # 删除数据库记录
         user_client.table("documents").delete().eq("id", document_id).execute()
         
@@ -6,33 +6,46 @@ from datetime import datetime
 
 from config.settings import settings
 from services.ocr_service import ocr_service
+from services.llm_cache import llm_cache
+from services.doc_classifier import doc_classifier
+from services.readiness import STATE_FAILED, readiness
 
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
-    """健康检查接口"""
+    """健康检查接口（不等待后台加载的组件，立即返回各组件状态）"""
+    components = readiness.status()
+    if readiness.all_ready:
+        status = "healthy"
+    elif any(component["state"] == STATE_FAILED for component in components.values()):
+        status = "degraded"
+    else:
+        status = "starting"
+    
     return {
-        "status": "healthy",
+        "status": status,
         "app": settings.APP_NAME,
         "timestamp": datetime.now().isoformat(),
         "services": {
-            "ocr": "ready" if ocr_service.ocr_engine else "not_initialized",
+            "ocr": "ready" if ocr_service.is_ready else "not_initialized",
             "supabase_url": settings.SUPABASE_URL
-        }
+        },
+        "components": components
     }
 
 
 @router.get("/health/ocr")
 async def ocr_health():
     """OCR服务健康检查"""
-    ocr_ready = ocr_service.ocr_engine is not None
+    ocr_ready = ocr_service.is_ready
     models_exist = settings.validate_ocr_models()
     
     return {
         "service": "ocr",
         "status": "ready" if ocr_ready else "not_initialized",
+        **(await ocr_service.stats()),
         "models_exist": models_exist,
         "models": {
             "det": settings.OCR_DET_MODEL_PATH,
@@ -43,6 +56,30 @@ async def ocr_health():
     }
 
 
+@router.get("/health/llm")
+async def llm_health():
+    """LLM 配置与响应缓存命中统计"""
+    return {
+        "service": "llm",
+        "model": settings.LLM_MODEL_ID,
+        "temperature": settings.llm_temperature,
+        "deterministic": settings.LLM_DETERMINISTIC,
+        "cache": llm_cache.stats() if llm_cache is not None and settings.llm_temperature == 0 else None,
+        "local_classifier": doc_classifier.stats() if settings.DOC_CLASSIFIER_ENABLED else None
+    }
+
+
+@router.get("/health/pipeline")
+async def pipeline_health():
+    """文档处理流水线状态：各阶段队列深度、忙碌 worker 数、利用率"""
+    if not settings.PIPELINE_ENABLED:
+        return {"service": "pipeline", "status": "disabled"}
+    if not readiness.is_ready("pipeline"):
+        return {"service": "pipeline", "status": readiness.status()["pipeline"]["state"]}
+    pipeline = await readiness.get("pipeline")
+    return {"service": "pipeline", "status": "ready", **pipeline.stats()}
+
+
 @router.get("/health/config")
 async def config_check():
     """配置检查接口"""
@@ -56,8 +93,3 @@ async def config_check():
         "max_file_size": settings.MAX_FILE_SIZE,
         "allowed_extensions": settings.allowed_extensions_list
     }
-
-
-
-
-
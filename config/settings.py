@@ -3,8 +3,9 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 import os
+import json
 
 
 class Settings(BaseSettings):
@@ -32,6 +33,23 @@ class Settings(BaseSettings):
     LLM_API_KEY: str = ""
     LLM_BASE_URL: str = "https://api.openai.com/v1"
     LLM_TEMPERATURE: float = 0.7
+    LLM_DETERMINISTIC: bool = False  # 确定性模式：忽略 LLM_TEMPERATURE 使用 0，相同 Prompt 结果稳定，响应可缓存
+    
+    # ============ 自动分类工作流（租户 workflow_mode 未配置时的默认模式） ============
+    WORKFLOW_MODE_DEFAULT: str = "two_step"  # two_step: 先分类再提取；single_call: 一次 LLM 调用完成分类和提取
+    
+    # ============ 本地文档分类器（python -m services.doc_classifier 训练，置信度足够时跳过分类LLM调用） ============
+    DOC_CLASSIFIER_ENABLED: bool = True
+    DOC_CLASSIFIER_DIR: str = "./data/doc_classifiers"
+    DOC_CLASSIFIER_MIN_CONFIDENCE: float = 0.3   # (最高相似度 - 次高相似度) / 最高相似度
+    DOC_CLASSIFIER_MIN_SIMILARITY: float = 0.2   # 最高相似度下限，低于此值视为未见过的文档
+    DOC_CLASSIFIER_MIN_DOCS: int = 20            # 租户训练所需的最少历史文档数
+    
+    # ============ LLM响应缓存（仅确定性调用，相同 Prompt 直接返回本地结果） ============
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./cache/llm/responses.sqlite3"
+    LLM_CACHE_TTL_HOURS: float = 168.0  # 条目有效期（0 表示永不过期）
+    LLM_CACHE_MAX_MB: int = 256
     
     # ============ OCR模型路径 ============
     OCR_DET_MODEL_PATH: str = "./model/PP-OCRv5_server_det_infer"
@@ -39,6 +57,88 @@ class Settings(BaseSettings):
     OCR_ORI_MODEL_PATH: str = "./model/PP-LCNet_x1_0_textline_ori_infer"
     OCR_DOC_MODEL_PATH: str = "./model/PP-LCNet_x1_0_doc_ori_infer"
     
+    # ============ OCR分级识别（mobile 优先，低置信度页升级 server） ============
+    OCR_TIERED_ENABLED: bool = False
+    OCR_MOBILE_DET_MODEL_PATH: str = "./model/PP-OCRv5_mobile_det_infer"
+    OCR_MOBILE_REC_MODEL_PATH: str = "./model/PP-OCRv5_mobile_rec_infer"
+    OCR_TIER_CONFIDENCE_THRESHOLD: float = 0.85  # 页平均置信度低于此值时用 server 模型重识别
+    OCR_TIER_MAX_LOW_LINE_RATIO: float = 0.2     # 低置信度行占比超过此值时用 server 模型重识别
+    
+    # ============ OCR引擎配置档（租户/模板按名称选择，首次使用时加载） ============
+    # JSON: {"en": {"lang": "en", "rec_model_dir": "./model/en_rec", "det_limit_side_len": 1280}}
+    OCR_ENGINE_PROFILES: str = ""
+    OCR_ENGINE_MAX_RESIDENT: int = 2      # 配置档引擎最多常驻数，超出按 LRU 淘汰
+    OCR_ENGINE_MEMORY_BUDGET_MB: int = 0  # 配置档引擎内存预算（按模型文件大小估算，0 表示不限）
+    
+    # ============ OCR并发配置 ============
+    OCR_POOL_SIZE: int = 0  # OCR引擎进程池大小（0 表示单进程线程模式，建议设为物理核数）
+    OCR_MAX_INFLIGHT_PAGES_PER_DOC: int = 4  # 进程池模式下单个文档最多同时识别的页数
+    OCR_BATCH_CONCURRENCY: int = 4           # 批量处理时最多同时处理的文档数
+    OCR_BATCH_ITEM_TIMEOUT: float = 300.0    # 批量处理时单个文档超时秒数（0 表示不限）
+    
+    # ============ 文档处理流水线（后台任务按 OCR→分类→提取→持久化 分阶段排队，各阶段独立并发） ============
+    PIPELINE_ENABLED: bool = False         # 默认关闭：后台任务直接执行工作流，验证稳定后再开启
+    PIPELINE_QUEUE_SIZE: int = 64          # 每个阶段的队列容量，满时上游阶段等待
+    PIPELINE_OCR_WORKERS: int = 2          # 受 CPU 限制，建议与 OCR_POOL_SIZE 一致
+    PIPELINE_CLASSIFY_WORKERS: int = 8     # 受 LLM 接口延迟和限流限制
+    PIPELINE_EXTRACT_WORKERS: int = 8
+    PIPELINE_PERSIST_WORKERS: int = 4      # 受数据库往返限制
+    
+    # ============ OCR服务进程（多个 API worker 共享，python -m services.ocr_server 启动） ============
+    OCR_SERVER_SOCKET: str = ""         # Unix socket 路径；设置后 API 进程不加载模型，OCR 转发到服务进程
+    OCR_SERVER_TIMEOUT: float = 600.0   # 转发到服务进程的单个请求超时秒数（0 表示不限）
+    
+    # ============ OCR识别合批（线程模式下合并并发文档的文本行一起识别） ============
+    OCR_REC_BATCHING_ENABLED: bool = False
+    OCR_REC_BATCH_MAX_SIZE: int = 32     # 单批最多识别的文本行数
+    OCR_REC_BATCH_MAX_WAIT_MS: int = 20  # 凑批最长等待时间（毫秒）
+    
+    # ============ OCR自动调优（python -m services.ocr_tuner 可单独执行） ============
+    OCR_AUTOTUNE_ENABLED: bool = False  # 启动时加载调优结果，本机无结果时现场调优
+    OCR_AUTOTUNE_PROFILE_PATH: str = "./data/ocr_tuning.json"
+    OCR_AUTOTUNE_ACCURACY_FLOOR: float = 0.9  # 候选配置在校准集上的最低识别精度
+    OCR_AUTOTUNE_REPEATS: int = 2              # 每个候选重复识别校准集的次数
+    
+    # ============ PDF文本层快速通道 ============
+    OCR_TEXT_LAYER_ENABLED: bool = True       # 数字生成的PDF优先读取内嵌文本，跳过OCR
+    OCR_TEXT_LAYER_MIN_CHARS: int = 20        # 单页文本层最少字符数（低于则视为扫描页）
+    OCR_TEXT_LAYER_MIN_QUALITY: float = 0.9   # 有效字符占比下限（低于则视为乱码）
+    
+    # ============ 图片预处理（EXIF转正、缩放、纠偏、对比度归一化） ============
+    OCR_PREPROCESS_ENABLED: bool = False         # 会改变识别输入，默认关闭，需先在样本集上对比准确率再开启
+    OCR_PREPROCESS_MAX_SIDE: int = 2000          # 缩放后长边像素上限（与 PDF 栅格化上限一致）
+    OCR_PREPROCESS_DESKEW: bool = True
+    OCR_PREPROCESS_MAX_SKEW_DEG: float = 15.0    # 纠偏最大角度
+    OCR_PREPROCESS_CONTRAST: bool = True
+    OCR_PREPROCESS_CACHE_DIR: str = "./cache/preprocess"
+    OCR_PREPROCESS_CACHE_MAX_MB: int = 1024
+    
+    # ============ 条码识别（一维条码/二维码，与OCR并行） ============
+    OCR_BARCODE_ENABLED: bool = True
+    OCR_BARCODE_MAX_PAGES: int = 2  # 只解码前几页（运单号、报告编号通常在首页）
+    
+    # ============ OCR页面筛选（OCR前跳过空白页，模板可配置页面选择规则） ============
+    OCR_SKIP_BLANK_PAGES: bool = True
+    OCR_BLANK_PAGE_INK_RATIO: float = 0.002       # 缩略图深色像素占比低于此值视为空白页
+    OCR_PAGE_SELECT_KEYWORD_BAND: float = 0.3     # 无文本层的页按关键字筛选时，快速识别页面顶部的高度比例
+    
+    # ============ OCR结果缓存 ============
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "./cache/ocr"
+    OCR_CACHE_MAX_MB: int = 512  # 缓存总大小上限，超出按 LRU 淘汰
+    OCR_PAGE_CACHE_ENABLED: bool = True  # 按页缓存（页栅格哈希），重发的 PDF 只重新识别变化的页
+    OCR_PAGE_CACHE_DIR: str = "./cache/ocr_pages"
+    OCR_PAGE_CACHE_MAX_MB: int = 1024
+    
+    # ============ LLM输入文本压缩（去页眉页脚、页码、模板固定文字，全角转半角） ============
+    LLM_TEXT_COMPACTION_ENABLED: bool = True
+    LLM_TEXT_COMPACTION_REPEAT_RATIO: float = 0.5  # 页首/页尾相同行出现在至少该比例的页时视为页眉页脚
+    LLM_TEXT_COMPACTION_EDGE_LINES: int = 3        # 每页页首/页尾各多少行参与页眉页脚、页码判断
+    
+    # ============ OCR产物存储（按文档保存文本、行坐标、置信度） ============
+    OCR_ARTIFACT_DIR: str = "./data/ocr_artifacts"
+    OCR_ARTIFACT_ZSTD_LEVEL: int = 3
+    
     # ============ 文件存储 ============
     UPLOAD_FOLDER: str = "./uploads"
     MAX_FILE_SIZE: int = 20971520  # 20MB
@@ -69,6 +169,21 @@ class Settings(BaseSettings):
         """获取CORS允许的源列表"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
     
+    @property
+    def ocr_engine_profiles(self) -> Dict[str, Dict[str, Any]]:
+        """获取OCR引擎配置档 {名称: PaddleOCR 构造参数覆盖}"""
+        if not self.OCR_ENGINE_PROFILES.strip():
+            return {}
+        profiles = json.loads(self.OCR_ENGINE_PROFILES)
+        if not isinstance(profiles, dict) or not all(isinstance(v, dict) for v in profiles.values()):
+            raise ValueError("OCR_ENGINE_PROFILES 格式应为 {名称: {参数: 值}}")
+        return profiles
+    
+    @property
+    def llm_temperature(self) -> float:
+        """实际使用的 LLM temperature（确定性模式下为 0）"""
+        return 0.0 if self.LLM_DETERMINISTIC else self.LLM_TEMPERATURE
+    
     @property
     def allowed_hosts_list(self) -> List[str]:
         """获取允许的主机列表"""
@@ -0,0 +1,335 @@
+# services/doc_classifier.py
+"""本地文档分类器 - 字符 n-gram TF-IDF，置信度足够时跳过分类 LLM 调用
+
+每个租户用已审核完成的历史文档（documents.ocr_text + document_type）训练一个模型：
+文档按字符 2~3-gram 计算 TF-IDF 向量，每个文档类型取向量均值作为类中心，
+预测时取余弦相似度最高的类中心。
+
+置信度 = (最高相似度 - 次高相似度) / 最高相似度，衡量与其他类型的区分度；
+同时要求最高相似度不低于下限，避免把从未见过的文档硬归到某一类。
+置信度不足时由调用方回退到 LLM 分类。
+
+命令行用法（重新训练，模型保存后运行中的服务自动加载）:
+    python -m services.doc_classifier [--tenant TENANT_ID] [--limit 5000]
+"""
+
+import os
+import json
+import math
+import time
+import asyncio
+import argparse
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+
+from config.settings import settings
+from services.text_compactor import normalize_line
+
+
+MODEL_VERSION = 1
+
+NGRAM_RANGE = (2, 3)
+
+
+def char_ngrams(text: str, max_chars: int = 0) -> Counter:
+    """文本的字符 n-gram 计数（全角转半角、去空白、英文小写）"""
+    text = "".join(normalize_line(text).split()).lower()
+    if max_chars:
+        text = text[:max_chars]
+    grams: Counter = Counter()
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {g: w / norm for g, w in vector.items()} if norm else {}
+
+
+class NgramClassifier:
+    """字符 n-gram TF-IDF 最近类中心分类器
+
+    Args:
+        max_features: 保留的 n-gram 数上限（按文档频率取前 N 个）
+        max_chars: 每个文档参与计算的字符数上限（文档开头通常已包含标题等区分性内容）
+    """
+
+    def __init__(self, max_features: int = 20000, max_chars: int = 3000):
+        self.max_features = max_features
+        self.max_chars = max_chars
+        self.idf: Dict[str, float] = {}
+        self.centroids: Dict[str, Dict[str, float]] = {}
+        self.label_counts: Dict[str, int] = {}
+        # 训练时租户的自动分类候选类型（模板 code），为 None 时不限制
+        self.candidates: Optional[List[str]] = None
+
+    def _vectorize(self, grams: Counter) -> Dict[str, float]:
+        """次线性 TF × IDF，L2 归一化（未登录的 n-gram 忽略）"""
+        return _normalize({
+            g: (1.0 + math.log(count)) * self.idf[g]
+            for g, count in grams.items() if g in self.idf
+        })
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str]) -> "NgramClassifier":
+        """训练模型"""
+        docs = [char_ngrams(text, self.max_chars) for text in texts]
+        df: Counter = Counter()
+        for grams in docs:
+            df.update(grams.keys())
+
+        # 只出现在一个文档中的 n-gram（编号、日期等）没有泛化价值
+        min_df = 2 if len(docs) >= 10 else 1
+        kept = [g for g, count in df.most_common() if count >= min_df][:self.max_features]
+        n_docs = len(docs)
+        self.idf = {g: math.log((1 + n_docs) / (1 + df[g])) + 1.0 for g in kept}
+
+        sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.label_counts = dict(Counter(labels))
+        for grams, label in zip(docs, labels):
+            for g, w in self._vectorize(grams).items():
+                sums[label][g] += w
+        self.centroids = {label: _normalize(dict(vector)) for label, vector in sums.items()}
+        return self
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        """各类型的余弦相似度，从高到低排序"""
+        vector = self._vectorize(char_ngrams(text, self.max_chars))
+        scores = [
+            (label, sum(w * centroid.get(g, 0.0) for g, w in vector.items()))
+            for label, centroid in self.centroids.items()
+        ]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, float]:
+        """预测文档类型
+
+        Returns:
+            (类型, 置信度, 最高相似度)，模型为空时类型为 None
+        """
+        scores = self.scores(text)
+        if not scores:
+            return None, 0.0, 0.0
+        label, best = scores[0]
+        second = scores[1][1] if len(scores) > 1 else 0.0
+        confidence = (best - second) / best if best > 0 else 0.0
+        return label, confidence, best
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MODEL_VERSION,
+            "ngram_range": list(NGRAM_RANGE),
+            "max_features": self.max_features,
+            "max_chars": self.max_chars,
+            "label_counts": self.label_counts,
+            "idf": self.idf,
+            "centroids": self.centroids,
+            "candidates": self.candidates,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NgramClassifier":
+        if data.get("version") != MODEL_VERSION or tuple(data.get("ngram_range", ())) != NGRAM_RANGE:
+            raise ValueError(f"分类器模型版本不兼容: {data.get('version')}")
+        model = cls(max_features=data["max_features"], max_chars=data["max_chars"])
+        model.idf = data["idf"]
+        model.centroids = data["centroids"]
+        model.label_counts = data["label_counts"]
+        model.candidates = data.get("candidates")
+        return model
+
+
+class DocumentClassifier:
+    """按租户加载本地分类模型（模型文件更新后自动重新加载）
+
+    Args:
+        model_dir: 模型目录，每个租户一个 {tenant_id}.json
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        # tenant_id -> (模型文件 mtime, 模型)；无模型的租户缓存为 (None, None)
+        self._models: Dict[str, Tuple[Optional[float], Optional[NgramClassifier]]] = {}
+        self._checked: Dict[str, float] = {}
+        self.hits = 0
+        self.fallbacks = 0
+
+    def model_path(self, tenant_id: str) -> str:
+        return os.path.join(self.model_dir, f"{tenant_id}.json")
+
+    def _get_model(self, tenant_id: str) -> Optional[NgramClassifier]:
+        """获取租户模型（每 30 秒最多检查一次模型文件是否更新）"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._models.get(tenant_id)
+            if cached is not None and now - self._checked.get(tenant_id, 0.0) < 30:
+                return cached[1]
+            self._checked[tenant_id] = now
+
+            path = self.model_path(tenant_id)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                self._models[tenant_id] = (None, None)
+                return None
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    model = NgramClassifier.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"本地分类模型加载失败: {path} - {e}")
+                model = None
+            else:
+                logger.info(f"本地分类模型已加载: 租户 {tenant_id}，类型 {list(model.centroids)}")
+            self._models[tenant_id] = (mtime, model)
+            return model
+
+    async def predict(self, tenant_id: str, text: str) -> Optional[Dict[str, Any]]:
+        """预测文档类型，置信度不足、类型不在训练时的候选类型中或租户没有模型时返回 None
+
+        模型文件在线程中检查和加载，不阻塞事件循环
+
+        Args:
+            tenant_id: 租户ID
+            text: 文档文本
+
+        Returns:
+            {"document_type", "confidence", "similarity"} 或 None
+        """
+        if not text:
+            return None
+        model = await asyncio.to_thread(self._get_model, tenant_id)
+        if model is None:
+            return None
+        label, confidence, similarity = model.predict(text)
+        if (
+            label is None
+            or confidence < settings.DOC_CLASSIFIER_MIN_CONFIDENCE
+            or similarity < settings.DOC_CLASSIFIER_MIN_SIMILARITY
+            or (model.candidates is not None and label not in model.candidates)
+        ):
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return {"document_type": label, "confidence": round(confidence, 4), "similarity": round(similarity, 4)}
+
+    def save(self, tenant_id: str, model: NgramClassifier, meta: Dict[str, Any]) -> str:
+        """保存租户模型（原子替换）"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        path = self.model_path(tenant_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**model.to_dict(), **meta}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        """本地分类命中统计（本进程）"""
+        total = self.hits + self.fallbacks
+        return {
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def evaluate(texts: Sequence[str], labels: Sequence[str], folds: int = 5) -> Dict[str, Any]:
+    """交叉验证：在各置信度阈值下的覆盖率（本地分类占比）和准确率，用于选择阈值"""
+    predictions = []
+    for fold in range(folds):
+        train = [i for i in range(len(texts)) if i % folds != fold]
+        test = [i for i in range(len(texts)) if i % folds == fold]
+        if not train or not test or len({labels[i] for i in train}) < 2:
+            continue
+        model = NgramClassifier().fit([texts[i] for i in train], [labels[i] for i in train])
+        for i in test:
+            label, confidence, similarity = model.predict(texts[i])
+            predictions.append((label == labels[i], confidence, similarity))
+
+    report = {"samples": len(predictions), "thresholds": []}
+    for threshold in (0.1, 0.2, 0.3, 0.4, 0.5):
+        accepted = [
+            correct for correct, confidence, similarity in predictions
+            if confidence >= threshold and similarity >= settings.DOC_CLASSIFIER_MIN_SIMILARITY
+        ]
+        report["thresholds"].append({
+            "min_confidence": threshold,
+            "coverage": round(len(accepted) / len(predictions), 4) if predictions else 0.0,
+            "accuracy": round(sum(accepted) / len(accepted), 4) if accepted else None,
+        })
+    return report
+
+
+async def train(tenant_id: Optional[str] = None, limit: int = 5000) -> Dict[str, Any]:
+    """用已审核完成的历史文档训练（指定租户或全部租户），返回各租户训练结果"""
+    from services.supabase_service import supabase_service
+    from services.template_service import template_service
+
+    documents = await supabase_service.list_classified_documents(tenant_id, limit)
+    by_tenant: Dict[str, Tuple[List[str], List[str]]] = defaultdict(lambda: ([], []))
+    for document in documents:
+        text, label = document.get("ocr_text"), document.get("document_type")
+        if not text or not label or not document.get("tenant_id"):
+            continue
+        # 分类结果的中文名和模板 code 归为同一类型
+        label = template_service.DOC_TYPE_TO_CODE.get(label, label)
+        by_tenant[document["tenant_id"]][0].append(text)
+        by_tenant[document["tenant_id"]][1].append(label)
+
+    results = {}
+    for tid, (texts, labels) in by_tenant.items():
+        # 只学习租户自动分类的候选类型：指定模板上传的文档、合并报告等类型不参与训练
+        candidates = {t.get("code") for t in await template_service.get_candidate_templates(tid)}
+        samples = [(text, label) for text, label in zip(texts, labels) if label in candidates]
+        if len(samples) < len(texts):
+            logger.info(f"租户 {tid} 跳过 {len(texts) - len(samples)} 份非自动分类候选类型的文档")
+        texts, labels = [text for text, _ in samples], [label for _, label in samples]
+        counts = Counter(labels)
+        if len(counts) < 2 or len(texts) < settings.DOC_CLASSIFIER_MIN_DOCS:
+            logger.warning(f"租户 {tid} 训练样本不足（{len(texts)} 份，{len(counts)} 类），跳过")
+            results[tid] = {"trained": False, "documents": len(texts), "labels": dict(counts)}
+            continue
+
+        start = time.perf_counter()
+        model = NgramClassifier().fit(texts, labels)
+        model.candidates = sorted(candidates)
+        report = evaluate(texts, labels)
+        path = doc_classifier.save(tid, model, {
+            "tenant_id": tid,
+            "trained_at": datetime.now().isoformat(),
+            "documents": len(texts),
+            "evaluation": report,
+        })
+        logger.info(f"✓ 租户 {tid} 分类模型已保存: {path}（{len(texts)} 份，{time.perf_counter() - start:.1f}s）")
+        results[tid] = {"trained": True, "documents": len(texts), "labels": dict(counts), "evaluation": report}
+    return results
+
+
+# 单例实例
+doc_classifier = DocumentClassifier(settings.DOC_CLASSIFIER_DIR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NeoFlow 本地文档分类器训练")
+    parser.add_argument("--tenant", default=None, help="只训练指定租户（默认全部租户）")
+    parser.add_argument("--limit", type=int, default=5000, help="最多读取的历史文档数")
+    args = parser.parse_args()
+
+    async def run():
+        from services.supabase_service import supabase_service
+        await supabase_service.initialize()
+        return await train(args.tenant, args.limit)
+
+    results = asyncio.run(run())
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# services/image_preprocess.py
+"""图片预处理 - OCR 前对手机拍照等图片做归一化
+
+快递面单等手机照片通常是 1200 万像素、带倾斜、依赖 EXIF 方向标记的 JPEG，
+直接送入 PaddleOCR 既慢又容易漏检。预处理依次执行（全部为 NumPy/OpenCV 数组运算）：
+
+1. EXIF 方向：按方向标记旋转为正向，方向已知时可跳过方向分类
+2. 缩放：长边缩放到目标像素（与 PDF 栅格化上限一致）
+3. 纠偏：投影轮廓法估计文本倾角并旋转校正
+4. 对比度归一化：LAB 亮度通道 CLAHE
+
+归一化后的图片按 "文件哈希 + 预处理配置" 缓存到磁盘，重复处理直接复用。
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Tuple
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from loguru import logger
+
+from services.ocr_cache import config_digest, file_sha256
+
+
+# EXIF Orientation 标记
+_EXIF_ORIENTATION_TAG = 0x0112
+
+# 预处理各步骤名称（用于耗时统计）
+STEPS = ("decode", "downscale", "deskew", "contrast", "encode")
+
+
+def load_oriented(file_path: str) -> Tuple[np.ndarray, bool]:
+    """读取图片并按 EXIF 方向转正，返回 (BGR 图像, 方向是否已知)"""
+    with Image.open(file_path) as im:
+        orientation = im.getexif().get(_EXIF_ORIENTATION_TAG)
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        img = cv2.cvtColor(np.asarray(im), cv2.COLOR_RGB2BGR)
+    return img, orientation is not None
+
+
+def downscale(img: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    """长边超过 max_side 时等比缩小，返回 (图像, 缩放比例)"""
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return img, 1.0
+    resized = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def estimate_skew(gray: np.ndarray, max_angle: float) -> float:
+    """估计纠偏角度（度，可直接传给 rotate）
+
+    投影轮廓法：在缩小的二值图上尝试各候选角度，文本行对齐水平时
+    行投影的相邻差分能量最大；先 1° 粗搜，再在最优值附近 0.1° 细搜。
+    """
+    scale = 800 / max(gray.shape[:2])
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    if binary.mean() < 0.001:
+        return 0.0
+
+    h, w = binary.shape
+    center = (w / 2, h / 2)
+
+    def score(angle: float) -> float:
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST)
+        profile = rotated.sum(axis=1, dtype=np.float64)
+        return float(np.sum(np.diff(profile) ** 2))
+
+    coarse = np.arange(-max_angle, max_angle + 1e-6, 1.0)
+    best = max(coarse, key=score)
+    fine = np.arange(best - 1.0, best + 1.0 + 1e-6, 0.1)
+    return float(max(fine, key=score))
+
+
+def rotate(img: np.ndarray, angle: float) -> np.ndarray:
+    """绕中心旋转（扩展画布避免裁掉四角，空白处填白）"""
+    h, w = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_w, new_h = int(h * sin + w * cos), int(h * cos + w * sin)
+    matrix[0, 2] += new_w / 2 - w / 2
+    matrix[1, 2] += new_h / 2 - h / 2
+    return cv2.warpAffine(img, matrix, (new_w, new_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=(255, 255, 255))
+
+
+def normalize_contrast(img: np.ndarray, clip_limit: float = 2.0) -> np.ndarray:
+    """LAB 亮度通道 CLAHE，改善阴影、反光造成的局部低对比度"""
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
+    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+class ImagePreprocessor:
+    """图片预处理阶段（带磁盘缓存和分步耗时统计）
+
+    Args:
+        cache_dir: 归一化图片缓存目录
+        max_side: 缩放后的长边像素上限
+        deskew: 是否纠偏
+        max_skew: 纠偏的最大角度（超过视为版式本身的斜线，不校正）
+        contrast: 是否做对比度归一化
+        max_cache_bytes: 缓存目录大小上限
+    """
+
+    def __init__(self, cache_dir: str, max_side: int = 2000, deskew: bool = True,
+                 max_skew: float = 15.0, contrast: bool = True, max_cache_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.max_side = max_side
+        self.deskew = deskew
+        self.max_skew = max_skew
+        self.contrast = contrast
+        self.max_cache_bytes = max_cache_bytes
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._cache_hits = 0
+        self._step_ms: Dict[str, float] = {step: 0.0 for step in STEPS}
+        self._writes_since_prune = 0
+
+    def config(self) -> Dict[str, Any]:
+        """参与缓存键计算的预处理配置"""
+        return {
+            "max_side": self.max_side,
+            "deskew": self.deskew,
+            "max_skew": self.max_skew,
+            "contrast": self.contrast,
+        }
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.png", f"{base}.json"
+
+    def prepare(self, file_path: str) -> Tuple[str, Dict[str, Any]]:
+        """预处理图片，返回 (归一化图片路径, 预处理信息)
+
+        预处理信息: {"orientation_known", "scale", "skew", "size", "cached"}
+        """
+        key = f"{file_sha256(file_path)}-{config_digest(self.config())}"
+        image_path, meta_path = self._paths(key)
+
+        if os.path.exists(image_path) and os.path.exists(meta_path):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                os.utime(image_path)
+                with self._lock:
+                    self._cache_hits += 1
+                return image_path, {**meta, "cached": True}
+            except (OSError, json.JSONDecodeError):
+                pass
+
+        timings: Dict[str, float] = {}
+
+        def timed(step: str, start: float) -> float:
+            now = time.perf_counter()
+            timings[step] = (now - start) * 1000
+            return now
+
+        start = time.perf_counter()
+        img, orientation_known = load_oriented(file_path)
+        start = timed("decode", start)
+
+        img, scale = downscale(img, self.max_side)
+        start = timed("downscale", start)
+
+        skew = 0.0
+        if self.deskew:
+            skew = estimate_skew(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), self.max_skew)
+            # 小于半度的倾斜对识别几乎没有影响，不做旋转以免引入插值模糊
+            if abs(skew) >= 0.5:
+                img = rotate(img, skew)
+            else:
+                skew = 0.0
+        start = timed("deskew", start)
+
+        if self.contrast:
+            img = normalize_contrast(img)
+        start = timed("contrast", start)
+
+        meta = {
+            "orientation_known": orientation_known,
+            "scale": round(scale, 4),
+            "skew": round(skew, 2),
+            "size": [int(img.shape[1]), int(img.shape[0])],
+        }
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        tmp_path = f"{image_path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+        cv2.imwrite(tmp_path, img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        os.replace(tmp_path, image_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        timed("encode", start)
+
+        with self._lock:
+            self._processed += 1
+            for step, ms in timings.items():
+                self._step_ms[step] += ms
+            self._writes_since_prune += 1
+            prune = self.max_cache_bytes > 0 and self._writes_since_prune >= 50
+            if prune:
+                self._writes_since_prune = 0
+        if prune:
+            self._prune()
+
+        logger.debug(
+            f"图片预处理完成: {file_path} 缩放{scale:.2f} 纠偏{skew:.1f}° "
+            f"耗时{sum(timings.values()):.0f}ms"
+        )
+        return image_path, {**meta, "cached": False}
+
+    def _prune(self) -> None:
+        """缓存目录超过上限时按访问时间删除最旧的图片"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".png"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_cache_bytes:
+                break
+            for stale in (path, path[:-len(".png")] + ".json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """预处理运行统计（各步骤平均耗时）"""
+        with self._lock:
+            processed = self._processed
+            return {
+                "processed": processed,
+                "cache_hits": self._cache_hits,
+                "avg_step_ms": {
+                    step: round(ms / processed, 2) if processed else 0.0
+                    for step, ms in self._step_ms.items()
+                },
+            }
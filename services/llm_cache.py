@@ -0,0 +1,186 @@
+# services/llm_cache.py
+"""LLM 响应缓存 - 相同 Prompt 直接返回本地结果，跳过远程调用
+
+缓存键 = 模型ID + 接口地址 + temperature + Prompt 的 SHA-256。
+文档重新处理、重复上传、重放 /process-text 时 Prompt 完全相同，命中后省去数秒的 LLM 往返。
+
+只有确定性调用（temperature=0）才缓存：采样调用每次结果本就不同，缓存会固化某一次的随机结果。
+
+后端为本地 SQLite 文件（多个 uvicorn worker 可共享），条目超过 TTL 视为失效，
+总大小超出上限时按最近访问时间淘汰。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+from loguru import logger
+
+from config.settings import settings
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+def prompt_key(model: str, base_url: str, temperature: float, prompt: str) -> str:
+    """生成缓存键（Prompt 只参与哈希，不以明文出现在键中）"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "base_url": base_url,
+            "temperature": temperature,
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM 响应的 SQLite 缓存（带 TTL、大小受限的 LRU，线程安全）
+
+    Args:
+        db_path: SQLite 文件路径
+        max_bytes: 响应总大小上限
+        ttl_seconds: 条目有效期（0 表示永不过期）
+    """
+
+    def __init__(self, db_path: str, max_bytes: int, ttl_seconds: float = 0):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时打开数据库（调用方需持有锁）"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            # WAL：多个 worker 进程并发读写同一个缓存文件
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed ON llm_responses (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，命中时刷新访问时间；过期条目删除并视为未命中"""
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    conn.commit()
+                    self.expired += 1
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM 缓存读取失败: {key[:12]} - {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """写入缓存，超出容量时先清理过期条目，再按最近访问时间淘汰"""
+        size = len(response.encode("utf-8"))
+        if not response or size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, size, now, now)
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+                if total > self.max_bytes and self.ttl_seconds:
+                    self.expired += conn.execute(
+                        "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+                    ).rowcount
+                    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+                while total > self.max_bytes:
+                    oldest = conn.execute(
+                        "SELECT key, size FROM llm_responses WHERE key != ? ORDER BY accessed_at LIMIT 64", (key,)
+                    ).fetchall()
+                    if not oldest:
+                        break
+                    for old_key, old_size in oldest:
+                        if total <= self.max_bytes:
+                            break
+                        conn.execute("DELETE FROM llm_responses WHERE key = ?", (old_key,))
+                        total -= old_size
+                        self.evictions += 1
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM 缓存写入失败: {key[:12]} - {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计（命中数为本进程计数，条目数和大小为整个缓存文件）"""
+        lookups = self.hits + self.misses
+        entries, size = None, None
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    entries, size = self._conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+                    ).fetchone()
+                except sqlite3.Error:
+                    pass
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 单例实例（未启用时为 None）
+llm_cache: Optional[LLMResponseCache] = (
+    LLMResponseCache(
+        settings.LLM_CACHE_PATH,
+        settings.LLM_CACHE_MAX_MB * 1024 * 1024,
+        settings.LLM_CACHE_TTL_HOURS * 3600,
+    )
+    if settings.LLM_CACHE_ENABLED else None
+)
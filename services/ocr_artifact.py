@@ -0,0 +1,239 @@
+# services/ocr_artifact.py
+"""OCR 产物存储 - 按文档持久化 OCR 文本、行坐标和置信度
+
+每个文档一个 zstd 压缩文件，内部为 npz 数组容器：
+- boxes:        (N, 4, 2) float32  每行四点坐标（栅格化像素坐标系）
+- confidences:  (N,)      float32  每行置信度
+- pages:        (N,)      int16    每行所在页码（从1开始）
+- text_bytes:   UTF-8 编码的全部行文本拼接
+- text_offsets: (N+1,)    int32    各行在 text_bytes 中的起止偏移
+- meta:         JSON 元信息（置信度、来源、页数等）
+
+加载是惰性的：load() 只返回句柄，首次访问属性时才读盘解压，
+工作流、审核页面和重新提取任务都可以直接读取，无需重新 OCR 或查询大字段。
+"""
+
+import io
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import zstandard
+from loguru import logger
+
+
+ARTIFACT_VERSION = 1
+
+
+def ocr_scope(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """OCR 结果或产物元信息的识别范围
+
+    只识别了模板区域、或按模板规则/关键字跳过了页面时，文本不是整篇文档的文本。
+    区域内未识别到文本而回退整页识别时，记录请求的区域并带 fallback 标记。
+
+    Returns:
+        {"regions": ..., "page_selection": ...[, "fallback": True]}，整篇识别时返回 None
+    """
+    regions = record.get("regions") or None
+    page_selection = record.get("page_selection") or None
+    if regions is None and page_selection is None:
+        return None
+    scope = {"regions": regions, "page_selection": page_selection}
+    if regions is not None and record.get("regions_fallback"):
+        scope["fallback"] = True
+    return scope
+
+
+def is_full_document(scope: Optional[Dict[str, Any]]) -> bool:
+    """识别范围是否覆盖整篇文档（区域回退整页且未按页筛选时也是整篇文本）"""
+    return scope is None or (bool(scope.get("fallback")) and scope.get("page_selection") is None)
+
+
+def scope_matches(
+    scope: Optional[Dict[str, Any]],
+    regions: Optional[List[Dict[str, Any]]],
+    page_selection: Optional[Dict[str, Any]]
+) -> bool:
+    """已有 OCR 文本能否用于指定的识别范围（整篇文本总能复用，部分文本要求范围完全一致）
+
+    区域回退整页的文本是所选页的整页文本，页面选择一致即可复用（与本次是否指定区域无关）。
+    """
+    if is_full_document(scope):
+        return True
+    if scope.get("fallback"):
+        return json.dumps(scope["page_selection"], sort_keys=True) == json.dumps(page_selection or None, sort_keys=True)
+    expected = {"regions": regions or None, "page_selection": page_selection or None}
+    return json.dumps(scope, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+class OCRArtifact:
+    """单个文档的 OCR 产物（惰性加载）"""
+
+    def __init__(self, document_id: str, path: str):
+        self.document_id = document_id
+        self.path = path
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._meta: Optional[Dict[str, Any]] = None
+        self._lines: Optional[List[str]] = None
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        """首次访问时读盘并解压"""
+        if self._arrays is None:
+            with open(self.path, "rb") as f:
+                raw = zstandard.ZstdDecompressor().decompress(f.read())
+            with np.load(io.BytesIO(raw), allow_pickle=False) as data:
+                self._arrays = {key: data[key] for key in data.files}
+        return self._arrays
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """元信息：confidence / source / total_pages / created_at 等"""
+        if self._meta is None:
+            self._meta = json.loads(self._load()["meta"].tobytes().decode("utf-8"))
+        return self._meta
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self._load()["boxes"]
+
+    @property
+    def confidences(self) -> np.ndarray:
+        return self._load()["confidences"]
+
+    @property
+    def pages(self) -> np.ndarray:
+        return self._load()["pages"]
+
+    @property
+    def lines(self) -> List[str]:
+        """按行还原文本"""
+        if self._lines is None:
+            arrays = self._load()
+            text_bytes = arrays["text_bytes"].tobytes()
+            offsets = arrays["text_offsets"]
+            self._lines = [
+                text_bytes[offsets[i]:offsets[i + 1]].decode("utf-8")
+                for i in range(len(offsets) - 1)
+            ]
+        return self._lines
+
+    @property
+    def text(self) -> str:
+        """完整文本（与 process_document 返回的 text 一致）"""
+        return "\n".join(self.lines)
+
+    @property
+    def confidence(self) -> float:
+        return float(self.meta.get("confidence", 0.0))
+
+    @property
+    def scope(self) -> Optional[Dict[str, Any]]:
+        """识别范围（见 ocr_scope），整篇识别时为 None"""
+        return ocr_scope(self.meta)
+
+    def to_result(self) -> Dict[str, Any]:
+        """还原为 OCRService.process_document 的结果格式"""
+        lines = [
+            {
+                "text": text,
+                "confidence": float(score),
+                "box": box.tolist(),
+                "page": int(page),
+            }
+            for text, score, box, page in zip(self.lines, self.confidences, self.boxes, self.pages)
+        ]
+        return {
+            "text": self.text,
+            "confidence": self.confidence,
+            "lines": lines,
+            "total_lines": len(lines),
+            "total_pages": self.meta.get("total_pages", 0),
+            "source": self.meta.get("source", "ocr"),
+        }
+
+
+class OCRArtifactStore:
+    """OCR 产物的本地磁盘存储（按文档ID索引）"""
+
+    def __init__(self, root_dir: str, compression_level: int = 3):
+        self.root_dir = root_dir
+        self.compression_level = compression_level
+
+    def path(self, document_id: str) -> str:
+        return os.path.join(self.root_dir, f"{document_id}.ocr.zst")
+
+    def exists(self, document_id: str) -> bool:
+        return os.path.exists(self.path(document_id))
+
+    def save(self, document_id: str, result: Dict[str, Any]) -> str:
+        """将 OCR 结果序列化为压缩数组文件（原子替换）
+
+        Args:
+            document_id: 文档ID
+            result: OCRService.process_document 的返回结果
+
+        Returns:
+            产物文件路径
+        """
+        lines = result.get("lines", [])
+        encoded = [line.get("text", "").encode("utf-8") for line in lines]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+        boxes = np.zeros((len(lines), 4, 2), dtype=np.float32)
+        for i, line in enumerate(lines):
+            if line.get("box") is not None:
+                boxes[i] = np.asarray(line["box"], dtype=np.float32).reshape(4, 2)
+
+        meta = {
+            "version": ARTIFACT_VERSION,
+            "document_id": document_id,
+            "confidence": float(result.get("confidence", 0.0)),
+            "total_lines": len(lines),
+            "total_pages": result.get("total_pages", 0),
+            "source": result.get("source", "ocr"),
+            # 仅识别了模板区域时记录区域，此类产物不能作为整篇文本复用
+            "regions": result.get("regions"),
+            "regions_fallback": bool(result.get("regions_fallback")),
+            "page_selection": result.get("page_selection"),
+            "page_filter": result.get("page_filter"),
+            "created_at": datetime.now().isoformat(),
+        }
+
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            boxes=boxes,
+            confidences=np.asarray([line.get("confidence", 0.0) for line in lines], dtype=np.float32),
+            pages=np.asarray([line.get("page", 1) for line in lines], dtype=np.int16),
+            text_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            text_offsets=offsets,
+            meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+        )
+        compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(buffer.getvalue())
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self.path(document_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+        logger.debug(f"OCR产物已保存: {document_id}, {len(lines)}行, {len(compressed)}字节")
+        return path
+
+    def load(self, document_id: str) -> Optional[OCRArtifact]:
+        """获取文档的 OCR 产物句柄（不存在时返回 None，数据在首次访问时才读取）"""
+        path = self.path(document_id)
+        if not os.path.exists(path):
+            return None
+        return OCRArtifact(document_id, path)
+
+    def delete(self, document_id: str) -> bool:
+        try:
+            os.remove(self.path(document_id))
+            return True
+        except OSError:
+            return False
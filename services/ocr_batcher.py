@@ -0,0 +1,150 @@
+# services/ocr_batcher.py
+"""文本行识别合批调度 - 合并并发文档的行图像一起识别
+
+多个文档同时上传时，各自的页只有几十行，识别模型的批维度大部分是空的。
+调度器在一个很短的时间窗口内收集各文档检测出的行图像，
+凑成大批次送入识别模型，再把结果按原顺序分发回各自的文档。
+
+- 已攒够 max_batch_size 行时立即提交，否则最多等待 max_wait_ms
+- 识别器同一时刻只跑一个批次（引擎非线程安全），忙碌期间到达的请求自动并入下一批
+"""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+class RecognitionBatcher:
+    """跨文档文本行识别合批器
+
+    Args:
+        recognize_fn: 同步识别函数，输入行图像列表，返回等长的 [(text, score), ...]
+        max_batch_size: 单批最多行数（单个请求超过该值时单独成批）
+        max_wait_ms: 凑批最长等待时间
+    """
+
+    def __init__(self, recognize_fn: Callable[[List[Any]], List[Tuple[str, float]]],
+                 max_batch_size: int = 32, max_wait_ms: int = 20):
+        self.recognize_fn = recognize_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        # 识别专用单线程，保证同一时刻只有一个批次在使用识别模型
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-rec")
+        self._pending: List[Tuple[List[Any], asyncio.Future]] = []
+        self._pending_lines = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._busy = False
+        # 运行统计
+        self._batches = 0
+        self._requests = 0
+        self._lines = 0
+        self._busy_seconds = 0.0
+
+    async def recognize(self, crops: List[Any]) -> List[Tuple[str, float]]:
+        """提交一页的行图像，等待所在批次识别完成后返回本页结果"""
+        if not crops:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((crops, future))
+        self._pending_lines += len(crops)
+
+        if self._pending_lines >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """提交一个批次（识别器忙碌时保留在队列中，等当前批次结束后再提交）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._busy or not self._pending:
+            return
+
+        # 按到达顺序取请求，直到凑满一批；请求不拆分，保证单页结果完整
+        batch: List[Tuple[List[Any], asyncio.Future]] = []
+        lines = 0
+        while self._pending:
+            crops, future = self._pending[0]
+            if batch and lines + len(crops) > self.max_batch_size:
+                break
+            self._pending.pop(0)
+            if future.done():
+                # 调用方已取消，不再占用识别
+                self._pending_lines -= len(crops)
+                continue
+            batch.append((crops, future))
+            lines += len(crops)
+        self._pending_lines -= lines
+
+        if not batch:
+            self._flush_remaining()
+            return
+
+        self._busy = True
+        asyncio.ensure_future(self._run_batch(batch))
+
+    def _flush_remaining(self) -> None:
+        """队列中仍有请求时：已满则立即提交，否则重新开始计时"""
+        if not self._pending:
+            return
+        if self._pending_lines >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _run_batch(self, batch: List[Tuple[List[Any], asyncio.Future]]) -> None:
+        """执行一个批次并把结果分发回各请求"""
+        all_crops = [crop for crops, _ in batch for crop in crops]
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self._executor, self.recognize_fn, all_crops)
+        except Exception as e:
+            logger.error(f"文本行批量识别失败: {len(all_crops)}行 - {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._busy_seconds += time.perf_counter() - start
+            self._busy = False
+            # 识别期间积压的请求已等待至少一个批次的时间，直接提交
+            if self._pending:
+                self._flush()
+
+        self._batches += 1
+        self._requests += len(batch)
+        self._lines += len(all_crops)
+
+        offset = 0
+        for crops, future in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(crops)])
+            offset += len(crops)
+
+    def stats(self) -> Dict[str, Any]:
+        """合批运行统计"""
+        return {
+            "batches": self._batches,
+            "requests": self._requests,
+            "lines": self._lines,
+            "avg_batch_size": round(self._lines / self._batches, 2) if self._batches else 0.0,
+            "lines_per_sec": round(self._lines / self._busy_seconds, 2) if self._busy_seconds else 0.0,
+            "pending_lines": self._pending_lines,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": int(self.max_wait * 1000),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭识别线程"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._executor.shutdown(wait=wait, cancel_futures=True)
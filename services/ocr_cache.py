@@ -0,0 +1,147 @@
+# services/ocr_cache.py
+"""OCR 结果缓存 - 基于内容寻址的本地磁盘缓存
+
+缓存键 = 文件 SHA-256 + OCR 配置摘要（模型路径、检测尺寸、阈值、水印列表），
+同一文件在相同配置下重复处理时直接返回缓存结果，跳过检测和识别。
+按总大小做 LRU 淘汰（以文件 mtime 作为最近访问时间）。
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from loguru import logger
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    """计算 OCR 配置摘要（键排序后序列化，保证稳定）"""
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class OCRResultCache:
+    """OCR 结果磁盘缓存（大小受限的 LRU）"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> 文件大小，按最近访问顺序排列（末尾最新）
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    def make_key(self, file_path: str, config: Dict[str, Any]) -> str:
+        """生成缓存键：文件内容哈希 + 配置摘要"""
+        return f"{file_sha256(file_path)}-{config_digest(config)}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """首次使用时扫描缓存目录，按 mtime 重建 LRU 索引"""
+        if self._index is not None:
+            return self._index
+
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，命中时刷新访问时间"""
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                os.utime(path, None)
+            except (OSError, ValueError) as e:
+                logger.warning(f"OCR 缓存读取失败，已丢弃: {key} - {e}")
+                self._discard(key)
+                self.misses += 1
+                return None
+
+            index.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """写入缓存（原子替换），超出容量时按 LRU 淘汰"""
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            index = self._load_index()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"OCR 缓存写入失败: {key} - {e}")
+                return
+
+            self._total_bytes += len(payload) - index.pop(key, 0)
+            index[key] = len(payload)
+
+            while self._total_bytes > self.max_bytes and index:
+                oldest = next(iter(index))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        """删除缓存条目（调用方需持有锁）"""
+        size = self._index.pop(key, 0) if self._index is not None else 0
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._index) if self._index is not None else None,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,89 @@
+# services/ocr_client.py
+"""OCR 服务进程客户端 - API worker 通过本地 Unix socket 调用 OCR 服务进程
+
+通信协议：每条消息为 4 字节大端长度 + UTF-8 JSON
+- 请求: {"op": str, "params": {...}}
+- 响应: {"ok": true, "result": ...} 或 {"ok": false, "error_type": str, "error": str}
+
+文档只传文件路径（上传文件已落盘在同一台机器上），由服务进程直接读取，
+图像数据不经过 socket 复制。
+"""
+
+import json
+import struct
+import asyncio
+from typing import Any, Dict, Optional
+
+
+# 单条消息上限（OCR 结果含逐行坐标，长文档可达数 MB）
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+
+class OCRRemoteError(Exception):
+    """OCR 服务进程返回的错误（error_type 为服务端异常类名）"""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+async def read_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """读取一条消息（连接关闭时抛出 asyncio.IncompleteReadError）"""
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"消息过大: {size} 字节")
+    return json.loads(await reader.readexactly(size))
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    """写入一条消息"""
+    data = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    writer.write(_HEADER.pack(len(data)) + data)
+    await writer.drain()
+
+
+class OCRClient:
+    """OCR 服务进程客户端（每个请求一个连接，并发请求互不阻塞）
+
+    Args:
+        socket_path: OCR 服务进程监听的 Unix socket 路径
+        timeout: 单个请求超时秒数（0 表示不限）
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 600.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    async def call(self, op: str, **params: Any) -> Any:
+        """调用服务进程的操作并返回结果
+
+        Raises:
+            OCRRemoteError: 服务端执行失败
+            OSError: 服务进程未启动或连接中断
+            asyncio.TimeoutError: 请求超时
+        """
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            await write_message(writer, {"op": op, "params": params})
+            response = await asyncio.wait_for(read_message(reader), self.timeout or None)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("OCR服务进程连接中断")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+        if not response.get("ok"):
+            raise OCRRemoteError(response.get("error_type", "Exception"), response.get("error", ""))
+        return response.get("result")
+
+    async def ping(self) -> Optional[Dict[str, Any]]:
+        """探测服务进程是否可用，不可用时返回 None"""
+        try:
+            return await asyncio.wait_for(self.call("ping"), 5)
+        except (OSError, asyncio.TimeoutError, OCRRemoteError):
+            return None
@@ -0,0 +1,241 @@
+# services/ocr_engine.py
+"""OCR 引擎工具 - 引擎构建与推理（主进程和进程池 worker 共用）
+
+paddleocr（连带 paddle）导入耗时数秒，只在首次构建引擎或解码图片时导入，
+使只用到文档工具函数的进程（API 远程模式、健康检查）保持轻量。
+"""
+
+import os
+import copy
+import math
+import hashlib
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import cv2
+import fitz
+import numpy as np
+
+from config.settings import settings
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
+
+
+# 模型档位：mobile 轻量快速，server 精度高但 CPU 上最慢
+TIER_SERVER = "server"
+TIER_MOBILE = "mobile"
+
+
+def enabled_tiers() -> List[str]:
+    """当前启用的模型档位（分级模式下先 mobile 后 server）"""
+    if settings.OCR_TIERED_ENABLED:
+        return [TIER_MOBILE, TIER_SERVER]
+    return [TIER_SERVER]
+
+
+def build_engine_kwargs(tier: str = TIER_SERVER, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """根据配置生成 PaddleOCR 构造参数 - 与MVP代码 text_pipline_ocr.py 保持一致
+
+    Args:
+        tier: 模型档位
+        overrides: 覆盖参数（自动调优得出的 cpu_threads / enable_mkldnn / det_limit_side_len 等）
+    """
+    kwargs = {
+        "lang": 'ch',
+        "det_model_dir": settings.OCR_DET_MODEL_PATH,
+        "rec_model_dir": settings.OCR_REC_MODEL_PATH,
+        "textline_orientation_model_dir": settings.OCR_ORI_MODEL_PATH,
+        "doc_orientation_classify_model_dir": settings.OCR_DOC_MODEL_PATH,
+        "use_doc_orientation_classify": True,
+        "use_doc_unwarping": False,
+        "det_limit_side_len": 960,
+        "det_limit_type": 'max',
+    }
+    if tier == TIER_MOBILE:
+        kwargs["det_model_dir"] = settings.OCR_MOBILE_DET_MODEL_PATH
+        kwargs["rec_model_dir"] = settings.OCR_MOBILE_REC_MODEL_PATH
+    if settings.OCR_REC_BATCHING_ENABLED:
+        # 跨文档合批后单次送入识别模型的行数变多，放大识别器内部的批大小
+        kwargs["rec_batch_num"] = settings.OCR_REC_BATCH_MAX_SIZE
+    if overrides:
+        kwargs.update(overrides)
+    return kwargs
+
+
+def create_engine(engine_kwargs: Optional[Dict[str, Any]] = None) -> "PaddleOCR":
+    """创建 PaddleOCR 引擎（加载模型，耗时操作）"""
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(**(engine_kwargs or build_engine_kwargs()))
+
+
+def run_ocr(engine: "PaddleOCR", source: Any, cls: bool = True) -> List[Any]:
+    """执行 OCR 推理，返回 PaddleOCR 原始结果
+
+    返回格式: [[box, (text, score)], ...] 每页一个列表（无结果的页为 None）
+    cls=False 时跳过方向分类（图片方向已知时使用）
+    """
+    # PaddleOCR 使用 ocr() 方法，不是 predict()
+    return engine.ocr(source, cls=cls) or []
+
+
+def is_pdf(file_path: str) -> bool:
+    """是否为 PDF 文件"""
+    return os.path.splitext(file_path)[1].lower() == ".pdf"
+
+
+def count_pages(file_path: str) -> int:
+    """获取文档页数（图片按 1 页计）"""
+    if not is_pdf(file_path):
+        return 1
+    with fitz.open(file_path) as pdf:
+        return pdf.page_count
+
+
+def raster_zoom(page: "fitz.Page") -> int:
+    """PDF 栅格化缩放倍数：默认 2 倍，放大后宽或高超过 2000 像素则不放大"""
+    if page.rect.width * 2 > 2000 or page.rect.height * 2 > 2000:
+        return 1
+    return 2
+
+
+def rasterize_pdf_page(file_path: str, page_index: int) -> np.ndarray:
+    """将 PDF 单页栅格化为 BGR 图像 - 与 PaddleOCR 内置 PDF 读取逻辑一致
+
+    默认 2 倍缩放；若放大后宽或高超过 2000 像素则使用原始尺寸。
+    """
+    with fitz.open(file_path) as pdf:
+        page = pdf[page_index]
+        zoom = raster_zoom(page)
+        pm = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        img = np.frombuffer(pm.samples, dtype=np.uint8).reshape(pm.height, pm.width, pm.n)
+        return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def page_raster_sha256(file_path: str, page_index: int) -> str:
+    """PDF 单页栅格图像（与 OCR 输入一致）的 SHA-256，用于按页缓存识别结果
+
+    以渲染结果而非内容流计算，扫描件各页内容流相同、只有引用的图片不同时也能区分。
+    """
+    img = rasterize_pdf_page(file_path, page_index)
+    digest = hashlib.sha256(str(img.shape).encode("ascii"))
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+
+def crop_region(img: np.ndarray, box: List[float]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """按归一化坐标 [x0, y0, x1, y1]（0~1）裁剪区域，返回 (区域图像, 左上角偏移)"""
+    h, w = img.shape[:2]
+    x0, y0, x1, y1 = box
+    left, top = max(0, int(x0 * w)), max(0, int(y0 * h))
+    right, bottom = min(w, math.ceil(x1 * w)), min(h, math.ceil(y1 * h))
+    return img[top:bottom, left:right], (left, top)
+
+
+def offset_page_result(page_result: List[Any], dx: int, dy: int) -> List[Any]:
+    """将区域内识别结果的坐标平移回整页坐标系"""
+    return [
+        [[[x + dx, y + dy] for x, y in line[0]], line[1]]
+        for line in page_result
+    ]
+
+
+def ocr_page(engine: "PaddleOCR", file_path: str, page_index: int,
+             boxes: Optional[List[List[float]]] = None, cls: bool = True) -> Optional[List[Any]]:
+    """对单页执行 OCR，返回该页的 PaddleOCR 原始结果
+
+    PDF 只栅格化当前页，处理完即释放，峰值内存与总页数无关。
+
+    Args:
+        engine: OCR 引擎
+        file_path: 文件路径
+        page_index: 页索引（从0开始）
+        boxes: 仅识别的区域列表（归一化坐标 [x0, y0, x1, y1]），为空时识别整页
+        cls: 是否执行方向分类
+    """
+    if not boxes:
+        source = rasterize_pdf_page(file_path, page_index) if is_pdf(file_path) else file_path
+        result = run_ocr(engine, source, cls)
+        return result[0] if result else None
+
+    img = load_page_image(file_path, page_index)
+    page_result = []
+    for box in boxes:
+        crop, (dx, dy) = crop_region(img, box)
+        if crop.size == 0:
+            continue
+        result = run_ocr(engine, crop, cls)
+        if result and result[0]:
+            page_result.extend(offset_page_result(result[0], dx, dy))
+    return page_result or None
+
+
+# ============ 检测/识别分离（供跨文档识别合批使用） ============
+
+def load_page_image(file_path: str, page_index: int) -> np.ndarray:
+    """读取单页图像（BGR），PDF 栅格化当前页，图片按 PaddleOCR 的方式解码"""
+    if is_pdf(file_path):
+        return rasterize_pdf_page(file_path, page_index)
+    from paddleocr.paddleocr import check_img
+
+    return check_img(file_path)
+
+
+def _detect_image(engine: "PaddleOCR", img: np.ndarray, cls: bool = True) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """对单张图像执行检测 → 按阅读顺序排序 → 透视裁剪 → 方向分类"""
+    from paddleocr.paddleocr import alpha_to_color, predict_system
+
+    img = alpha_to_color(img, (255, 255, 255))
+    ori_im = img.copy()
+    dt_boxes, _ = engine.text_detector(img)
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return [], []
+
+    dt_boxes = predict_system.sorted_boxes(dt_boxes)
+    crops = [predict_system.get_rotate_crop_image(ori_im, copy.deepcopy(box)) for box in dt_boxes]
+    if cls and engine.use_angle_cls:
+        crops, _, _ = engine.text_classifier(crops)
+    return dt_boxes, crops
+
+
+def detect_page(engine: "PaddleOCR", file_path: str, page_index: int,
+                boxes: Optional[List[List[float]]] = None,
+                cls: bool = True) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """对单页执行文本检测并裁剪行图像（不做识别）
+
+    与 PaddleOCR.ocr() 内部流程一致；指定 boxes 时只检测这些区域，坐标换算回整页。
+
+    Returns:
+        (dt_boxes, crops): 每行的四点坐标与对应的行图像，无检测结果时均为空列表
+    """
+    img = load_page_image(file_path, page_index)
+    if not boxes:
+        return _detect_image(engine, img, cls)
+
+    all_boxes, all_crops = [], []
+    for box in boxes:
+        region, (dx, dy) = crop_region(img, box)
+        if region.size == 0:
+            continue
+        dt_boxes, crops = _detect_image(engine, region, cls)
+        all_boxes.extend(dt_box + np.array([dx, dy], dtype=dt_box.dtype) for dt_box in dt_boxes)
+        all_crops.extend(crops)
+    return all_boxes, all_crops
+
+
+def recognize_crops(engine: "PaddleOCR", crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+    """对一批行图像执行文本识别，返回 [(text, score), ...]，顺序与输入一致"""
+    if not crops:
+        return []
+    rec_res, _ = engine.text_recognizer(crops)
+    return rec_res
+
+
+def merge_page_result(engine: "PaddleOCR", dt_boxes: List[np.ndarray],
+                      rec_res: List[Tuple[str, float]]) -> Optional[List[Any]]:
+    """将检测框与识别结果合并为 PaddleOCR 单页结果格式，按引擎 drop_score 过滤"""
+    page_result = [
+        [box.tolist(), (text, score)]
+        for box, (text, score) in zip(dt_boxes, rec_res)
+        if score >= engine.drop_score
+    ]
+    return page_result or None
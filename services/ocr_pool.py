@@ -0,0 +1,138 @@
+# services/ocr_pool.py
+"""OCR 引擎进程池 - 多进程并行 OCR
+
+每个 worker 进程在启动时加载一次 PP-OCRv5 模型，之后常驻复用；
+任务按"最少在途任务"原则分派到 worker，绕开 GIL 充分利用多核 CPU。
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+from config.settings import settings
+from services.ocr_engine import TIER_SERVER, create_engine, ocr_page
+from services.ocr_registry import EngineRegistry
+
+
+# ============ Worker 进程侧 ============
+
+# 每个 worker 进程独享的引擎实例，按模型档位索引（在 initializer 中创建）
+_worker_engines: Dict[str, Any] = {}
+
+# 引擎配置档在 worker 内按需加载（首次使用时创建注册表）
+_worker_registry: Optional[EngineRegistry] = None
+
+
+def _init_worker(engines_kwargs: Dict[str, Dict[str, Any]]) -> None:
+    """worker 进程初始化：加载各档位 OCR 模型"""
+    for tier, engine_kwargs in engines_kwargs.items():
+        _worker_engines[tier] = create_engine(engine_kwargs)
+
+
+def _worker_ping() -> bool:
+    """预热探测：确保 worker 已完成模型加载"""
+    return bool(_worker_engines)
+
+
+def worker_ocr_page(file_path: str, page_index: int, tier: str = TIER_SERVER,
+                    boxes: Optional[List[List[float]]] = None, cls: bool = True,
+                    engine_kwargs: Optional[Dict[str, Any]] = None) -> Optional[List[Any]]:
+    """在 worker 进程中对单页（或页内指定区域）执行 OCR（由 worker 自行栅格化，避免跨进程传输图像）
+
+    指定 engine_kwargs（引擎配置档）时使用 worker 内注册表中的对应引擎，而不是常驻的档位引擎。
+    """
+    global _worker_registry
+    if engine_kwargs is None:
+        return ocr_page(_worker_engines[tier], file_path, page_index, boxes, cls)
+    if _worker_registry is None:
+        _worker_registry = EngineRegistry(
+            create_engine,
+            settings.OCR_ENGINE_MAX_RESIDENT,
+            settings.OCR_ENGINE_MEMORY_BUDGET_MB * 1024 * 1024
+        )
+    return ocr_page(_worker_registry.get(engine_kwargs), file_path, page_index, boxes, cls)
+
+
+# ============ 主进程侧 ============
+
+class OCREnginePool:
+    """OCR 引擎进程池
+
+    每个 worker 是一个 max_workers=1 的独立进程执行器，
+    这样主进程可以精确掌握每个 worker 的在途任务数并做最少负载分派。
+    """
+
+    def __init__(self, size: int, engines_kwargs: Dict[str, Dict[str, Any]]):
+        self.size = max(1, size)
+        self.engines_kwargs = engines_kwargs
+        self._workers: List[ProcessPoolExecutor] = []
+        self._inflight: List[int] = []
+        self._completed: List[int] = []
+        self.started = False
+
+    async def start(self) -> None:
+        """启动全部 worker 并等待模型加载完成"""
+        if self.started:
+            return
+
+        # paddle 不是 fork 安全的，统一使用 spawn 启动子进程
+        ctx = multiprocessing.get_context("spawn")
+        for _ in range(self.size):
+            self._workers.append(ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self.engines_kwargs,)
+            ))
+            self._inflight.append(0)
+            self._completed.append(0)
+
+        # 并发预热，模型加载时间不随 worker 数线性增长
+        loop = asyncio.get_running_loop()
+        ready = await asyncio.gather(*[
+            loop.run_in_executor(worker, _worker_ping) for worker in self._workers
+        ])
+        if not all(ready):
+            raise RuntimeError("OCR 进程池部分 worker 初始化失败")
+
+        self.started = True
+        logger.info(f"✓ OCR 进程池已启动: {self.size} 个 worker")
+
+    def _pick_worker(self) -> int:
+        """选择在途任务最少的 worker"""
+        return min(range(len(self._workers)), key=lambda i: self._inflight[i])
+
+    async def submit(self, fn: Callable, *args) -> Any:
+        """将任务分派到最空闲的 worker 并等待结果"""
+        if not self.started:
+            raise RuntimeError("OCR 进程池尚未启动")
+
+        idx = self._pick_worker()
+        self._inflight[idx] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._workers[idx], fn, *args)
+            self._completed[idx] += 1
+            return result
+        finally:
+            self._inflight[idx] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """进程池运行状态"""
+        return {
+            "size": self.size,
+            "started": self.started,
+            "inflight": list(self._inflight),
+            "completed": list(self._completed),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭全部 worker 进程"""
+        for worker in self._workers:
+            worker.shutdown(wait=wait, cancel_futures=True)
+        self._workers.clear()
+        self._inflight.clear()
+        self._completed.clear()
+        self.started = False
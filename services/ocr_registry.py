@@ -0,0 +1,122 @@
+# services/ocr_registry.py
+"""OCR 引擎注册表 - 按引擎配置懒加载，LRU 淘汰
+
+不同租户/模板可能需要不同语言、检测尺寸的引擎。注册表以引擎构造参数为键，
+首次使用时才加载模型，最多常驻 max_engines 个，并按模型文件大小估算内存，
+超出数量或内存预算时淘汰最久未使用的引擎。
+
+被淘汰的引擎若仍有页在识别中，会在这些调用结束后随引用释放。
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+from services.ocr_cache import config_digest
+
+
+def estimate_engine_bytes(engine_kwargs: Dict[str, Any]) -> int:
+    """按引擎引用的模型目录文件大小估算常驻内存（推理时的工作内存不计入）"""
+    total = 0
+    for key, value in engine_kwargs.items():
+        if not key.endswith("_model_dir") or not isinstance(value, str) or not os.path.isdir(value):
+            continue
+        for root, _, files in os.walk(value):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+
+class EngineRegistry:
+    """按引擎配置索引的 OCR 引擎注册表（线程安全）
+
+    Args:
+        factory: 引擎构造函数，输入构造参数，返回引擎实例
+        max_engines: 最多常驻的引擎数
+        max_memory_bytes: 常驻引擎估算内存上限（0 表示不限，至少保留最近使用的一个）
+    """
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], Any], max_engines: int = 2,
+                 max_memory_bytes: int = 0):
+        self.factory = factory
+        self.max_engines = max(1, max_engines)
+        self.max_memory_bytes = max(0, max_memory_bytes)
+        self._lock = threading.Lock()
+        # 同一配置只加载一次，不同配置可以并行加载
+        self._loading: Dict[str, threading.Lock] = {}
+        self._engines: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+
+    def get(self, engine_kwargs: Dict[str, Any]) -> Any:
+        """获取引擎，未加载时同步加载（耗时操作，应在线程中调用）"""
+        key = config_digest(engine_kwargs)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry["engine"]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry["engine"]
+
+            start = time.perf_counter()
+            engine = self.factory(engine_kwargs)
+            load_sec = time.perf_counter() - start
+            size = estimate_engine_bytes(engine_kwargs)
+
+            with self._lock:
+                self._engines[key] = {"engine": engine, "bytes": size, "kwargs": engine_kwargs}
+                self._loads += 1
+                self._load_seconds += load_sec
+                self._loading.pop(key, None)
+                self._evict()
+
+        logger.info(f"OCR引擎已加载: {key[:12]} 耗时{load_sec:.1f}s，模型约{size / 1024 / 1024:.0f}MB")
+        return engine
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """命中时标记为最近使用（需持有锁）"""
+        entry = self._engines.get(key)
+        if entry is not None:
+            self._engines.move_to_end(key)
+            self._hits += 1
+        return entry
+
+    def _evict(self) -> None:
+        """超出数量或内存预算时淘汰最久未使用的引擎（需持有锁）"""
+        while len(self._engines) > 1 and (
+            len(self._engines) > self.max_engines
+            or (self.max_memory_bytes and self._resident_bytes() > self.max_memory_bytes)
+        ):
+            key, _ = self._engines.popitem(last=False)
+            self._evictions += 1
+            logger.info(f"OCR引擎已淘汰（LRU）: {key[:12]}")
+
+    def _resident_bytes(self) -> int:
+        return sum(entry["bytes"] for entry in self._engines.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """注册表运行统计"""
+        with self._lock:
+            return {
+                "resident": len(self._engines),
+                "resident_mb": round(self._resident_bytes() / 1024 / 1024, 1),
+                "max_engines": self.max_engines,
+                "max_memory_mb": round(self.max_memory_bytes / 1024 / 1024, 1),
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "avg_load_sec": round(self._load_seconds / self._loads, 2) if self._loads else 0.0,
+            }
@@ -0,0 +1,123 @@
+# services/ocr_server.py
+"""OCR 服务进程 - 多个 API worker 共享的独立 OCR 进程
+
+uvicorn 多 worker 部署时，每个 worker 各自加载一套 OCR 模型，内存随 worker 数成倍增长、启动也慢。
+OCR 服务进程独占模型（以及进程池、识别合批、缓存），API worker 设置 OCR_SERVER_SOCKET 后
+不再加载模型，OCRService.process_document 自动经本地 Unix socket 转发到这里。
+
+命令行用法:
+    python -m services.ocr_server [--socket ./run/ocr.sock]
+"""
+
+import os
+import signal
+import asyncio
+import argparse
+from typing import Any, Awaitable, Callable, Dict
+from loguru import logger
+
+from config.settings import settings
+from services.ocr_client import read_message, write_message
+
+
+class OCRServer:
+    """OCR 服务端：在 Unix socket 上提供 OCRService 的操作
+
+    Args:
+        service: 已初始化的 OCRService（本地模式）
+        socket_path: 监听的 Unix socket 路径
+    """
+
+    def __init__(self, service: Any, socket_path: str):
+        self.service = service
+        self.socket_path = socket_path
+        self._server: Any = None
+        self._handlers: Dict[str, Callable[..., Awaitable[Any]]] = {
+            "ping": self._ping,
+            "process_document": service.process_document,
+            "decode_barcodes": service.decode_barcodes,
+            "stats": service.stats,
+        }
+
+    async def _ping(self) -> Dict[str, Any]:
+        return {"pid": os.getpid(), "ready": self.service.is_ready}
+
+    async def start(self) -> None:
+        """开始监听（清理上次异常退出残留的 socket 文件）"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        # 只允许同用户/同组的进程访问
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"✓ OCR服务进程已监听: {self.socket_path}")
+
+    async def stop(self) -> None:
+        """停止监听并删除 socket 文件"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个连接上的请求（客户端断开后结束）"""
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                await write_message(writer, await self._dispatch(request))
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"OCR服务连接异常: {e}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """执行一个请求，异常以 error_type/error 返回给客户端"""
+        op = request.get("op")
+        handler = self._handlers.get(op)
+        if handler is None:
+            return {"ok": False, "error_type": "ValueError", "error": f"未知的OCR服务操作: {op}"}
+        try:
+            return {"ok": True, "result": await handler(**(request.get("params") or {}))}
+        except Exception as e:
+            if op == "process_document":
+                logger.error(f"OCR服务处理失败: {request.get('params', {}).get('file_path')} - {e}")
+            return {"ok": False, "error_type": type(e).__name__, "error": str(e)}
+
+
+async def serve(socket_path: str) -> None:
+    """初始化 OCR 引擎并持续提供服务，收到 SIGINT/SIGTERM 后退出"""
+    from services.ocr_service import ocr_service
+
+    await ocr_service.initialize(local=True)
+    server = OCRServer(ocr_service, socket_path)
+    await server.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("正在关闭OCR服务进程...")
+        await server.stop()
+        await ocr_service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="NeoFlow OCR 服务进程")
+    parser.add_argument(
+        "--socket", default=settings.OCR_SERVER_SOCKET or "./run/ocr.sock",
+        help="Unix socket 路径（API 进程的 OCR_SERVER_SOCKET 需与之一致）"
+    )
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,33 @@
 """OCR服务 - 基于MVP代码 text_pipline_ocr.py 重构"""
 
 import os
+import time
 import asyncio
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any, Optional
-from paddleocr import PaddleOCR
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, Deque, List, Dict, Any, Optional, Tuple
 from loguru import logger
 
 from config.settings import settings
+from services.ocr_engine import (
+    TIER_MOBILE, TIER_SERVER, build_engine_kwargs, count_pages, create_engine, page_raster_sha256,
+    detect_page, enabled_tiers, is_pdf, merge_page_result, ocr_page, recognize_crops, run_ocr
+)
+from services.ocr_pool import OCREnginePool, worker_ocr_page
+from services.ocr_batcher import RecognitionBatcher
+from services.ocr_tuner import load_profile, run_tuning, save_profile, summarize_profile
+from services.ocr_cache import OCRResultCache, config_digest
+from services.pdf_text_layer import extract_page_lines
+from services.page_filter import contains_keyword, is_blank_page, page_text
+from services.image_preprocess import ImagePreprocessor
+from services.barcode_service import decode_document
+from services.ocr_artifact import OCRArtifact, OCRArtifactStore
+from services.ocr_client import OCRClient, OCRRemoteError
+from services.ocr_registry import EngineRegistry
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
 
 
 class OCRValidationError(Exception):
@@ -33,14 +53,71 @@ class OCRService:
     
     def __init__(self):
         if not OCRService._initialized:
-            self.ocr_engine: Optional[PaddleOCR] = None
+            self.ocr_engine: Optional["PaddleOCR"] = None
+            self.mobile_engine: Optional["PaddleOCR"] = None  # 分级模式下的轻量引擎
             self.executor = ThreadPoolExecutor(max_workers=2)
+            self.pool: Optional[OCREnginePool] = None
+            self.remote: Optional[OCRClient] = None  # 远程模式：OCR 转发到共享的 OCR 服务进程
+            self._init_lock = asyncio.Lock()  # 后台加载与请求触发的初始化只执行一次
+            # 引擎配置档（租户/模板选择）：线程模式下按需加载，LRU 淘汰
+            self.engine_registry = EngineRegistry(
+                create_engine,
+                settings.OCR_ENGINE_MAX_RESIDENT,
+                settings.OCR_ENGINE_MEMORY_BUDGET_MB * 1024 * 1024
+            )
+            self.batchers: Dict[str, RecognitionBatcher] = {}  # 按模型档位的识别合批器（线程模式）
+            self.tuning: Optional[Dict[str, Any]] = None  # 自动调优结果（引擎参数、进程池大小）
             self._watermarks = ['no', 'noi', 'copy', '样本', '仅供参考']
             self._threshold = 0.5
+            self.cache: Optional[OCRResultCache] = (
+                OCRResultCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_MB * 1024 * 1024)
+                if settings.OCR_CACHE_ENABLED else None
+            )
+            # 按页缓存：整份文件变化（重发报告只改了一两页）时，未变化的页直接复用
+            self.page_cache: Optional[OCRResultCache] = (
+                OCRResultCache(settings.OCR_PAGE_CACHE_DIR, settings.OCR_PAGE_CACHE_MAX_MB * 1024 * 1024)
+                if settings.OCR_PAGE_CACHE_ENABLED else None
+            )
+            self.artifacts = OCRArtifactStore(
+                settings.OCR_ARTIFACT_DIR, settings.OCR_ARTIFACT_ZSTD_LEVEL
+            )
+            self.preprocessor: Optional[ImagePreprocessor] = (
+                ImagePreprocessor(
+                    settings.OCR_PREPROCESS_CACHE_DIR,
+                    max_side=settings.OCR_PREPROCESS_MAX_SIDE,
+                    deskew=settings.OCR_PREPROCESS_DESKEW,
+                    max_skew=settings.OCR_PREPROCESS_MAX_SKEW_DEG,
+                    contrast=settings.OCR_PREPROCESS_CONTRAST,
+                    max_cache_bytes=settings.OCR_PREPROCESS_CACHE_MAX_MB * 1024 * 1024
+                )
+                if settings.OCR_PREPROCESS_ENABLED else None
+            )
             OCRService._initialized = True
     
-    async def initialize(self) -> bool:
-        """异步初始化OCR引擎"""
+    async def initialize(self, local: bool = False) -> bool:
+        """异步初始化OCR引擎
+        
+        配置了 OCR_SERVER_SOCKET 时进入远程模式，不在本进程加载模型。
+        
+        Args:
+            local: 忽略 OCR_SERVER_SOCKET，在本进程加载模型（OCR 服务进程自身使用）
+        """
+        async with self._init_lock:
+            if self.is_ready:
+                return True
+            return await self._initialize(local)
+    
+    async def _initialize(self, local: bool) -> bool:
+        if settings.OCR_SERVER_SOCKET and not local:
+            self.remote = OCRClient(settings.OCR_SERVER_SOCKET, settings.OCR_SERVER_TIMEOUT)
+            info = await self.remote.ping()
+            if info is None:
+                # 服务进程可能晚于 API 启动，请求时再连接
+                logger.warning(f"⚠ OCR服务进程暂不可用，将在请求时重试: {settings.OCR_SERVER_SOCKET}")
+            else:
+                logger.info(f"✓ 已连接OCR服务进程: {settings.OCR_SERVER_SOCKET} (pid {info['pid']})")
+            return True
+        
         try:
             # 验证模型路径
             model_paths = {
@@ -55,11 +132,52 @@ class OCRService:
                     raise FileNotFoundError(f"{name}路径不存在: {path}")
                 logger.info(f"✓ {name}: {path}")
             
+            if settings.OCR_TIERED_ENABLED:
+                for name, path in {
+                    "轻量检测模型": settings.OCR_MOBILE_DET_MODEL_PATH,
+                    "轻量识别模型": settings.OCR_MOBILE_REC_MODEL_PATH
+                }.items():
+                    if not os.path.exists(path):
+                        raise FileNotFoundError(f"{name}路径不存在: {path}")
+                    logger.info(f"✓ {name}: {path}")
+            
+            if settings.OCR_AUTOTUNE_ENABLED and self.tuning is None:
+                self.tuning = await self._load_or_run_tuning()
+            
+            # 进程池模式：每个 worker 进程各自加载模型
+            pool_size = self._pool_size()
+            if pool_size > 0:
+                if self.pool is None:
+                    self.pool = OCREnginePool(
+                        pool_size,
+                        {tier: self._engine_kwargs(tier) for tier in enabled_tiers()}
+                    )
+                await self.pool.start()
+                logger.info(f"✓ OCR引擎进程池初始化成功: {pool_size} 个 worker")
+                return True
+            
             # 异步初始化
             loop = asyncio.get_event_loop()
             self.ocr_engine = await loop.run_in_executor(
                 self.executor, self._init_ocr_sync
             )
+            if settings.OCR_TIERED_ENABLED:
+                self.mobile_engine = await loop.run_in_executor(
+                    self.executor, create_engine, self._engine_kwargs(TIER_MOBILE)
+                )
+            
+            # 识别合批：检测仍按页执行，各文档的行图像合并后统一识别
+            if settings.OCR_REC_BATCHING_ENABLED and not self.batchers:
+                for tier in enabled_tiers():
+                    self.batchers[tier] = RecognitionBatcher(
+                        partial(recognize_crops, self._engine_for(tier)),
+                        max_batch_size=settings.OCR_REC_BATCH_MAX_SIZE,
+                        max_wait_ms=settings.OCR_REC_BATCH_MAX_WAIT_MS
+                    )
+                logger.info(
+                    f"✓ OCR识别合批已启用: 每批最多{settings.OCR_REC_BATCH_MAX_SIZE}行，"
+                    f"最长等待{settings.OCR_REC_BATCH_MAX_WAIT_MS}ms"
+                )
             
             logger.info("✓ OCR引擎初始化成功")
             return True
@@ -68,25 +186,116 @@ class OCRService:
             logger.error(f"✗ OCR引擎初始化失败: {e}")
             raise
     
-    def _init_ocr_sync(self) -> PaddleOCR:
+    def _init_ocr_sync(self) -> "PaddleOCR":
         """同步初始化PaddleOCR - 完全按照MVP代码 text_pipline_ocr.py"""
-        return PaddleOCR(
-            lang='ch',
-            det_model_dir=settings.OCR_DET_MODEL_PATH,
-            rec_model_dir=settings.OCR_REC_MODEL_PATH,
-            textline_orientation_model_dir=settings.OCR_ORI_MODEL_PATH,
-            doc_orientation_classify_model_dir=settings.OCR_DOC_MODEL_PATH,
-            use_doc_orientation_classify=True,
-            use_doc_unwarping=False,
-            det_limit_side_len=960,
-            det_limit_type='max'
+        return create_engine(self._engine_kwargs())
+    
+    async def _load_or_run_tuning(self) -> Optional[Dict[str, Any]]:
+        """加载本机的调优结果，不存在时现场调优并保存；失败时使用默认参数"""
+        profile = await asyncio.to_thread(load_profile)
+        if profile is None:
+            logger.info("未找到本机的OCR调优结果，开始自动调优（耗时数分钟）...")
+            try:
+                profile = await run_tuning()
+                await asyncio.to_thread(save_profile, profile)
+            except Exception as e:
+                logger.warning(f"OCR自动调优失败，使用默认参数: {e}")
+                return None
+        
+        logger.info(
+            f"✓ OCR调优参数: {profile['engine']}，进程池 {profile['pool_size']}，"
+            f"{profile['pages_per_sec']} 页/秒"
+        )
+        return profile
+    
+    def _engine_kwargs(self, tier: str = TIER_SERVER, ocr_profile: Optional[str] = None) -> Dict[str, Any]:
+        """引擎构造参数（叠加自动调优结果，指定配置档时再叠加配置档参数）"""
+        overrides = dict(self.tuning["engine"]) if self.tuning else {}
+        if ocr_profile:
+            profiles = settings.ocr_engine_profiles
+            if ocr_profile not in profiles:
+                raise ValueError(f"未定义的OCR引擎配置档: {ocr_profile}")
+            overrides.update(profiles[ocr_profile])
+        return build_engine_kwargs(tier, overrides or None)
+    
+    def _pool_size(self) -> int:
+        """进程池大小：有调优结果时以实测最优值为准"""
+        if self.tuning is not None:
+            return int(self.tuning.get("pool_size", 0))
+        return settings.OCR_POOL_SIZE
+    
+    @property
+    def is_ready(self) -> bool:
+        """OCR 引擎是否可用（单进程引擎、进程池或远程服务进程任一就绪）"""
+        return (
+            self.ocr_engine is not None
+            or (self.pool is not None and self.pool.started)
+            or self.remote is not None
         )
     
-    async def process_document(self, file_path: str) -> Dict[str, Any]:
+    async def stats(self) -> Dict[str, Any]:
+        """OCR 运行统计（健康检查接口使用），远程模式下为服务进程的统计"""
+        if self.remote is not None:
+            try:
+                server_stats = await self.remote.call("stats")
+            except (OSError, asyncio.TimeoutError, OCRRemoteError) as e:
+                return {"mode": "remote", "socket": self.remote.socket_path, "error": str(e)}
+            return {**server_stats, "mode": f"remote:{server_stats.get('mode')}",
+                    "socket": self.remote.socket_path}
+        
+        return {
+            "mode": "pool" if self.pool else "thread",
+            "pool": self.pool.stats() if self.pool else None,
+            "cache": self.cache.stats() if self.cache else None,
+            "page_cache": self.page_cache.stats() if self.page_cache else None,
+            "tuning": summarize_profile(self.tuning),
+            "preprocess": self.preprocessor.stats() if self.preprocessor else None,
+            "rec_batching": {tier: batcher.stats() for tier, batcher in self.batchers.items()} or None,
+            "engine_registry": self.engine_registry.stats(),
+        }
+    
+    async def _remote_process_document(
+        self,
+        file_path: str,
+        regions: Optional[List[Dict[str, Any]]],
+        page_selection: Optional[Dict[str, Any]],
+        ocr_profile: Optional[str]
+    ) -> Dict[str, Any]:
+        """转发到 OCR 服务进程处理（只传绝对路径，服务进程直接读取文件）"""
+        try:
+            return await self.remote.call(
+                "process_document",
+                file_path=os.path.abspath(file_path),
+                regions=regions,
+                page_selection=page_selection,
+                ocr_profile=ocr_profile
+            )
+        except OCRRemoteError as e:
+            # 还原调用方依赖的异常类型
+            if e.error_type == "FileNotFoundError":
+                raise FileNotFoundError(str(e)) from None
+            if e.error_type == "OCRValidationError":
+                raise OCRValidationError(str(e)) from None
+            if e.error_type == "ValueError":
+                raise ValueError(str(e)) from None
+            raise RuntimeError(f"OCR服务进程处理失败: {e}") from None
+    
+    async def process_document(
+        self,
+        file_path: str,
+        regions: Optional[List[Dict[str, Any]]] = None,
+        page_selection: Optional[Dict[str, Any]] = None,
+        ocr_profile: Optional[str] = None
+    ) -> Dict[str, Any]:
         """处理单个文档
         
         Args:
             file_path: 文件路径
+            regions: 模板声明的识别区域（可选），格式 [{"page": int|None, "box": [x0, y0, x1, y1]}]，
+                     坐标为 0~1 归一化值，page 为空表示每页；指定时只识别这些区域，
+                     区域内未识别到文本则回退整页识别
+            page_selection: 模板页面选择规则（可选），格式 {"first_pages": int, "keywords": [str]}
+            ocr_profile: 引擎配置档名称（可选，见 OCR_ENGINE_PROFILES），指定时不使用分级识别和识别合批
             
         Returns:
             {
@@ -94,76 +303,666 @@ class OCRService:
                 "confidence": float,   # 平均置信度
                 "lines": List[Dict]    # 每行详细信息
                 "total_lines": int     # 总行数
+                "total_pages": int     # 总页数
+                "source": str,         # 来源: text_layer / ocr / mixed
+                "pages": List[Dict]    # 每页处理摘要（来源、模型档位、置信度、耗时）
+                "regions": List[Dict]  # 仅区域识别时存在：请求的识别区域
+                "regions_fallback": bool  # 区域内未识别到文本、回退整页识别时为 True
+                "page_selection": Dict # 按模板规则跳过了页时存在：使用的选择规则
+                "page_filter": Dict    # OCR前页面筛选：跳过的页及原因、估算节省耗时
+                "page_cache": Dict     # 页缓存命中情况 {"hits", "lookups"}
+                "preprocess": Dict     # 图片预处理信息（方向、缩放、纠偏角度），PDF 为 None
+                "barcodes": List[Dict] # 条码/二维码解码结果（type, format, value, box, page）
+                "ocr_profile": str     # 仅指定配置档时存在：使用的引擎配置档
             }
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
         
-        if not self.ocr_engine:
+        if self.remote is not None:
+            return await self._remote_process_document(file_path, regions, page_selection, ocr_profile)
+        
+        # 内容寻址缓存：相同文件 + 相同 OCR 配置（含识别区域、引擎配置档）直接返回
+        cache_key = None
+        if self.cache is not None:
+            cache_config = self._cache_config()
+            if regions:
+                cache_config["regions"] = regions
+            if page_selection:
+                cache_config["page_selection"] = page_selection
+            if ocr_profile:
+                cache_config["ocr_profile"] = self._engine_kwargs(TIER_SERVER, ocr_profile)
+            cache_key = await asyncio.to_thread(
+                self.cache.make_key, file_path, cache_config
+            )
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"OCR缓存命中: {file_path}")
+                return cached
+        
+        # 条码解码与 OCR 并行执行（解码只读取前几页，远快于 OCR）
+        barcode_task = asyncio.ensure_future(self.decode_barcodes(file_path))
+        try:
+            pages = [
+                page async for page in self.process_document_stream(
+                    file_path, regions, page_selection, ocr_profile
+                )
+            ]
+            result = self._assemble_result(pages)
+            
+            if regions:
+                if result["text"].strip():
+                    result["regions"] = regions
+                else:
+                    logger.info(f"模板识别区域内未识别到文本，回退整页OCR: {file_path}")
+                    pages = [
+                        page async for page in self.process_document_stream(
+                            file_path, page_selection=page_selection, ocr_profile=ocr_profile
+                        )
+                    ]
+                    result = self._assemble_result(pages)
+                    # 记录请求的区域和回退标记，同一模板重新处理时仍可复用该产物
+                    result["regions"] = regions
+                    result["regions_fallback"] = True
+            
+            # 按模板规则或关键字跳过了页面时记录选择规则（空白页不影响文本完整性）
+            if any(page.get("skipped") in ("rule", "keyword") for page in pages):
+                result["page_selection"] = page_selection
+            page_cache = result["page_cache"]
+            if page_cache["lookups"]:
+                logger.info(
+                    f"OCR页缓存: {file_path} 命中{page_cache['hits']}/{page_cache['lookups']}页"
+                    f"（{page_cache['hits'] / page_cache['lookups']:.0%}）"
+                )
+            if result["page_filter"]["skipped_pages"]:
+                logger.info(
+                    f"OCR页面筛选: {file_path} 跳过{len(result['page_filter']['skipped_pages'])}页，"
+                    f"估算节省{result['page_filter']['estimated_saved_ms']}ms"
+                )
+        except BaseException:
+            barcode_task.cancel()
+            raise
+        result["barcodes"] = await barcode_task
+        if ocr_profile:
+            result["ocr_profile"] = ocr_profile
+        
+        # 验证 OCR 结果
+        self._validate_ocr_result(result)
+        
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.put, cache_key, result)
+        
+        return result
+    
+    async def process_document_stream(
+        self,
+        file_path: str,
+        regions: Optional[List[Dict[str, Any]]] = None,
+        page_selection: Optional[Dict[str, Any]] = None,
+        ocr_profile: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页处理文档，按页序产出每页结果
+        
+        PDF 每次只栅格化并识别一页，处理完即释放图像，
+        峰值内存与总页数无关；调用方可据此展示处理进度。
+        进程池模式下多页并发识别，在途页数受 OCR_MAX_INFLIGHT_PAGES_PER_DOC 限制。
+        
+        Args:
+            file_path: 文件路径
+            regions: 识别区域（可选，格式同 process_document），指定时只处理区域所在页
+            page_selection: 页面选择规则（可选，格式同 process_document）
+            ocr_profile: 引擎配置档名称（可选，格式同 process_document）
+            
+        Yields:
+            {
+                "page": int,           # 页码（从1开始）
+                "total_pages": int,    # 总页数
+                "text": str,           # 本页文本
+                "confidence": float,   # 本页平均置信度
+                "lines": List[Dict]    # 本页每行详细信息
+                "source": str,         # 来源: text_layer（PDF文本层）/ ocr
+                "tier": str,           # 识别模型档位: mobile / server（文本层为 None）
+                "elapsed_ms": int      # 本页耗时
+                "skipped": str         # 仅跳过的页存在: blank（空白页）/ rule / keyword（模板规则）
+                "preprocess": Dict     # 仅图片存在：预处理信息
+            }
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        
+        if self.remote is not None:
+            # 远程模式本进程没有引擎：整篇转发到 OCR 服务进程，再按页拆分产出
+            result = await self._remote_process_document(file_path, regions, page_selection, ocr_profile)
+            for page in self._split_result_pages(result):
+                yield page
+            return
+        
+        if not self.is_ready:
             await self.initialize()
+        if ocr_profile:
+            # 提前校验配置档名称，避免逐页失败
+            self._engine_kwargs(TIER_SERVER, ocr_profile)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            self.executor, 
-            self._process_sync, 
-            file_path
+        # 图片先归一化（转正、缩放、纠偏、对比度），之后各阶段都读取归一化后的图片；
+        # 坐标随之位于归一化图片坐标系
+        preprocess = None
+        use_cls = True
+        if self.preprocessor is not None and not is_pdf(file_path):
+            try:
+                file_path, preprocess = await asyncio.to_thread(self.preprocessor.prepare, file_path)
+                # EXIF 已给出方向时图片已转正，跳过方向分类
+                use_cls = not preprocess["orientation_known"]
+            except Exception as e:
+                logger.warning(f"图片预处理失败，使用原图识别: {file_path} - {e}")
+        
+        total_pages = await asyncio.to_thread(count_pages, file_path)
+        
+        # 区域模式只处理声明了区域的页，各页只识别自己的区域
+        page_boxes = self._group_regions(regions, total_pages) if regions else None
+        page_indexes = sorted(page_boxes) if page_boxes is not None else list(range(total_pages))
+        
+        # OCR 前筛掉空白页和模板规则之外的页
+        filter_start = time.perf_counter()
+        ocr_indexes, skipped = await self._select_pages(file_path, page_indexes, page_selection, ocr_profile)
+        filter_ms = int((time.perf_counter() - filter_start) * 1000)
+        
+        # 进程池模式下多页并发分派到不同 worker；单进程引擎非线程安全，逐页处理
+        max_inflight = (
+            max(1, settings.OCR_MAX_INFLIGHT_PAGES_PER_DOC) if self.pool is not None else 1
         )
         
-        return result
+        pending: Deque[asyncio.Task] = deque()
+        next_pos = 0
+        try:
+            for page_index in page_indexes:
+                if page_index in skipped:
+                    # 筛选耗时均摊到跳过的页上，便于计算净节省时间
+                    yield {
+                        "page": page_index + 1,
+                        "total_pages": total_pages,
+                        "text": "",
+                        "confidence": 0.0,
+                        "lines": [],
+                        "source": None,
+                        "tier": None,
+                        "elapsed_ms": filter_ms // len(skipped),
+                        "skipped": skipped[page_index],
+                    }
+                    continue
+                
+                # 补齐在途页，单个大文件最多占用 max_inflight 个 worker
+                while next_pos < len(ocr_indexes) and len(pending) < max_inflight:
+                    next_index = ocr_indexes[next_pos]
+                    boxes = page_boxes.get(next_index) if page_boxes is not None else None
+                    pending.append(asyncio.ensure_future(
+                        self._process_page(file_path, next_index, boxes, use_cls, ocr_profile)
+                    ))
+                    next_pos += 1
+                
+                # 按页序取结果，保证输出顺序与原文一致
+                outcome = await pending.popleft()
+                page = self._build_page_result(outcome["raw"])
+                for line in page["lines"]:
+                    line["page"] = page_index + 1
+                page["source"] = outcome["source"]
+                page["tier"] = outcome["tier"]
+                page["elapsed_ms"] = outcome["elapsed_ms"]
+                if "cached" in outcome:
+                    page["cached"] = outcome["cached"]
+                page["page"] = page_index + 1
+                page["total_pages"] = total_pages
+                if preprocess is not None:
+                    page["preprocess"] = preprocess
+                logger.debug(f"OCR进度: {file_path} 第{page_index + 1}/{total_pages}页，{len(page['lines'])}行")
+                yield page
+        finally:
+            # 调用方提前退出或出错时，取消尚未完成的页任务
+            for task in pending:
+                task.cancel()
+    
+    async def _select_pages(
+        self,
+        file_path: str,
+        page_indexes: List[int],
+        page_selection: Optional[Dict[str, Any]] = None,
+        ocr_profile: Optional[str] = None
+    ) -> Tuple[List[int], Dict[int, str]]:
+        """OCR 前页面筛选（仅 PDF）
+        
+        依次应用：模板"前 N 页"规则 → 空白页检测 → 模板关键字规则。
+        关键字优先匹配文本层，无文本层的页只快速识别页面顶部区域；
+        没有任何页命中关键字时保留全部页，避免误删。
+        
+        Returns:
+            (需要识别的页索引, {跳过的页索引: 原因 blank / rule / keyword})
+        """
+        skipped: Dict[int, str] = {}
+        if not is_pdf(file_path):
+            return page_indexes, skipped
+        
+        kept = list(page_indexes)
+        page_selection = page_selection or {}
+        
+        first_pages = page_selection.get("first_pages")
+        if first_pages:
+            skipped.update({index: "rule" for index in kept if index >= first_pages})
+            kept = [index for index in kept if index < first_pages]
+        
+        if settings.OCR_SKIP_BLANK_PAGES and kept:
+            blank = await asyncio.to_thread(
+                lambda: [index for index in kept if is_blank_page(file_path, index)]
+            )
+            skipped.update({index: "blank" for index in blank})
+            kept = [index for index in kept if index not in skipped]
+        
+        keywords = page_selection.get("keywords")
+        if keywords and kept:
+            matched = [
+                index for index in kept
+                if await self._page_has_keyword(file_path, index, keywords, ocr_profile)
+            ]
+            if matched:
+                skipped.update({index: "keyword" for index in kept if index not in matched})
+                kept = matched
+            else:
+                logger.info(f"没有页面命中模板关键字 {keywords}，保留全部页: {file_path}")
+        
+        return kept, skipped
+    
+    async def _page_has_keyword(self, file_path: str, page_index: int, keywords: List[str],
+                                ocr_profile: Optional[str] = None) -> bool:
+        """快速判断页面是否含关键字：有文本层直接匹配，否则只识别页面顶部区域"""
+        text = await asyncio.to_thread(page_text, file_path, page_index)
+        if not text:
+            tier = TIER_MOBILE if settings.OCR_TIERED_ENABLED and not ocr_profile else TIER_SERVER
+            band = [[0.0, 0.0, 1.0, settings.OCR_PAGE_SELECT_KEYWORD_BAND]]
+            raw = await self._ocr_page(file_path, page_index, tier, band, ocr_profile=ocr_profile)
+            text = "\n".join(str(line[1][0]) for line in raw or [] if line and len(line) >= 2)
+        return contains_keyword(text, keywords)
+    
+    async def decode_barcodes(self, file_path: str) -> List[Dict[str, Any]]:
+        """解码文档前几页中的一维条码和二维码，失败仅记录警告
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            [{"type", "format", "value", "box", "page"}, ...]，未启用或失败时为空列表
+        """
+        if not settings.OCR_BARCODE_ENABLED:
+            return []
+        try:
+            if self.remote is not None:
+                # 远程模式同样转发到 OCR 服务进程，API worker 不读取、解码文档
+                return await self.remote.call("decode_barcodes", file_path=os.path.abspath(file_path))
+            return await asyncio.to_thread(decode_document, file_path, settings.OCR_BARCODE_MAX_PAGES)
+        except Exception as e:
+            logger.warning(f"条码解码失败: {file_path} - {e}")
+            return []
+    
+    def _group_regions(self, regions: List[Dict[str, Any]], total_pages: int) -> Dict[int, List[List[float]]]:
+        """将识别区域按页分组，返回 {页索引: [box, ...]}（超出页数的区域忽略）"""
+        grouped: Dict[int, List[List[float]]] = {}
+        for region in regions:
+            page = region.get("page")
+            indexes = range(total_pages) if page is None else [int(page) - 1]
+            for index in indexes:
+                if 0 <= index < total_pages:
+                    grouped.setdefault(index, []).append(region["box"])
+        return grouped
+    
+    async def _process_page(
+        self,
+        file_path: str,
+        page_index: int,
+        boxes: Optional[List[List[float]]] = None,
+        cls: bool = True,
+        ocr_profile: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """处理单页：优先读取 PDF 文本层，质量不达标时回退 OCR
+        
+        分级模式下先用 mobile 模型识别，置信度不达标的页再用 server 模型重识别。
+        指定 boxes 时文本层和 OCR 都只处理这些区域；cls=False 时跳过方向分类；
+        指定 ocr_profile 时直接使用配置档引擎识别。
+        
+        Returns:
+            {
+                "raw": list,           # PaddleOCR 单页原始结果格式
+                "source": str,         # 来源: text_layer / ocr
+                "tier": str,           # 最终使用的模型档位（文本层为 None）
+                "elapsed_ms": int      # 本页耗时
+                "cached": bool         # 仅查询了页缓存时存在：是否命中
+            }
+        """
+        start = time.perf_counter()
+        
+        def outcome(raw: Optional[List[Any]], source: str, tier: Optional[str]) -> Dict[str, Any]:
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+            return {"raw": raw, "source": source, "tier": tier, "elapsed_ms": elapsed_ms}
+        
+        if settings.OCR_TEXT_LAYER_ENABLED and is_pdf(file_path):
+            try:
+                lines = await asyncio.to_thread(extract_page_lines, file_path, page_index, boxes)
+            except Exception as e:
+                logger.warning(f"PDF文本层读取失败，回退OCR: {file_path} 第{page_index + 1}页 - {e}")
+                lines = None
+            if lines is not None:
+                return outcome(lines, "text_layer", None)
+        
+        # 页缓存只用于 PDF（图片整份文件即一页，由文档级缓存覆盖）
+        page_key = None
+        if self.page_cache is not None and is_pdf(file_path):
+            page_config = self._page_cache_config(boxes, cls, ocr_profile)
+            try:
+                digest = await asyncio.to_thread(page_raster_sha256, file_path, page_index)
+                page_key = f"{digest}-{config_digest(page_config)}"
+                cached = await asyncio.to_thread(self.page_cache.get, page_key)
+            except Exception as e:
+                logger.warning(f"OCR页缓存读取失败: {file_path} 第{page_index + 1}页 - {e}")
+                cached = None
+            if cached is not None:
+                return {**outcome(cached["raw"], "ocr", cached["tier"]), "cached": True}
+        
+        raw, tier = await self._ocr_page_tiered(file_path, page_index, boxes, cls, ocr_profile)
+        
+        if page_key is not None:
+            entry = {
+                "raw": [
+                    [[[float(x), float(y)] for x, y in line[0]], [str(line[1][0]), float(line[1][1])]]
+                    for line in raw or [] if line and len(line) >= 2
+                ],
+                "tier": tier,
+            }
+            await asyncio.to_thread(self.page_cache.put, page_key, entry)
+            return {**outcome(raw, "ocr", tier), "cached": False}
+        
+        return outcome(raw, "ocr", tier)
     
-    def _process_sync(self, file_path: str) -> Dict[str, Any]:
-        """同步执行OCR - 使用 PaddleOCR 的 ocr() 方法"""
-        # PaddleOCR 使用 ocr() 方法，不是 predict()
-        result = self.ocr_engine.ocr(file_path, cls=True)
+    async def _ocr_page_tiered(
+        self,
+        file_path: str,
+        page_index: int,
+        boxes: Optional[List[List[float]]],
+        cls: bool,
+        ocr_profile: Optional[str]
+    ) -> Tuple[Optional[List[Any]], str]:
+        """按配置档 / 分级策略识别单页，返回 (PaddleOCR 单页原始结果, 最终使用的模型档位)"""
+        if ocr_profile:
+            raw = await self._ocr_page(file_path, page_index, TIER_SERVER, boxes, cls, ocr_profile)
+            return raw, TIER_SERVER
+        
+        if settings.OCR_TIERED_ENABLED:
+            raw = await self._ocr_page(file_path, page_index, TIER_MOBILE, boxes, cls)
+            if not self._needs_server_tier(raw):
+                return raw, TIER_MOBILE
+            logger.debug(f"轻量模型置信度不足，使用server模型重识别: {file_path} 第{page_index + 1}页")
+        
+        return await self._ocr_page(file_path, page_index, TIER_SERVER, boxes, cls), TIER_SERVER
+    
+    def _page_cache_config(
+        self,
+        boxes: Optional[List[List[float]]],
+        cls: bool,
+        ocr_profile: Optional[str]
+    ) -> Dict[str, Any]:
+        """参与页缓存键计算的配置（页缓存保存的是过滤前的原始结果，阈值、水印不参与）"""
+        if ocr_profile:
+            engines = {"profile": self._engine_kwargs(TIER_SERVER, ocr_profile)}
+        else:
+            engines = {tier: self._engine_kwargs(tier) for tier in enabled_tiers()}
+        return {
+            "engines": engines,
+            "tier_thresholds": (
+                (settings.OCR_TIER_CONFIDENCE_THRESHOLD, settings.OCR_TIER_MAX_LOW_LINE_RATIO, self._threshold)
+                if settings.OCR_TIERED_ENABLED and not ocr_profile else None
+            ),
+            "boxes": boxes,
+            "cls": cls,
+        }
+    
+    def _needs_server_tier(self, page_result: Optional[List[Any]]) -> bool:
+        """判断 mobile 识别结果是否需要升级到 server 模型
+        
+        页平均置信度低于阈值，或低置信度行占比过高时升级；
+        无任何识别结果时同样升级（可能是轻量检测模型漏检）。
+        """
+        scores = [
+            float(line_info[1][1]) for line_info in page_result or []
+            if line_info is not None and len(line_info) >= 2
+        ]
+        if not scores:
+            return True
+        
+        avg_score = sum(scores) / len(scores)
+        low_ratio = sum(1 for score in scores if score < self._threshold) / len(scores)
+        return (avg_score < settings.OCR_TIER_CONFIDENCE_THRESHOLD
+                or low_ratio > settings.OCR_TIER_MAX_LOW_LINE_RATIO)
+    
+    async def _ocr_page(
+        self,
+        file_path: str,
+        page_index: int,
+        tier: str = TIER_SERVER,
+        boxes: Optional[List[List[float]]] = None,
+        cls: bool = True,
+        ocr_profile: Optional[str] = None
+    ) -> Optional[List[Any]]:
+        """使用指定档位（或引擎配置档）的模型识别单页（或页内指定区域），返回 PaddleOCR 原始结果"""
+        profile_kwargs = self._engine_kwargs(tier, ocr_profile) if ocr_profile else None
+        
+        if self.pool is not None:
+            # 进程池模式：分派到最空闲的 worker，由 worker 自行栅格化
+            return await self.pool.submit(
+                worker_ocr_page, file_path, page_index, tier, boxes, cls, profile_kwargs
+            )
+        
+        loop = asyncio.get_event_loop()
+        if profile_kwargs is not None:
+            # 配置档引擎首次使用时加载（不占用识别线程），不参与识别合批
+            engine = await asyncio.to_thread(self.engine_registry.get, profile_kwargs)
+            return await loop.run_in_executor(
+                self.executor, ocr_page, engine, file_path, page_index, boxes, cls
+            )
+        
+        engine = self._engine_for(tier)
+        batcher = self.batchers.get(tier)
+        if batcher is not None:
+            # 合批模式：本页只做检测和裁剪，识别交给合批器与其他文档的行一起执行
+            dt_boxes, crops = await loop.run_in_executor(
+                self.executor, detect_page, engine, file_path, page_index, boxes, cls
+            )
+            rec_res = await batcher.recognize(crops)
+            return merge_page_result(engine, dt_boxes, rec_res)
         
+        return await loop.run_in_executor(
+            self.executor,
+            ocr_page,
+            engine,
+            file_path,
+            page_index,
+            boxes,
+            cls
+        )
+    
+    def _engine_for(self, tier: str) -> Optional["PaddleOCR"]:
+        """获取线程模式下指定档位的引擎"""
+        return self.mobile_engine if tier == TIER_MOBILE else self.ocr_engine
+    
+    def _cache_config(self) -> Dict[str, Any]:
+        """参与缓存键计算的 OCR 配置（任一项变化都会使旧缓存失效）"""
+        return {
+            "engine": self._engine_kwargs(),
+            "threshold": self._threshold,
+            "watermarks": self._watermarks,
+            "text_layer": (
+                settings.OCR_TEXT_LAYER_ENABLED,
+                settings.OCR_TEXT_LAYER_MIN_CHARS,
+                settings.OCR_TEXT_LAYER_MIN_QUALITY,
+            ),
+            "tiers": {tier: self._engine_kwargs(tier) for tier in enabled_tiers()},
+            "tier_thresholds": (
+                settings.OCR_TIER_CONFIDENCE_THRESHOLD,
+                settings.OCR_TIER_MAX_LOW_LINE_RATIO,
+            ),
+            "blank_pages": (settings.OCR_SKIP_BLANK_PAGES, settings.OCR_BLANK_PAGE_INK_RATIO),
+            "preprocess": self.preprocessor.config() if self.preprocessor else None,
+            "barcode": (settings.OCR_BARCODE_ENABLED, settings.OCR_BARCODE_MAX_PAGES),
+        }
+    
+    def _build_page_result(self, page_result: Optional[List[Any]]) -> Dict[str, Any]:
+        """将单页 PaddleOCR 原始结果解析为页结果（过滤低置信度和水印）"""
         lines = []
         total_score = 0
-        valid_count = 0
         
-        # PaddleOCR ocr() 返回格式: [[box, (text, score)], ...] 每页一个列表
-        if result:
-            for page_result in result:
-                if page_result is None:
-                    continue
-                for line_info in page_result:
-                    if line_info is None or len(line_info) < 2:
-                        continue
-                    # line_info 格式: [box_coords, (text, confidence)]
-                    text_info = line_info[1]
-                    if isinstance(text_info, tuple) and len(text_info) >= 2:
-                        text = str(text_info[0]).strip()
-                        score = float(text_info[1])
-                    else:
-                        continue
-                    
-                    # 过滤低置信度和水印 - 来自MVP逻辑
-                    if (score >= self._threshold 
-                        and text 
-                        and not any(wm in text.lower() for wm in self._watermarks)):
-                        lines.append({
-                            "text": text,
-                            "confidence": float(score)
-                        })
-                        total_score += score
-                        valid_count += 1
+        # PaddleOCR 单页返回格式: [[box, (text, score)], ...]
+        for line_info in page_result or []:
+            if line_info is None or len(line_info) < 2:
+                continue
+            # line_info 格式: [box_coords, (text, confidence)]
+            text_info = line_info[1]
+            if isinstance(text_info, (tuple, list)) and len(text_info) >= 2:
+                text = str(text_info[0]).strip()
+                score = float(text_info[1])
+            else:
+                continue
+            
+            # 过滤低置信度和水印 - 来自MVP逻辑
+            if (score >= self._threshold 
+                and text 
+                and not any(wm in text.lower() for wm in self._watermarks)):
+                lines.append({
+                    "text": text,
+                    "confidence": float(score),
+                    "box": [[float(x), float(y)] for x, y in line_info[0]]
+                })
+                total_score += score
+        
+        return {
+            "text": "\n".join(line["text"] for line in lines),
+            "confidence": total_score / len(lines) if lines else 0.0,
+            "lines": lines
+        }
+    
+    def _assemble_result(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按页序合并各页结果为文档结果字典"""
+        lines = [line for page in pages for line in page["lines"]]
         
         # 计算平均置信度
-        avg_confidence = total_score / valid_count if valid_count > 0 else 0.0
+        avg_confidence = (
+            sum(line["confidence"] for line in lines) / len(lines) if lines else 0.0
+        )
         
         # 合并文本
         full_text = "\n".join([line["text"] for line in lines])
         
-        result = {
+        # 结果来源：全部来自文本层 / 全部 OCR / 混合（跳过的页不计入）
+        processed = [page for page in pages if not page.get("skipped")]
+        sources = {page.get("source", "ocr") for page in processed} or {"ocr"}
+        source = sources.pop() if len(sources) == 1 else "mixed"
+        
+        # 页面筛选节省的时间：按本文档实际 OCR 页的平均耗时估算，扣除筛选本身的耗时
+        skipped = [page for page in pages if page.get("skipped")]
+        ocr_elapsed = [
+            page.get("elapsed_ms", 0) for page in processed
+            if page.get("source") == "ocr" and not page.get("cached")
+        ]
+        avg_ocr_ms = sum(ocr_elapsed) / len(ocr_elapsed) if ocr_elapsed else 0
+        estimated_saved_ms = int(
+            avg_ocr_ms * len(skipped) - sum(page.get("elapsed_ms", 0) for page in skipped)
+        )
+        
+        return {
             "text": full_text,
             "confidence": avg_confidence,
             "lines": lines,
-            "total_lines": len(lines)
+            "total_lines": len(lines),
+            "total_pages": len(pages),
+            "source": source,
+            # 每页处理摘要，用于评估分级识别的耗时/精度取舍
+            "pages": [
+                {
+                    "page": page.get("page"),
+                    "source": page.get("source"),
+                    "tier": page.get("tier"),
+                    "confidence": page.get("confidence"),
+                    "elapsed_ms": page.get("elapsed_ms"),
+                    "skipped": page.get("skipped"),
+                    "cached": page.get("cached"),
+                }
+                for page in pages
+            ],
+            # 页缓存命中情况（只统计查询了页缓存的 OCR 页）
+            "page_cache": {
+                "hits": sum(1 for page in pages if page.get("cached")),
+                "lookups": sum(1 for page in pages if "cached" in page),
+            },
+            "page_filter": {
+                "skipped_pages": [
+                    {"page": page.get("page"), "reason": page.get("skipped")} for page in skipped
+                ],
+                "estimated_saved_ms": max(0, estimated_saved_ms),
+            },
+            "preprocess": next((page["preprocess"] for page in pages if page.get("preprocess")), None)
         }
+    
+    @staticmethod
+    def _split_result_pages(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """把整篇结果还原为 process_document_stream 的逐页格式（远程模式使用）"""
+        lines_by_page: Dict[int, List[Dict[str, Any]]] = {}
+        for line in result.get("lines", []):
+            lines_by_page.setdefault(line.get("page", 1), []).append(line)
         
-        # 验证 OCR 结果
-        self._validate_ocr_result(result)
+        total_pages = result.get("total_pages", 0)
+        pages = []
+        for summary in result.get("pages", []):
+            lines = lines_by_page.get(summary["page"], [])
+            page = {
+                "page": summary["page"],
+                "total_pages": total_pages,
+                "text": "\n".join(line["text"] for line in lines),
+                "confidence": summary.get("confidence") or 0.0,
+                "lines": lines,
+                "source": summary.get("source"),
+                "tier": summary.get("tier"),
+                "elapsed_ms": summary.get("elapsed_ms") or 0,
+            }
+            if summary.get("skipped"):
+                page["skipped"] = summary["skipped"]
+            if summary.get("cached") is not None:
+                page["cached"] = summary["cached"]
+            pages.append(page)
+        if pages and result.get("preprocess"):
+            pages[0]["preprocess"] = result["preprocess"]
+        return pages
+    
+    # ============ OCR 产物 ============
+    
+    async def save_artifact(self, document_id: str, result: Dict[str, Any]) -> Optional[str]:
+        """持久化文档的 OCR 产物（文本、行坐标、置信度），失败仅记录警告
         
-        return result
+        Args:
+            document_id: 文档ID
+            result: process_document 的返回结果
+            
+        Returns:
+            产物文件路径，失败时返回 None
+        """
+        try:
+            return await asyncio.to_thread(self.artifacts.save, document_id, result)
+        except Exception as e:
+            logger.warning(f"保存OCR产物失败: {document_id} - {e}")
+            return None
+    
+    def load_artifact(self, document_id: str) -> Optional[OCRArtifact]:
+        """获取文档的 OCR 产物句柄（惰性加载，首次访问属性时才读盘解压）
+        
+        Args:
+            document_id: 文档ID
+            
+        Returns:
+            OCRArtifact，未保存过时返回 None
+        """
+        return self.artifacts.load(document_id)
     
     def _validate_ocr_result(self, result: Dict[str, Any]) -> None:
         """验证 OCR 结果的完整性和质量
@@ -216,8 +1015,7 @@ class OCRService:
         if not self.ocr_engine:
             self.ocr_engine = self._init_ocr_sync()
         
-        # PaddleOCR 使用 ocr() 方法
-        result = self.ocr_engine.ocr(file_path, cls=True)
+        result = run_ocr(self.ocr_engine, file_path)
         
         filtered_results = []
         if result:
@@ -241,19 +1039,77 @@ class OCRService:
         
         return filtered_results
     
-    async def process_batch(self, file_paths: List[str]) -> Dict[str, Any]:
-        """批量处理文档"""
-        tasks = [self.process_document(path) for path in file_paths]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def process_batch_stream(
+        self,
+        file_paths: List[str],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """批量处理文档，按完成顺序产出结果
         
-        output = {}
-        for path, result in zip(file_paths, results):
-            if isinstance(result, Exception):
-                output[path] = {"error": str(result)}
-            else:
-                output[path] = result
+        最多 concurrency 个文档同时处理，其余文档排队、不提前占用执行器；
+        调用方提前退出（break / aclose / 任务取消）时，在途文档被取消，排队文档不再开始。
         
-        return output
+        Args:
+            file_paths: 文件路径列表
+            concurrency: 同时处理的文档数，默认取 OCR_BATCH_CONCURRENCY
+            timeout: 单个文档超时秒数（0 表示不限），默认取 OCR_BATCH_ITEM_TIMEOUT
+            
+        Yields:
+            (file_path, result)，失败或超时时 result 为 {"error": str}
+        """
+        concurrency = max(1, concurrency or settings.OCR_BATCH_CONCURRENCY)
+        timeout = settings.OCR_BATCH_ITEM_TIMEOUT if timeout is None else timeout
+        queued = iter(file_paths)
+        running: Dict[asyncio.Future, str] = {}
+        
+        def start_next() -> None:
+            for path in queued:
+                job = self.process_document(path)
+                if timeout and timeout > 0:
+                    job = asyncio.wait_for(job, timeout)
+                running[asyncio.ensure_future(job)] = path
+                return
+        
+        try:
+            for _ in range(concurrency):
+                start_next()
+            
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path = running.pop(task)
+                    start_next()
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        logger.warning(f"批量处理超时: {path}（{timeout}秒）")
+                        result = {"error": f"处理超时（{timeout}秒）"}
+                    except Exception as e:
+                        logger.error(f"批量处理失败: {path} - {e}")
+                        result = {"error": str(e)}
+                    yield path, result
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+    
+    async def process_batch(
+        self,
+        file_paths: List[str],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """批量处理文档，全部完成后按输入顺序返回 {file_path: result}
+        
+        参数同 process_batch_stream。
+        """
+        results = {
+            path: result
+            async for path, result in self.process_batch_stream(file_paths, concurrency, timeout)
+        }
+        return {path: results[path] for path in file_paths}
     
     def get_supported_formats(self) -> List[str]:
         """获取支持的文件格式"""
@@ -261,6 +1117,12 @@ class OCRService:
     
     async def close(self):
         """关闭服务"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        for batcher in self.batchers.values():
+            batcher.shutdown(wait=True)
+        self.batchers.clear()
         if self.executor:
             self.executor.shutdown(wait=True)
             logger.info("OCR服务已关闭")
@@ -268,6 +1130,3 @@ class OCRService:
 
 # 单例实例
 ocr_service = OCRService()
-
-
-
@@ -0,0 +1,300 @@
+# services/ocr_tuner.py
+"""OCR 自动调优 - 在本机实测选择最快且精度达标的引擎参数
+
+每台新服务器的核数、指令集不同，CPU 线程数、MKL-DNN 等参数需要实测才能确定。
+调优器使用内置的校准页（合成的检测报告文本），分两个阶段测量：
+
+1. 引擎参数：cpu_threads × enable_mkldnn × det_limit_side_len，
+   测量单引擎吞吐（页/秒）和识别精度（与校准文本的相似度）
+2. 进程池大小：基于第一阶段最优参数，测量不同 worker 数下的整体吞吐
+
+在满足精度下限的候选中选择吞吐最高者，结果保存为 JSON，之后启动时直接加载。
+
+命令行用法:
+    python -m services.ocr_tuner [--floor 0.9] [--repeats 2] [--output ./data/ocr_tuning.json]
+"""
+
+import os
+import json
+import time
+import asyncio
+import difflib
+import argparse
+import platform
+import tempfile
+import itertools
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from services.ocr_engine import TIER_SERVER, build_engine_kwargs, create_engine, ocr_page
+from services.ocr_pool import OCREnginePool, worker_ocr_page
+
+
+PROFILE_VERSION = 1
+
+# 内置校准页：与业务文档相近的检测报告字段（cv2 只能绘制 ASCII 字符）
+CALIBRATION_PAGES: List[List[str]] = [
+    [
+        "TEST REPORT No. GZ2024-0815",
+        "Sample Name: LED Panel Light",
+        "Model: NF-P600-40W",
+        "Rated Voltage: AC 220-240V 50/60Hz",
+        "Rated Power: 40.2 W",
+        "Luminous Flux: 4012 lm",
+        "Luminous Efficacy: 99.8 lm/W",
+        "CCT: 4000 K",
+        "CRI Ra: 83.5",
+        "Power Factor: 0.95",
+    ],
+    [
+        "Integrating Sphere Test Data",
+        "Voltage 230.0 V  Current 0.176 A",
+        "Power 40.21 W  PF 0.952",
+        "Flux 4012.3 lm  Efficacy 99.78 lm/W",
+        "x 0.3805  y 0.3768  u' 0.2248",
+        "CCT 3987 K  Duv 0.0012",
+        "Ra 83.5  R9 12.4",
+        "Peak Wavelength 451.0 nm",
+        "Test Date: 2024-08-15",
+    ],
+    [
+        "Goniophotometer Report",
+        "Beam Angle: 118.6 deg",
+        "Max Intensity: 1342.5 cd",
+        "C0-C180 Half Angle: 59.1 deg",
+        "C90-C270 Half Angle: 59.5 deg",
+        "UGR: 18.7",
+        "Manufacturer: Shenzhen Example Lighting Co., Ltd.",
+        "Address: No. 88 Keji Road, Nanshan District",
+    ],
+]
+
+
+# ============ 校准数据 ============
+
+def render_calibration_page(lines: List[str]) -> np.ndarray:
+    """将校准文本绘制为 A4 比例的白底页面（BGR）"""
+    img = np.full((1754, 1240, 3), 255, dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(img, line, (80, 160 + i * 90), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.1, (0, 0, 0), 2, cv2.LINE_AA)
+    return img
+
+
+def write_calibration_set(output_dir: str) -> List[Tuple[str, str]]:
+    """生成校准图片，返回 [(图片路径, 期望文本), ...]"""
+    samples = []
+    for i, lines in enumerate(CALIBRATION_PAGES):
+        path = os.path.join(output_dir, f"calibration_{i}.png")
+        cv2.imwrite(path, render_calibration_page(lines))
+        samples.append((path, "\n".join(lines)))
+    return samples
+
+
+def text_accuracy(expected: str, recognized: str) -> float:
+    """识别精度：忽略空白后的字符序列相似度（0~1）"""
+    a = "".join(expected.split())
+    b = "".join(recognized.split())
+    if not a:
+        return 1.0 if not b else 0.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def _page_text(page_result: Optional[List[Any]]) -> str:
+    return "\n".join(str(line[1][0]) for line in page_result or [] if line and len(line) >= 2)
+
+
+# ============ 候选配置 ============
+
+def cpu_thread_candidates(cpu_count: int) -> List[int]:
+    """CPU 线程数候选：2 的幂次及本机核数，不超过核数"""
+    return sorted({n for n in (1, 2, 4, 8, 16) if n <= cpu_count} | {cpu_count})
+
+
+def engine_candidates(cpu_count: int) -> List[Dict[str, Any]]:
+    """引擎参数候选组合"""
+    return [
+        {"cpu_threads": threads, "enable_mkldnn": mkldnn, "det_limit_side_len": limit}
+        for threads, mkldnn, limit in itertools.product(
+            cpu_thread_candidates(cpu_count), (False, True), (736, 960)
+        )
+    ]
+
+
+def pool_size_candidates(cpu_count: int, cpu_threads: int) -> List[int]:
+    """进程池大小候选：0 为单进程模式，多 worker 时总线程数不超过核数"""
+    return [0] + [n for n in (2, 4, 8, 16) if n * cpu_threads <= cpu_count]
+
+
+# ============ 测量 ============
+
+def benchmark_engine(overrides: Dict[str, Any], samples: List[Tuple[str, str]],
+                     repeats: int = 2) -> Dict[str, Any]:
+    """测量一组引擎参数的单引擎吞吐和识别精度"""
+    load_start = time.perf_counter()
+    engine = create_engine(build_engine_kwargs(TIER_SERVER, overrides))
+    load_sec = time.perf_counter() - load_start
+
+    # 预热：首次推理包含内存分配、算子初始化等一次性开销
+    ocr_page(engine, samples[0][0], 0)
+
+    accuracies = []
+    start = time.perf_counter()
+    for _ in range(max(1, repeats)):
+        for path, expected in samples:
+            accuracies.append(text_accuracy(expected, _page_text(ocr_page(engine, path, 0))))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "engine": overrides,
+        "pages_per_sec": round(len(accuracies) / elapsed, 3),
+        "accuracy": round(sum(accuracies) / len(accuracies), 4),
+        "load_sec": round(load_sec, 2),
+    }
+
+
+async def benchmark_pool(size: int, engine_kwargs: Dict[str, Any],
+                         samples: List[Tuple[str, str]], repeats: int = 2) -> float:
+    """测量指定 worker 数的进程池整体吞吐（页/秒）"""
+    pool = OCREnginePool(size, {TIER_SERVER: engine_kwargs})
+    try:
+        await pool.start()
+        # 每个 worker 预热一页
+        await asyncio.gather(*[
+            pool.submit(worker_ocr_page, samples[0][0], 0, TIER_SERVER) for _ in range(size)
+        ])
+        pages = [path for path, _ in samples] * max(1, repeats) * size
+        start = time.perf_counter()
+        await asyncio.gather(*[pool.submit(worker_ocr_page, path, 0, TIER_SERVER) for path in pages])
+        return round(len(pages) / (time.perf_counter() - start), 3)
+    finally:
+        pool.shutdown(wait=True)
+
+
+async def run_tuning(accuracy_floor: Optional[float] = None,
+                     repeats: Optional[int] = None) -> Dict[str, Any]:
+    """执行完整调优，返回调优结果（不落盘）
+
+    Args:
+        accuracy_floor: 精度下限，默认取 OCR_AUTOTUNE_ACCURACY_FLOOR
+        repeats: 每个候选重复识别校准集的次数，默认取 OCR_AUTOTUNE_REPEATS
+    """
+    floor = settings.OCR_AUTOTUNE_ACCURACY_FLOOR if accuracy_floor is None else accuracy_floor
+    repeats = settings.OCR_AUTOTUNE_REPEATS if repeats is None else repeats
+    cpu_count = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="ocr_tuning_") as tmp_dir:
+        samples = write_calibration_set(tmp_dir)
+
+        # 阶段一：引擎参数
+        results = []
+        for overrides in engine_candidates(cpu_count):
+            try:
+                result = await asyncio.to_thread(benchmark_engine, overrides, samples, repeats)
+            except Exception as e:
+                # 部分 CPU 不支持 MKL-DNN 等情况，跳过该候选
+                logger.warning(f"OCR调优候选失败，已跳过: {overrides} - {e}")
+                continue
+            logger.info(
+                f"OCR调优: {overrides} → {result['pages_per_sec']} 页/秒，精度 {result['accuracy']}"
+            )
+            results.append(result)
+
+        if not results:
+            raise RuntimeError("OCR调优失败：所有候选配置均无法运行")
+
+        qualified = [r for r in results if r["accuracy"] >= floor]
+        if qualified:
+            best = max(qualified, key=lambda r: r["pages_per_sec"])
+        else:
+            logger.warning(f"没有候选配置达到精度下限 {floor}，选择精度最高的配置")
+            best = max(results, key=lambda r: r["accuracy"])
+
+        # 阶段二：进程池大小
+        pool_results = [{"pool_size": 0, "pages_per_sec": best["pages_per_sec"]}]
+        engine_kwargs = build_engine_kwargs(TIER_SERVER, best["engine"])
+        for size in pool_size_candidates(cpu_count, best["engine"]["cpu_threads"])[1:]:
+            try:
+                pps = await benchmark_pool(size, engine_kwargs, samples, repeats)
+            except Exception as e:
+                logger.warning(f"OCR调优进程池测量失败，已跳过: size={size} - {e}")
+                continue
+            logger.info(f"OCR调优: 进程池 {size} 个 worker → {pps} 页/秒")
+            pool_results.append({"pool_size": size, "pages_per_sec": pps})
+        best_pool = max(pool_results, key=lambda r: r["pages_per_sec"])
+
+    return {
+        "version": PROFILE_VERSION,
+        "engine": best["engine"],
+        "pool_size": best_pool["pool_size"],
+        "pages_per_sec": best_pool["pages_per_sec"],
+        "accuracy": best["accuracy"],
+        "accuracy_floor": floor,
+        "cpu_count": cpu_count,
+        "machine": platform.node(),
+        "tuned_at": datetime.now().isoformat(),
+        "candidates": results,
+        "pool_candidates": pool_results,
+    }
+
+
+# ============ 结果持久化 ============
+
+def save_profile(profile: Dict[str, Any], path: Optional[str] = None) -> str:
+    """保存调优结果"""
+    path = path or settings.OCR_AUTOTUNE_PROFILE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_profile(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """加载调优结果；不存在、版本不符或核数变化（换了机器）时返回 None"""
+    path = path or settings.OCR_AUTOTUNE_PROFILE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"OCR调优结果读取失败: {path} - {e}")
+        return None
+
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    if profile.get("cpu_count") != (os.cpu_count() or 1):
+        logger.info("CPU 核数与调优时不一致，调优结果已失效")
+        return None
+    return profile
+
+
+def summarize_profile(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """调优结果摘要（用于健康检查接口）"""
+    if not profile:
+        return None
+    return {
+        key: profile.get(key)
+        for key in ("engine", "pool_size", "pages_per_sec", "accuracy", "accuracy_floor", "tuned_at")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OCR 引擎参数自动调优")
+    parser.add_argument("--floor", type=float, default=None, help="精度下限（0~1）")
+    parser.add_argument("--repeats", type=int, default=None, help="校准集重复次数")
+    parser.add_argument("--output", default=None, help="结果保存路径")
+    args = parser.parse_args()
+
+    profile = asyncio.run(run_tuning(args.floor, args.repeats))
+    path = save_profile(profile, args.output)
+    print(json.dumps(summarize_profile(profile), ensure_ascii=False, indent=2))
+    print(f"调优结果已保存: {path}（设置 OCR_AUTOTUNE_ENABLED=true 后启动时生效）")
+
+
+if __name__ == "__main__":
+    main()
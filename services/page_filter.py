@@ -0,0 +1,77 @@
+# services/page_filter.py
+"""OCR 前页面筛选 - 空白页检测与模板页面选择规则
+
+上传的 PDF 常带封面、空白分隔页和很长的附录，而提取只用到前几页。
+在 OCR 之前用低成本手段筛掉这些页：
+
+- 空白页：文本层为空时，按低分辨率缩略图的深色像素占比判断
+- 模板规则：只取前 N 页，或只取（快速识别出）含关键字的页
+"""
+
+from typing import Any, Dict, List, Optional
+import fitz
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+
+
+# 空白页检测使用的缩略图长边像素
+_THUMBNAIL_SIDE = 200
+
+
+def page_ink_ratio(file_path: str, page_index: int) -> float:
+    """页面深色像素占比（低分辨率灰度缩略图，相对背景亮度判断，兼容灰底扫描件）"""
+    with fitz.open(file_path) as pdf:
+        page = pdf[page_index]
+        zoom = _THUMBNAIL_SIDE / max(page.rect.width, page.rect.height, 1)
+        pm = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pm.samples, dtype=np.uint8).reshape(pm.height, pm.width)
+    background = float(np.median(gray))
+    return float(np.mean(gray < background - 60))
+
+
+def page_text(file_path: str, page_index: int) -> str:
+    """读取 PDF 单页文本层（无文本层时为空字符串）"""
+    with fitz.open(file_path) as pdf:
+        return pdf[page_index].get_text().strip()
+
+
+def is_blank_page(file_path: str, page_index: int) -> bool:
+    """判断 PDF 页是否为空白页：无文本层且几乎没有深色像素"""
+    if page_text(file_path, page_index):
+        return False
+    return page_ink_ratio(file_path, page_index) < settings.OCR_BLANK_PAGE_INK_RATIO
+
+
+def parse_page_selection(raw: Any) -> Optional[Dict[str, Any]]:
+    """规范化模板页面选择规则（document_templates.page_selection）
+
+    格式: {"first_pages": 2, "keywords": ["检测报告", "测试结果"]}
+    - first_pages: 只处理前 N 页
+    - keywords: 只处理含任一关键字的页（文本层或页面顶部快速识别）
+    """
+    if not isinstance(raw, dict):
+        return None
+
+    selection: Dict[str, Any] = {}
+    try:
+        if raw.get("first_pages"):
+            selection["first_pages"] = max(1, int(raw["first_pages"]))
+    except (TypeError, ValueError):
+        logger.warning(f"忽略非法的 first_pages 配置: {raw.get('first_pages')}")
+
+    keywords = raw.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    keywords = [str(k).strip() for k in keywords if str(k).strip()]
+    if keywords:
+        selection["keywords"] = keywords
+
+    return selection or None
+
+
+def contains_keyword(text: str, keywords: List[str]) -> bool:
+    """文本是否包含任一关键字（忽略空白，OCR 常在字间插入空格）"""
+    compact = "".join(text.split()).lower()
+    return any("".join(k.split()).lower() in compact for k in keywords)
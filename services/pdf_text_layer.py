@@ -0,0 +1,80 @@
+# services/pdf_text_layer.py
+"""PDF 文本层提取 - 数字生成的 PDF 直接读取内嵌文本，跳过 OCR
+
+检测报告、积分球/光分布导出等 PDF 通常自带文本层，
+逐页读取文本并做覆盖率和质量检查，通过则直接作为该页识别结果。
+"""
+
+import re
+from typing import Any, List, Optional
+import fitz
+
+from config.settings import settings
+from services.ocr_engine import raster_zoom
+
+
+# 视为"有效"的字符：中日韩文字、字母数字、空白及常见中英文标点
+_VALID_CHAR_PATTERN = re.compile(
+    r"[一-鿿㐀-䶿＀-￯A-Za-z0-9\s"
+    r"，。、；：？！“”‘’（）《》【】—…·"
+    r"\.,;:?!'\"()\[\]{}<>/\\|@#$%^&*+=_~`°±×÷≤≥μΩ℃%-]"
+)
+
+
+def text_quality(text: str) -> float:
+    """文本质量评分：有效字符占比（字体编码异常时会出现大量乱码/私有区字符）"""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    valid = sum(1 for c in chars if _VALID_CHAR_PATTERN.match(c))
+    return valid / len(chars)
+
+
+def _in_regions(box: List[List[float]], boxes: List[List[float]], width: float, height: float) -> bool:
+    """行中心点是否落在任一归一化区域内"""
+    cx = (box[0][0] + box[2][0]) / 2 / width
+    cy = (box[0][1] + box[2][1]) / 2 / height
+    return any(x0 <= cx <= x1 and y0 <= cy <= y1 for x0, y0, x1, y1 in boxes)
+
+
+def extract_page_lines(file_path: str, page_index: int,
+                       boxes: Optional[List[List[float]]] = None) -> Optional[List[Any]]:
+    """读取单页文本层，质量达标时返回 PaddleOCR 单页结果格式，否则返回 None
+
+    返回格式与 PaddleOCR 一致: [[box, (text, score)], ...]，
+    box 换算到与 OCR 栅格化相同的像素坐标系，score 固定为 1.0。
+    指定 boxes（归一化坐标区域）时只保留中心点落在区域内的行。
+    """
+    with fitz.open(file_path) as pdf:
+        page = pdf[page_index]
+        zoom = raster_zoom(page)
+        width, height = page.rect.width * zoom, page.rect.height * zoom
+        page_dict = page.get_text("dict")
+
+    lines = []
+    for block in page_dict.get("blocks", []):
+        # type 0 为文本块，图片块跳过
+        if block.get("type") != 0:
+            continue
+        for line in block.get("lines", []):
+            text = "".join(span.get("text", "") for span in line.get("spans", [])).strip()
+            if not text:
+                continue
+            x0, y0, x1, y1 = (v * zoom for v in line["bbox"])
+            box = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+            lines.append([box, (text, 1.0)])
+
+    if boxes:
+        lines = [line for line in lines if _in_regions(line[0], boxes, width, height)]
+
+    # 覆盖率：字符数不足说明是扫描件或仅含少量页眉页脚（区域模式下只要求非空）
+    all_text = "".join(line[1][0] for line in lines)
+    min_chars = 1 if boxes else settings.OCR_TEXT_LAYER_MIN_CHARS
+    if len(all_text) < min_chars:
+        return None
+
+    # 质量：乱码比例过高说明字体未嵌入 ToUnicode 映射
+    if text_quality(all_text) < settings.OCR_TEXT_LAYER_MIN_QUALITY:
+        return None
+
+    return lines
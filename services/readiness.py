@@ -0,0 +1,107 @@
+# services/readiness.py
+"""组件就绪状态 - 重型依赖在后台加载，健康检查实时查询
+
+OCR 模型、LangChain/LangGraph 工作流等组件加载需要数秒，
+应用启动时只登记加载函数并在后台执行，API 立即可用：
+健康检查直接返回各组件状态，依赖某组件的请求等待其加载完成。
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from loguru import logger
+
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+class ComponentNotReadyError(RuntimeError):
+    """组件加载失败"""
+    pass
+
+
+class ReadinessRegistry:
+    """后台加载的组件登记表
+
+    加载失败的组件在下一次 get() 时重新加载（如依赖的服务晚于 API 启动）。
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[str, Any] = {}
+
+    def register(self, name: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        """登记组件及其异步加载函数（返回值可通过 get() 获取）"""
+        self._loaders[name] = loader
+        self._status[name] = {"state": STATE_PENDING, "elapsed_ms": None, "error": None}
+
+    def start(self) -> None:
+        """在后台开始加载全部尚未加载的组件"""
+        for name in self._loaders:
+            self._ensure_task(name)
+
+    def _ensure_task(self, name: str) -> asyncio.Task:
+        task = self._tasks.get(name)
+        if task is None or (task.done() and self._status[name]["state"] == STATE_FAILED):
+            task = asyncio.ensure_future(self._load(name))
+            self._tasks[name] = task
+        return task
+
+    async def _load(self, name: str) -> None:
+        status = self._status[name]
+        status.update(state=STATE_LOADING, error=None)
+        start = time.perf_counter()
+        try:
+            self._values[name] = await self._loaders[name]()
+            status["state"] = STATE_READY
+        except Exception as e:
+            status.update(state=STATE_FAILED, error=str(e))
+            logger.warning(f"⚠ 组件加载失败 [{name}]: {e}")
+        finally:
+            status["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+        if status["state"] == STATE_READY:
+            logger.info(f"✓ 组件就绪 [{name}]: {status['elapsed_ms']}ms")
+
+    async def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """获取组件（未加载时触发加载并等待，失败时抛出 ComponentNotReadyError）"""
+        if name not in self._loaders:
+            raise KeyError(f"未登记的组件: {name}")
+        task = self._ensure_task(name)
+        # shield：调用方超时或取消不影响后台加载
+        await asyncio.wait_for(asyncio.shield(task), timeout)
+        if self._status[name]["state"] != STATE_READY:
+            raise ComponentNotReadyError(f"组件 {name} 加载失败: {self._status[name]['error']}")
+        return self._values[name]
+
+    def is_ready(self, name: str) -> bool:
+        return self._status.get(name, {}).get("state") == STATE_READY
+
+    @property
+    def all_ready(self) -> bool:
+        return all(status["state"] == STATE_READY for status in self._status.values())
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """各组件状态 {名称: {"state", "elapsed_ms", "error"}}"""
+        return {name: dict(status) for name, status in self._status.items()}
+
+    async def wait_all(self) -> Dict[str, Dict[str, Any]]:
+        """等待全部组件加载结束（成功或失败），返回各组件状态"""
+        if self._tasks:
+            await asyncio.gather(*[asyncio.shield(task) for task in self._tasks.values()])
+        return self.status()
+
+    async def shutdown(self) -> None:
+        """取消仍在加载的组件"""
+        for task in self._tasks.values():
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+# 单例实例
+readiness = ReadinessRegistry()
@@ -0,0 +1,194 @@
+# services/stage_pipeline.py
+"""分阶段流水线 - 每个阶段独立的有界队列和 worker 数
+
+文档处理的各步骤瓶颈不同：OCR 受 CPU/进程池限制，分类和提取受 LLM 接口延迟限制，
+持久化受数据库往返限制。串行执行时 OCR 期间 LLM 连接空闲，反之亦然。
+流水线把各步骤拆成阶段，文档在阶段之间独立流转，每个阶段按自身瓶颈配置并发数，
+队列满时上游阶段等待（背压），不会无限堆积。
+
+任务为 dict：阶段处理函数抛出异常或设置 job["error"] 后，任务跳过后续普通阶段，
+只进入 run_on_error 的阶段（如持久化失败状态）。
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from loguru import logger
+
+
+StageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PipelineStage:
+    """流水线阶段
+
+    Args:
+        name: 阶段名称
+        handler: 处理函数，原地更新任务 dict
+        workers: 并发 worker 数
+        queue_size: 阶段输入队列容量
+        run_on_error: 前序阶段失败的任务是否仍进入本阶段
+    """
+
+    def __init__(self, name: str, handler: StageHandler, workers: int = 1,
+                 queue_size: int = 64, run_on_error: bool = False):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.run_on_error = run_on_error
+        self.queue: Optional[asyncio.Queue] = None
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def stats(self, uptime: float) -> Dict[str, Any]:
+        """阶段运行统计（utilization 为启动以来 worker 忙碌时间占比）"""
+        capacity = self.workers * uptime
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": self.queue_size,
+            "processed": self.processed,
+            "failed": self.failed,
+            "utilization": round(self.busy_seconds / capacity, 4) if capacity else 0.0,
+            "avg_seconds": round(self.busy_seconds / self.processed, 3) if self.processed else 0.0,
+            "avg_wait_seconds": round(self.wait_seconds / self.processed, 3) if self.processed else 0.0,
+        }
+
+
+class _Job:
+    __slots__ = ("data", "future", "enqueued_at")
+
+    def __init__(self, data: Dict[str, Any], future: asyncio.Future):
+        self.data = data
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class StagePipeline:
+    """分阶段流水线（在事件循环中运行）
+
+    Args:
+        name: 流水线名称（日志用）
+        stages: 按顺序排列的阶段
+    """
+
+    def __init__(self, name: str, stages: List[PipelineStage]):
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.name = name
+        self.stages = stages
+        self._workers: List[asyncio.Task] = []
+        self._jobs: set = set()
+        self._started_at: Optional[float] = None
+        self._stopping = False
+        self.submitted = 0
+        self.completed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        """创建各阶段队列并启动 worker"""
+        if self._workers:
+            return
+        for index, stage in enumerate(self.stages):
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.ensure_future(self._worker(index)))
+        self._started_at = time.monotonic()
+        logger.info(
+            f"✓ 流水线 [{self.name}] 已启动: "
+            + "，".join(f"{stage.name}×{stage.workers}" for stage in self.stages)
+        )
+
+    async def stop(self) -> None:
+        """停止 worker，未完成的任务以 CancelledError 结束"""
+        self._stopping = True
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._stopping = False
+        for job in self._jobs:
+            if not job.future.done():
+                job.future.cancel()
+        self._jobs.clear()
+
+    async def submit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """提交任务并等待其流经全部阶段（首个阶段队列满时等待）
+
+        Returns:
+            处理后的任务 dict（失败时含 "error"）
+        """
+        if not self._workers:
+            raise RuntimeError(f"流水线 [{self.name}] 未启动")
+        job = _Job(data, asyncio.get_running_loop().create_future())
+        self._jobs.add(job)
+        self.submitted += 1
+        try:
+            await self.stages[0].queue.put(job)
+            return await job.future
+        finally:
+            self._jobs.discard(job)
+
+    async def _worker(self, index: int) -> None:
+        stage = self.stages[index]
+        while True:
+            job = await stage.queue.get()
+            try:
+                had_error = bool(job.data.get("error"))
+                start = time.monotonic()
+                stage.wait_seconds += start - job.enqueued_at
+                stage.busy += 1
+                try:
+                    await stage.handler(job.data)
+                except asyncio.CancelledError:
+                    # 流水线停止时正常退出；阶段内部的任务被取消则记为该任务失败，worker 继续处理
+                    if self._stopping:
+                        raise
+                    logger.warning(f"流水线 [{self.name}] 阶段 {stage.name} 任务被取消")
+                    job.data["error"] = "阶段任务被取消"
+                except Exception as e:
+                    logger.exception(f"流水线 [{self.name}] 阶段 {stage.name} 失败: {e}")
+                    job.data["error"] = str(e) or type(e).__name__
+                finally:
+                    stage.busy -= 1
+                    stage.busy_seconds += time.monotonic() - start
+                    stage.processed += 1
+                if job.data.get("error") and not had_error:
+                    stage.failed += 1
+                await self._forward(job, index + 1)
+            finally:
+                stage.queue.task_done()
+
+    async def _forward(self, job: _Job, index: int) -> None:
+        """送入下一个适用的阶段；没有后续阶段时完成任务"""
+        failed = bool(job.data.get("error"))
+        for next_index in range(index, len(self.stages)):
+            stage = self.stages[next_index]
+            if failed and not stage.run_on_error:
+                continue
+            job.enqueued_at = time.monotonic()
+            await stage.queue.put(job)
+            return
+        self.completed += 1
+        if not job.future.done():
+            job.future.set_result(job.data)
+
+    def stats(self) -> Dict[str, Any]:
+        """流水线运行统计：各阶段队列深度、忙碌 worker 数、利用率"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.is_running,
+            "uptime_seconds": round(uptime, 1),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "in_flight": len(self._jobs),
+            "stages": {stage.name: stage.stats(uptime) for stage in self.stages},
+        }
@@ -310,6 +310,41 @@ class SupabaseService:
             logger.error(f"列出文档失败: {e}")
             return []
     
+    async def list_classified_documents(
+        self,
+        tenant_id: Optional[str] = None,
+        limit: int = 5000,
+        page_size: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        列出已审核完成且有 OCR 文本的文档（用于训练本地分类器），按创建时间倒序
+        
+        Args:
+            tenant_id: 租户ID（可选，不传时返回全部租户）
+            limit: 最多返回的文档数
+            page_size: 分页大小（PostgREST 单次返回行数有上限）
+            
+        Returns:
+            [{"tenant_id", "document_type", "ocr_text"}, ...]
+        """
+        documents: List[Dict[str, Any]] = []
+        try:
+            while len(documents) < limit:
+                query = self.client.table("documents").select(
+                    "tenant_id, document_type, ocr_text"
+                ).eq("status", "completed").not_.is_("ocr_text", "null").not_.is_("document_type", "null")
+                if tenant_id:
+                    query = query.eq("tenant_id", tenant_id)
+                offset = len(documents)
+                end = min(offset + page_size, limit) - 1
+                result = query.order("created_at", desc=True).range(offset, end).execute()
+                documents.extend(result.data or [])
+                if len(result.data or []) < end - offset + 1:
+                    break
+        except Exception as e:
+            logger.error(f"列出已分类文档失败: {e}")
+        return documents
+    
     async def count_documents(
         self,
         user_id: Optional[str] = None,
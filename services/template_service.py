@@ -1,11 +1,13 @@
 # services/template_service.py
 """模板服务 - 文档模板管理和动态 Prompt 构建"""
 
+import re
 import json
 from typing import Optional, Dict, Any, List
 from loguru import logger
 
 from config.settings import settings
+from services.page_filter import parse_page_selection
 
 
 class TemplateService:
@@ -27,11 +29,31 @@ class TemplateService:
 4. 确保 JSON 语法正确（使用英文双引号、英文逗号）
 
 {examples_section}
-
+{barcode_section}
 **输出要求：**
 - 仅输出扁平的 JSON 对象，只包含上述目标字段，禁止添加任何其他字段
 - 不要包含任何解释、引言或 Markdown 代码块标记
 
+现在，请处理用户提供的OCR文本：
+{ocr_text}"""
+    
+    # 单次调用完成分类和提取的 Prompt 骨架
+    CLASSIFY_EXTRACT_PROMPT_TEMPLATE = """你是一个专业的单据分类和数据提取助手。请先判断用户提供的OCR文本属于以下哪一类文档，再按该类文档的字段表提取字段。
+
+**候选文档类型及字段：**
+{template_sections}
+
+**处理规则：**
+1. document_type 只能是上述候选类型的代码之一
+2. 只提取所选类型字段表中的字段，缺失字段值设为空字符串 ""
+3. 日期格式统一为 YYYY-MM-DD，数值保持原文精度，保留单位
+4. 确保 JSON 语法正确（使用英文双引号、英文逗号）
+
+{barcode_section}
+**输出要求：**
+- 仅输出 JSON 对象，格式为 {{"document_type": "类型代码", "fields": {{"JSON键名": "值"}}}}
+- 不要包含任何解释、引言或 Markdown 代码块标记
+
 现在，请处理用户提供的OCR文本：
 {ocr_text}"""
     
@@ -97,6 +119,33 @@ class TemplateService:
             logger.error(f"获取模板失败: {e}")
             return None
     
+    async def get_candidate_templates(self, tenant_id: str) -> List[Dict[str, Any]]:
+        """
+        获取租户可用于自动分类的模板（启用的 single 模式模板，含字段，不含示例）
+        
+        Args:
+            tenant_id: 租户ID
+            
+        Returns:
+            模板列表
+        """
+        try:
+            result = self._get_client().table("document_templates").select(
+                "*, template_fields(*)"
+            ).eq("tenant_id", tenant_id).eq("is_active", True).order("sort_order").execute()
+            
+            templates = [t for t in result.data or [] if (t.get("process_mode") or "single") == "single"]
+            for template in templates:
+                if template.get("template_fields"):
+                    template["template_fields"].sort(key=lambda x: x.get("sort_order", 0))
+            return templates
+        except Exception as e:
+            logger.error(f"获取候选模板失败: {e}")
+            return []
+    
+    # 自动分类工作流模式
+    WORKFLOW_MODES = ("two_step", "single_call")
+    
     # 文档分类结果到模板 code 的映射
     DOC_TYPE_TO_CODE = {
         "检测报告": "inspection_report",
@@ -283,7 +332,8 @@ class TemplateService:
     def build_extraction_prompt(
         self, 
         template: Dict[str, Any], 
-        ocr_text: str
+        ocr_text: str,
+        barcodes: Optional[List[Dict[str, Any]]] = None
     ) -> str:
         """
         根据模板配置动态构建 LLM 提取 Prompt
@@ -291,29 +341,13 @@ class TemplateService:
         Args:
             template: 模板信息（含 template_fields 和 template_examples）
             ocr_text: OCR 识别文本
+            barcodes: 条码/二维码解码结果（可选），作为准确值提供给 LLM
             
         Returns:
             构建好的 Prompt
         """
         # 1. 构建字段列表
-        fields = template.get("template_fields", [])
-        field_lines = []
-        for i, field in enumerate(fields, 1):
-            field_key = field.get("field_key", "")
-            field_label = field.get("field_label", "")
-            field_type = field.get("field_type", "text")
-            extraction_hint = field.get("extraction_hint", "")
-            
-            type_hint = ""
-            if field_type == "date":
-                type_hint = "（日期格式：YYYY-MM-DD）"
-            elif field_type == "number":
-                type_hint = "（数值类型）"
-            
-            hint = f"{type_hint} {extraction_hint}".strip()
-            field_lines.append(f"| {i} | {field_label} | {field_key} | {hint}")
-        
-        field_list = "| 序号 | 字段含义 | JSON键名 | 说明 |\n|------|----------|----------|------|\n" + "\n".join(field_lines)
+        field_list = self._build_field_table(template)
         
         # 2. 构建示例部分
         examples = template.get("template_examples", [])
@@ -336,16 +370,93 @@ class TemplateService:
                 
                 examples_section += f"\n示例{i}输入文本片段：\n{example_input}\n\n示例{i}输出：\n{output_str}\n"
         
-        # 3. 组装完整 Prompt
+        # 3. 组装完整 Prompt（条码解码结果比 OCR 文本可靠）
         prompt = self.EXTRACTION_PROMPT_TEMPLATE.format(
             doc_type=template.get("name", "文档"),
             field_list=field_list,
             examples_section=examples_section,
+            barcode_section=self._build_barcode_section(barcodes),
             ocr_text=ocr_text
         )
         
         return prompt
     
+    def _build_field_table(self, template: Dict[str, Any]) -> str:
+        """构建模板字段表（Markdown 表格）"""
+        field_lines = []
+        for i, field in enumerate(template.get("template_fields", []), 1):
+            field_type = field.get("field_type", "text")
+            type_hint = ""
+            if field_type == "date":
+                type_hint = "（日期格式：YYYY-MM-DD）"
+            elif field_type == "number":
+                type_hint = "（数值类型）"
+            hint = f"{type_hint} {field.get('extraction_hint', '')}".strip()
+            field_lines.append(f"| {i} | {field.get('field_label', '')} | {field.get('field_key', '')} | {hint}")
+        return "| 序号 | 字段含义 | JSON键名 | 说明 |\n|------|----------|----------|------|\n" + "\n".join(field_lines)
+    
+    def _build_barcode_section(self, barcodes: Optional[List[Dict[str, Any]]]) -> str:
+        """构建条码解码结果部分（比 OCR 文本可靠）"""
+        if not barcodes:
+            return ""
+        return "**条码/二维码解码结果（准确值，与OCR文本冲突时以此为准）：**\n" + "\n".join(
+            f"- {'二维码' if b.get('type') == 'qrcode' else '条形码'}（{b.get('format', '')}）：{b.get('value', '')}"
+            for b in barcodes
+        ) + "\n"
+    
+    def build_classify_extract_prompt(
+        self,
+        templates: List[Dict[str, Any]],
+        ocr_text: str,
+        barcodes: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """
+        构建单次调用完成分类和提取的 Prompt（包含全部候选模板的字段表）
+        
+        Args:
+            templates: 候选模板列表（含 template_fields）
+            ocr_text: OCR 识别文本
+            barcodes: 条码/二维码解码结果（可选）
+            
+        Returns:
+            构建好的 Prompt，LLM 应返回 {"document_type": 模板code, "fields": {...}}
+        """
+        sections = []
+        for template in templates:
+            description = f"：{template['description']}" if template.get("description") else ""
+            sections.append(
+                f"### 类型代码 {template.get('code', '')}（{template.get('name', '')}{description}）\n"
+                f"{self._build_field_table(template)}"
+            )
+        
+        return self.CLASSIFY_EXTRACT_PROMPT_TEMPLATE.format(
+            template_sections="\n\n".join(sections),
+            barcode_section=self._build_barcode_section(barcodes),
+            ocr_text=ocr_text
+        )
+    
+    def match_candidate_template(
+        self,
+        templates: List[Dict[str, Any]],
+        document_type: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        按 LLM 返回的文档类型匹配候选模板（支持 code、名称和中文分类结果）
+        
+        Args:
+            templates: 候选模板列表
+            document_type: LLM 返回的文档类型
+            
+        Returns:
+            匹配的模板，未匹配时返回 None
+        """
+        document_type = (document_type or "").strip()
+        mapped_code = self.DOC_TYPE_TO_CODE.get(document_type, document_type)
+        for template in templates:
+            if template.get("code") in (document_type, mapped_code) or template.get("name") == document_type:
+                return template
+        return None
+    
     def build_field_mapping(self, template: Dict[str, Any]) -> Dict[str, str]:
         """
         构建字段到飞书列名的映射
@@ -368,6 +479,45 @@ class TemplateService:
         
         return mapping
     
+    def match_barcode_fields(
+        self,
+        template: Dict[str, Any],
+        barcodes: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """
+        按字段的 barcode_pattern 直接用条码内容填充字段
+        
+        每个配置了 barcode_pattern（正则，整串匹配）的字段取第一个匹配的解码值。
+        
+        Args:
+            template: 模板信息（含 template_fields）
+            barcodes: 条码/二维码解码结果
+            
+        Returns:
+            {field_key: 条码值}，只包含匹配成功的字段
+        """
+        values: Dict[str, str] = {}
+        if not barcodes:
+            return values
+        
+        for field in template.get("template_fields", []):
+            field_key = field.get("field_key")
+            pattern = field.get("barcode_pattern")
+            if not field_key or not pattern:
+                continue
+            try:
+                regex = re.compile(pattern)
+            except re.error as e:
+                logger.warning(f"字段 {field_key} 的 barcode_pattern 不是合法正则: {e}")
+                continue
+            for barcode in barcodes:
+                value = str(barcode.get("value", "")).strip()
+                if value and regex.fullmatch(value):
+                    values[field_key] = value
+                    break
+        
+        return values
+    
     def get_field_keys(self, template: Dict[str, Any]) -> List[str]:
         """
         获取模板的所有字段键名列表
@@ -381,6 +531,122 @@ class TemplateService:
         fields = template.get("template_fields", [])
         return [f.get("field_key") for f in fields if f.get("field_key")]
     
+    def get_ocr_regions(self, template: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        解析模板声明的 OCR 识别区域（document_templates.ocr_regions）
+        
+        格式: [{"page": 1, "box": [x0, y0, x1, y1]}, ...]，
+        box 为相对页面宽高的 0~1 归一化坐标，page 从1开始，为空表示每页。
+        非法的区域记录警告后忽略。
+        
+        Args:
+            template: 模板信息
+            
+        Returns:
+            规范化后的区域列表，未配置时为空列表
+        """
+        raw_regions = template.get("ocr_regions") or []
+        if isinstance(raw_regions, str):
+            try:
+                raw_regions = json.loads(raw_regions)
+            except json.JSONDecodeError:
+                logger.warning(f"模板OCR区域配置不是合法JSON: {template.get('id')}")
+                return []
+        
+        regions = []
+        for region in raw_regions if isinstance(raw_regions, list) else []:
+            try:
+                x0, y0, x1, y1 = (min(max(float(v), 0.0), 1.0) for v in region["box"])
+                page = region.get("page")
+                page = int(page) if page is not None else None
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"忽略非法的模板OCR区域: {region}")
+                continue
+            if x1 <= x0 or y1 <= y0 or (page is not None and page < 1):
+                logger.warning(f"忽略非法的模板OCR区域: {region}")
+                continue
+            regions.append({"page": page, "box": [x0, y0, x1, y1]})
+        
+        return regions
+    
+    def get_page_selection(self, template: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        解析模板的页面选择规则（document_templates.page_selection）
+        
+        格式: {"first_pages": 2, "keywords": ["检测报告"]}，OCR 前只保留符合规则的页
+        
+        Args:
+            template: 模板信息
+            
+        Returns:
+            规范化后的规则，未配置时返回 None
+        """
+        raw = template.get("page_selection")
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"模板页面选择规则不是合法JSON: {template.get('id')}")
+                return None
+        return parse_page_selection(raw)
+    
+    def get_ocr_profile(self, record: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        获取模板或租户选择的 OCR 引擎配置档（document_templates / tenants 的 ocr_profile）
+        
+        Args:
+            record: 模板或租户记录
+            
+        Returns:
+            配置档名称；未配置或 OCR_ENGINE_PROFILES 中未定义时返回 None（使用默认引擎）
+        """
+        profile = ((record or {}).get("ocr_profile") or "").strip()
+        if not profile:
+            return None
+        if profile not in settings.ocr_engine_profiles:
+            logger.warning(f"未定义的OCR引擎配置档 {profile}，使用默认引擎: {record.get('id')}")
+            return None
+        return profile
+    
+    def get_workflow_mode(self, tenant: Optional[Dict[str, Any]]) -> str:
+        """
+        获取租户的自动分类工作流模式（tenants.workflow_mode）
+        
+        Args:
+            tenant: 租户记录
+            
+        Returns:
+            "two_step"（先分类再提取，两次 LLM 调用）或 "single_call"（一次调用完成分类和提取）
+        """
+        mode = ((tenant or {}).get("workflow_mode") or settings.WORKFLOW_MODE_DEFAULT).strip()
+        if mode not in self.WORKFLOW_MODES:
+            logger.warning(f"未知的工作流模式 {mode}，使用 two_step: {(tenant or {}).get('id')}")
+            return "two_step"
+        return mode
+    
+    def get_boilerplate_patterns(self, template: Optional[Dict[str, Any]]) -> List[str]:
+        """
+        获取模板声明的固定文字正则（document_templates.boilerplate_patterns）
+        
+        格式: ["^本报告仅对来样负责", "^未经书面批准.*不得复制"]，匹配的 OCR 行在送入 LLM 前删除
+        
+        Args:
+            template: 模板信息
+            
+        Returns:
+            正则列表，未配置时返回空列表
+        """
+        raw = (template or {}).get("boilerplate_patterns")
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"模板固定文字规则不是合法JSON: {template.get('id')}")
+                return []
+        if not isinstance(raw, list):
+            return []
+        return [pattern for pattern in raw if isinstance(pattern, str) and pattern]
+    
     # ============ Merge 模式支持 ============
     
     async def get_merge_template_info(self, template_id: str) -> Optional[Dict[str, Any]]:
@@ -443,6 +709,20 @@ class TemplateService:
                 template["sub_template_b"] = await self.get_template_with_details(sub_b_id)
                 logger.debug(f"子模板B获取: {'成功' if template.get('sub_template_b') else '失败'}")
             
+            # 文档类型 -> 子模板（A、B 及 extra_sub_templates，按合并顺序）
+            sub_templates = {}
+            if merge_rule.get("doc_type_a") and template.get("sub_template_a"):
+                sub_templates[merge_rule["doc_type_a"]] = template["sub_template_a"]
+            if merge_rule.get("doc_type_b") and template.get("sub_template_b"):
+                sub_templates[merge_rule["doc_type_b"]] = template["sub_template_b"]
+            for extra in self._parse_extra_sub_templates(merge_rule, template_id):
+                sub_template = await self.get_template_with_details(extra["template_id"])
+                if sub_template:
+                    sub_templates[extra["doc_type"]] = sub_template
+                else:
+                    logger.warning(f"子模板不存在: {extra['template_id']}（{extra['doc_type']}）")
+            template["sub_templates"] = sub_templates
+            
             return template
         except Exception as e:
             logger.error(f"获取合并模板信息失败: {type(e).__name__}: {e}")
@@ -450,28 +730,42 @@ class TemplateService:
             logger.error(f"堆栈: {traceback.format_exc()}")
             return None
     
-    def merge_extraction_results(
-        self, 
-        result_a: Optional[Dict[str, Any]], 
-        result_b: Optional[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+    def _parse_extra_sub_templates(
+        self,
+        merge_rule: Dict[str, Any],
+        template_id: str
+    ) -> List[Dict[str, str]]:
+        """解析合并规则的 extra_sub_templates: [{"doc_type": str, "template_id": str}, ...]"""
+        raw = merge_rule.get("extra_sub_templates")
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(f"模板 {template_id} 的 extra_sub_templates 不是合法JSON")
+                return []
+        if not isinstance(raw, list):
+            return []
+        return [
+            {"doc_type": str(item["doc_type"]), "template_id": str(item["template_id"])}
+            for item in raw
+            if isinstance(item, dict) and item.get("doc_type") and item.get("template_id")
+        ]
+    
+    def merge_extraction_results(self, *results: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        合并两份文档的提取结果
+        合并多份文档的提取结果（按参数顺序，后面的结果覆盖前面的同名字段）
         
         Args:
-            result_a: 文档A的提取结果
-            result_b: 文档B的提取结果
+            results: 各文档的提取结果（None 忽略）
             
         Returns:
             合并后的结果
         """
         merged = {}
         
-        if result_a:
-            merged.update(result_a)
-        
-        if result_b:
-            merged.update(result_b)
+        for result in results:
+            if result:
+                merged.update(result)
         
         return merged
 
@@ -0,0 +1,147 @@
+# services/text_compactor.py
+"""OCR 文本压缩 - 构建 LLM Prompt 前去掉不含信息的文本，减少 token 和延迟
+
+依次处理：
+1. 全角字母、数字、标点转半角，合并连续空白，去掉空行
+2. 页眉页脚：超过一定比例的页在页首/页尾出现的相同行只保留第一次出现
+3. 页码行（"第 1 页 共 3 页"、"Page 1 of 3"、"1 / 3" 等，仅页首/页尾）
+4. 模板声明的固定文字（document_templates.boilerplate_patterns，正则）
+
+页眉页脚只在页首/页尾若干行内判断，正文表格中重复的"合格"等值不会被删除。
+"""
+
+import re
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+
+
+# 全角 ASCII（！～）与半角相差 0xFEE0，全角空格单独处理
+_FULLWIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_FULLWIDTH_TABLE[0x3000] = 0x20
+
+_WHITESPACE = re.compile(r"\s+")
+
+_PAGE_NUMBER = re.compile(
+    r"^(第\s*\d+\s*页\s*[,/]?\s*(共\s*\d+\s*页)?"
+    r"|共\s*\d+\s*页\s*[,/]?\s*第\s*\d+\s*页"
+    r"|page\s*\d+(\s*(of|/)\s*\d+)?"
+    r"|-\s*\d+\s*-)$",
+    re.IGNORECASE,
+)
+
+# 不带文字的 "n / m" 只在斜杠两侧有空格且 n <= m 时视为页码："3/4"、"2024/5" 等比例、日期、数量保留
+_BARE_PAGE_NUMBER = re.compile(r"^(\d+)\s+/\s+(\d+)$")
+
+# 中日韩字符（含中文标点）按 1 token 估算，其余字符按 4 个/token 估算
+_CJK = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本的 LLM token 数（不依赖具体模型的分词器，用于前后对比）"""
+    cjk = len(_CJK.findall(text))
+    others = len(text) - cjk - text.count(" ") - text.count("\n")
+    return cjk + math.ceil(max(others, 0) / 4)
+
+
+def normalize_line(line: str) -> str:
+    """全角转半角，合并连续空白"""
+    return _WHITESPACE.sub(" ", line.translate(_FULLWIDTH_TABLE)).strip()
+
+
+def page_lines(ocr_result: Dict[str, Any]) -> List[List[str]]:
+    """从 OCR 结果按页拆分文本行（行带 page 字段），用于页眉页脚识别"""
+    pages: Dict[int, List[str]] = {}
+    for line in ocr_result.get("lines") or []:
+        pages.setdefault(line.get("page") or 1, []).append(line.get("text", ""))
+    return [pages[page] for page in sorted(pages)]
+
+
+def _is_page_number(line: str) -> bool:
+    if _PAGE_NUMBER.match(line):
+        return True
+    bare = _BARE_PAGE_NUMBER.match(line)
+    return bool(bare) and 1 <= int(bare.group(1)) <= int(bare.group(2))
+
+
+def _compile_patterns(patterns: Sequence[str]) -> List["re.Pattern"]:
+    compiled = []
+    for pattern in patterns:
+        try:
+            compiled.append(re.compile(pattern))
+        except re.error as e:
+            logger.warning(f"忽略非法的固定文字正则 {pattern!r}: {e}")
+    return compiled
+
+
+def compact_ocr_text(
+    text: str,
+    pages: Optional[List[List[str]]] = None,
+    boilerplate: Optional[Sequence[str]] = None,
+    repeat_ratio: float = 0.5,
+    edge_lines: int = 3,
+) -> Tuple[str, Dict[str, Any]]:
+    """压缩 OCR 文本
+
+    Args:
+        text: 原始 OCR 文本
+        pages: 按页拆分的文本行（可选，提供时才识别跨页重复的页眉页脚）
+        boilerplate: 固定文字正则列表，匹配（re.search）的行被删除
+        repeat_ratio: 页眉页脚判定比例，相同行出现在至少该比例的页（且至少 2 页）时视为页眉页脚
+        edge_lines: 每页页首/页尾各多少行参与页眉页脚、页码判断
+
+    Returns:
+        (压缩后的文本, 统计信息 {"chars_before", "chars_after", "tokens_before", "tokens_after",
+         "tokens_saved", "repeated_lines", "page_number_lines", "boilerplate_lines"})
+    """
+    if not pages:
+        pages = [text.splitlines()]
+
+    normalized = [[normalize_line(line) for line in page] for page in pages]
+    normalized = [[line for line in page if line] for page in normalized]
+
+    def edge_indexes(page: List[str]) -> set:
+        return set(range(min(edge_lines, len(page)))) | set(range(max(0, len(page) - edge_lines), len(page)))
+
+    # 统计每个页首/页尾行出现在多少页
+    repeated: set = set()
+    if len(normalized) >= 2:
+        page_counts: Dict[str, int] = {}
+        for page in normalized:
+            for line in {page[i] for i in edge_indexes(page)}:
+                page_counts[line] = page_counts.get(line, 0) + 1
+        threshold = max(2, math.ceil(repeat_ratio * len(normalized)))
+        repeated = {line for line, count in page_counts.items() if count >= threshold}
+
+    patterns = _compile_patterns(boilerplate or [])
+    counts = {"repeated_lines": 0, "page_number_lines": 0, "boilerplate_lines": 0}
+    seen_repeated: set = set()
+    kept: List[str] = []
+    for page in normalized:
+        edges = edge_indexes(page)
+        for i, line in enumerate(page):
+            if i in edges:
+                if _is_page_number(line):
+                    counts["page_number_lines"] += 1
+                    continue
+                if line in repeated:
+                    if line in seen_repeated:
+                        counts["repeated_lines"] += 1
+                        continue
+                    seen_repeated.add(line)
+            if any(pattern.search(line) for pattern in patterns):
+                counts["boilerplate_lines"] += 1
+                continue
+            kept.append(line)
+
+    compacted = "\n".join(kept)
+    tokens_before = estimate_tokens(text)
+    tokens_after = estimate_tokens(compacted)
+    return compacted, {
+        "chars_before": len(text),
+        "chars_after": len(compacted),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        **counts,
+    }
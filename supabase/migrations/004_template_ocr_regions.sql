@@ -0,0 +1,8 @@
+-- Template-level OCR regions of interest
+-- Format: [{"page": 1, "box": [x0, y0, x1, y1]}, ...]
+--   box  : normalized coordinates (0~1) relative to page width/height
+--   page : 1-based page number, null means every page
+-- When set, documents processed with this template only OCR these regions
+-- (falls back to full-page OCR when nothing is recognized inside them).
+ALTER TABLE document_templates
+ADD COLUMN IF NOT EXISTS ocr_regions JSONB;
@@ -0,0 +1,8 @@
+-- Template-level page selection rules applied before OCR
+-- Format: {"first_pages": 2, "keywords": ["检测报告", "测试结果"]}
+--   first_pages : only OCR the first N pages
+--   keywords    : only OCR pages containing any keyword (text layer or a
+--                 quick OCR pass over the top of the page)
+-- Blank pages are skipped regardless of this setting (OCR_SKIP_BLANK_PAGES).
+ALTER TABLE document_templates
+ADD COLUMN IF NOT EXISTS page_selection JSONB;
@@ -0,0 +1,11 @@
+-- Field-level barcode/QR fast path
+-- barcode_pattern: regex (full match) applied to decoded barcode / QR values.
+-- The first matching value fills the field directly and overrides the LLM
+-- output; when every template field is covered the LLM call is skipped.
+ALTER TABLE template_fields
+ADD COLUMN IF NOT EXISTS barcode_pattern TEXT;
+
+-- Example: express waybill tracking numbers (optional carrier prefix + digits)
+-- UPDATE template_fields
+-- SET barcode_pattern = '[A-Za-z]{0,4}[0-9]{10,20}'
+-- WHERE field_key = 'tracking_number';
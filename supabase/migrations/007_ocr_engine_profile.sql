@@ -0,0 +1,10 @@
+-- OCR engine profile selection
+-- ocr_profile names an entry of OCR_ENGINE_PROFILES (backend setting), e.g.
+--   OCR_ENGINE_PROFILES='{"en": {"lang": "en", "rec_model_dir": "./model/en_rec"}}'
+-- Resolution order: template ocr_profile, then tenant ocr_profile, then the
+-- default engine. Profile engines are loaded on first use and evicted by LRU.
+ALTER TABLE document_templates
+ADD COLUMN IF NOT EXISTS ocr_profile VARCHAR(50);
+
+ALTER TABLE tenants
+ADD COLUMN IF NOT EXISTS ocr_profile VARCHAR(50);
@@ -0,0 +1,7 @@
+-- Template boilerplate patterns for OCR text compaction
+-- boilerplate_patterns is a JSON array of regular expressions; OCR lines that
+-- match any of them (e.g. fixed disclaimers, watermarks) are removed before
+-- the text is sent to the LLM, e.g.
+--   '["^本报告仅对来样负责", "^未经书面批准.*不得复制"]'
+ALTER TABLE document_templates
+ADD COLUMN IF NOT EXISTS boilerplate_patterns JSONB;
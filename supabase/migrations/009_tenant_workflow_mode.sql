@@ -0,0 +1,9 @@
+-- Auto-classify workflow mode per tenant
+-- two_step:    classify with DOC_CLASSIFY_PROMPT, then extract with the
+--              template prompt (two LLM round trips)
+-- single_call: one prompt with every candidate template's field table,
+--              the LLM returns {"document_type", "fields"} in one response
+-- NULL falls back to the WORKFLOW_MODE_DEFAULT backend setting.
+ALTER TABLE tenants
+ADD COLUMN IF NOT EXISTS workflow_mode VARCHAR(20)
+CHECK (workflow_mode IN ('two_step', 'single_call'));
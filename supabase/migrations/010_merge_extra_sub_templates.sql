@@ -0,0 +1,7 @@
+-- Merge templates with more than two sub-documents
+-- extra_sub_templates lists sub-templates beyond doc_type_a/doc_type_b, e.g.
+--   '[{"doc_type": "色度", "template_id": "<uuid>"}]'
+-- Sub-documents are processed concurrently; results are merged in rule order
+-- (A, B, then extra_sub_templates), later sub-documents overriding earlier ones.
+ALTER TABLE template_merge_rules
+ADD COLUMN IF NOT EXISTS extra_sub_templates JSONB;
@@ -0,0 +1,6 @@
+-- Marks documents.ocr_text as the complete OCR text of the document
+-- Rows written before full-text persistence hold a 500-char preview; only rows
+-- with ocr_text_complete = true are reused when a document is reprocessed
+-- without its local OCR artifact.
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS ocr_text_complete BOOLEAN NOT NULL DEFAULT FALSE;
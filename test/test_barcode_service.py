@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.barcode_service import TYPE_BARCODE, TYPE_QRCODE, decode_document, decode_image
+
+
+_EAN_L = ["0001101", "0011001", "0010011", "0111101", "0100011",
+          "0110001", "0101111", "0111011", "0110111", "0001011"]
+_EAN_G = ["0100111", "0110011", "0011011", "0100001", "0011101",
+          "0111001", "0000101", "0010001", "0001001", "0010111"]
+_EAN_R = ["1110010", "1100110", "1101100", "1000010", "1011100",
+          "1001110", "1010000", "1000100", "1001000", "1110100"]
+_EAN_PARITY = ["LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+               "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL"]
+
+
+def render_ean13(code: str, module: int = 2, height: int = 120) -> np.ndarray:
+    """把 13 位 EAN 码绘制在 800x600 白色页面中央（灰度图，带静区）"""
+    digits = [int(c) for c in code]
+    bits = "101"
+    for digit, parity in zip(digits[1:7], _EAN_PARITY[digits[0]]):
+        bits += (_EAN_L if parity == "L" else _EAN_G)[digit]
+    bits += "01010"
+    bits += "".join(_EAN_R[digit] for digit in digits[7:])
+    bits += "101"
+
+    row = np.array([0 if bit == "1" else 255 for bit in bits], dtype=np.uint8).repeat(module)
+    quiet = np.full(12 * module, 255, dtype=np.uint8)
+    row = np.concatenate([quiet, row, quiet])
+    bars = np.tile(row, (height, 1))
+
+    page = np.full((600, 800), 255, dtype=np.uint8)
+    y, x = (600 - height) // 2, (800 - bars.shape[1]) // 2
+    page[y:y + height, x:x + bars.shape[1]] = bars
+    return page
+
+
+class TestDecodeImage(unittest.TestCase):
+    def test_decodes_generated_ean13(self):
+        img = cv2.cvtColor(render_ean13("6901234567892"), cv2.COLOR_GRAY2BGR)
+
+        results = decode_image(img)
+
+        barcodes = [item for item in results if item["type"] == TYPE_BARCODE]
+        self.assertEqual([item["value"] for item in barcodes], ["6901234567892"])
+        self.assertEqual(barcodes[0]["format"], "EAN_13")
+        self.assertEqual(len(barcodes[0]["box"]), 4)
+
+    def test_decodes_generated_qrcode(self):
+        qr = cv2.QRCodeEncoder.create().encode("SF1234567890")
+        qr = cv2.resize(qr, None, fx=8, fy=8, interpolation=cv2.INTER_NEAREST)
+        img = cv2.cvtColor(cv2.copyMakeBorder(qr, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=255),
+                           cv2.COLOR_GRAY2BGR)
+
+        results = decode_image(img)
+
+        self.assertIn(
+            {"type": TYPE_QRCODE, "value": "SF1234567890"},
+            [{"type": item["type"], "value": item["value"]} for item in results]
+        )
+
+    def test_decodes_image_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "运单.png")
+            cv2.imwrite(path, render_ean13("6901234567892"))
+
+            results = decode_document(path)
+
+        self.assertEqual([(item["value"], item["page"]) for item in results], [("6901234567892", 1)])
+
+    def test_blank_image_has_no_codes(self):
+        self.assertEqual(decode_image(np.full((200, 300, 3), 255, dtype=np.uint8)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
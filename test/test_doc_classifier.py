@@ -0,0 +1,61 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.doc_classifier import DocumentClassifier, NgramClassifier
+
+
+def _samples():
+    texts, labels = [], []
+    for i in range(8):
+        texts.append(f"检验报告 No.{i} 样品名称 灯具{i} 检验结论 合格 检验依据 GB7000.1 主检 审核 批准")
+        labels.append("inspection_report")
+        texts.append(f"顺丰速运 运单号 SF{1000 + i} 收件人 张{i} 寄件人 李{i} 收件地址 广州市")
+        labels.append("express")
+        texts.append(f"产品抽样单 抽样编号 C{i} 被抽样单位 某公司{i} 抽样基数 100 备样量 2")
+        labels.append("sampling")
+    return texts, labels
+
+
+class TestNgramClassifier(unittest.TestCase):
+    def test_predicts_confident_label(self):
+        model = NgramClassifier().fit(*_samples())
+
+        label, confidence, similarity = model.predict("运单号 SF9999 收件人 王五 寄件人 赵六")
+        self.assertEqual(label, "express")
+        self.assertGreater(confidence, 0.3)
+        self.assertGreater(similarity, 0.2)
+
+        _, confidence, similarity = model.predict("会议纪要 参会人员 议题")
+        self.assertLess(similarity, 0.2)
+
+    def test_registry_loads_saved_model_and_rejects_uncertain(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = DocumentClassifier(tmp)
+            self.assertIsNone(asyncio.run(registry.predict("t1", "运单号 SF1")))
+
+            registry.save("t1", NgramClassifier().fit(*_samples()), {"tenant_id": "t1"})
+            registry._checked.clear()
+
+            prediction = asyncio.run(registry.predict("t1", "检验报告 样品名称 检验结论 合格"))
+            self.assertEqual(prediction["document_type"], "inspection_report")
+            self.assertIsNone(asyncio.run(registry.predict("t1", "会议纪要 参会人员 议题")))
+            self.assertEqual(registry.stats()["hits"], 1)
+            self.assertEqual(registry.stats()["fallbacks"], 1)
+
+            # 预测结果不是训练时租户的自动分类候选类型时交给 LLM
+            model = NgramClassifier().fit(*_samples())
+            model.candidates = ["express"]
+            registry.save("t2", model, {"tenant_id": "t2"})
+            self.assertIsNone(asyncio.run(registry.predict("t2", "检验报告 样品名称 检验结论 合格")))
+            self.assertEqual(asyncio.run(registry.predict("t2", "运单号 SF9999 收件人 王五"))["document_type"], "express")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.llm_cache import LLMResponseCache, prompt_key
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "llm.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_model_temperature_and_prompt(self):
+        key = prompt_key("m", "http://llm", 0.0, "提取字段")
+        self.assertEqual(key, prompt_key("m", "http://llm", 0.0, "提取字段"))
+        self.assertNotEqual(key, prompt_key("m2", "http://llm", 0.0, "提取字段"))
+        self.assertNotEqual(key, prompt_key("m", "http://llm", 0.7, "提取字段"))
+        self.assertNotEqual(key, prompt_key("m", "http://llm", 0.0, "提取字段 "))
+
+    def test_hit_miss_and_persistence(self):
+        cache = LLMResponseCache(self.db_path, 1024 * 1024)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "m", '{"型号": "A1"}')
+        self.assertEqual(cache.get("k"), '{"型号": "A1"}')
+        cache.close()
+
+        reopened = LLMResponseCache(self.db_path, 1024 * 1024)
+        self.assertEqual(reopened.get("k"), '{"型号": "A1"}')
+        self.assertEqual(reopened.stats()["hit_rate"], 1.0)
+        reopened.close()
+
+    def test_ttl_expiry(self):
+        cache = LLMResponseCache(self.db_path, 1024 * 1024, ttl_seconds=60)
+        with mock.patch("services.llm_cache.time.time", return_value=1000.0):
+            cache.put("k", "m", "v")
+        with mock.patch("services.llm_cache.time.time", return_value=1100.0):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["expired"], 1)
+        cache.close()
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = LLMResponseCache(self.db_path, 25)
+        with mock.patch("services.llm_cache.time.time", side_effect=[1.0, 2.0, 3.0, 4.0]):
+            cache.put("a", "m", "x" * 10)
+            cache.put("b", "m", "y" * 10)
+            cache.get("a")  # a 变为最近使用
+            cache.put("c", "m", "z" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_artifact import OCRArtifactStore, is_full_document, ocr_scope, scope_matches
+
+
+class TestOCRArtifactStore(unittest.TestCase):
+    def test_round_trip_keeps_text_geometry_and_confidence(self):
+        result = {
+            "text": "检测报告\n样品名称：LED灯具",
+            "confidence": 0.92,
+            "lines": [
+                {"text": "检测报告", "confidence": 0.95, "page": 1,
+                 "box": [[10, 20], [110, 20], [110, 40], [10, 40]]},
+                {"text": "样品名称：LED灯具", "confidence": 0.89, "page": 2,
+                 "box": [[12, 60], [300, 60], [300, 85], [12, 85]]},
+            ],
+            "total_lines": 2,
+            "total_pages": 2,
+            "source": "ocr",
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = OCRArtifactStore(tmp)
+            self.assertIsNone(store.load("doc-1"))
+
+            store.save("doc-1", result)
+            artifact = store.load("doc-1")
+
+            self.assertEqual(artifact.text, result["text"])
+            self.assertEqual(artifact.lines, ["检测报告", "样品名称：LED灯具"])
+            self.assertEqual(artifact.boxes.shape, (2, 4, 2))
+            self.assertEqual(artifact.pages.tolist(), [1, 2])
+            self.assertAlmostEqual(artifact.confidence, 0.92)
+
+            restored = artifact.to_result()
+            self.assertEqual(restored["total_lines"], 2)
+            self.assertEqual(restored["lines"][1]["box"][1], [300.0, 60.0])
+
+            self.assertTrue(store.delete("doc-1"))
+            self.assertIsNone(store.load("doc-1"))
+
+    def test_partial_scope_only_matches_same_selection(self):
+        selection = {"first_pages": 2, "keywords": ["检测报告"]}
+        result = {
+            "text": "检测报告",
+            "confidence": 0.9,
+            "lines": [{"text": "检测报告", "confidence": 0.9, "page": 1}],
+            "total_pages": 5,
+            "page_selection": selection,
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = OCRArtifactStore(tmp)
+            store.save("doc-1", result)
+            scope = store.load("doc-1").scope
+
+        self.assertEqual(scope, ocr_scope(result))
+        self.assertTrue(scope_matches(scope, None, dict(selection)))
+        self.assertFalse(scope_matches(scope, None, None))
+        self.assertFalse(scope_matches(scope, None, {"first_pages": 1}))
+        self.assertIsNone(ocr_scope({"text": "整篇"}))
+        self.assertTrue(scope_matches(None, None, selection))
+
+    def test_region_fallback_scope_matches_same_template(self):
+        regions = [{"page": 1, "box": [0.0, 0.0, 0.5, 0.2]}]
+        selection = {"first_pages": 2}
+        result = {
+            "text": "检测报告",
+            "confidence": 0.9,
+            "lines": [{"text": "检测报告", "confidence": 0.9, "page": 1}],
+            "regions": regions,
+            "regions_fallback": True,
+            "page_selection": selection,
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = OCRArtifactStore(tmp)
+            store.save("doc-1", result)
+            scope = store.load("doc-1").scope
+
+        self.assertTrue(scope["fallback"])
+        self.assertTrue(scope_matches(scope, regions, dict(selection)))
+        self.assertFalse(scope_matches(scope, regions, None))
+        self.assertFalse(is_full_document(scope))
+        self.assertTrue(is_full_document(ocr_scope({**result, "page_selection": None})))
+        self.assertFalse(scope_matches(ocr_scope({**result, "regions_fallback": False}), None, selection))
+
+
+if __name__ == "__main__":
+    unittest.main()
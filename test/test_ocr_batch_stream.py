@@ -0,0 +1,71 @@
+import os
+import sys
+import asyncio
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_service import OCRService
+
+
+class TestProcessBatchStream(unittest.TestCase):
+    def setUp(self):
+        self.active = 0
+        self.peak = 0
+        self.started = []
+        self.service = object.__new__(OCRService)
+        self.service.process_document = self.fake_process_document
+
+    async def fake_process_document(self, path):
+        self.started.append(path)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if path == "bad":
+                raise ValueError("broken file")
+            await asyncio.sleep(1 if path == "slow" else 0.01)
+            return {"text": path}
+        finally:
+            self.active -= 1
+
+    def test_bounded_concurrency_errors_and_timeout(self):
+        paths = [f"doc{i}" for i in range(10)] + ["bad", "slow"]
+
+        async def run():
+            return [
+                item async for item in
+                self.service.process_batch_stream(paths, concurrency=3, timeout=0.2)
+            ]
+
+        results = dict(asyncio.run(run()))
+
+        self.assertEqual(self.peak, 3)
+        self.assertEqual(set(results), set(paths))
+        self.assertEqual(results["doc4"], {"text": "doc4"})
+        self.assertIn("broken file", results["bad"]["error"])
+        self.assertIn("超时", results["slow"]["error"])
+
+    def test_early_exit_stops_queued_documents(self):
+        paths = [f"doc{i}" for i in range(20)]
+
+        async def run():
+            stream = self.service.process_batch_stream(paths, concurrency=2, timeout=0)
+            async for _ in stream:
+                break
+            await stream.aclose()
+
+        asyncio.run(run())
+
+        self.assertLessEqual(len(self.started), 3)
+        self.assertEqual(self.active, 0)
+
+    def test_process_batch_keeps_input_order(self):
+        paths = ["slow", "doc1", "doc2"]
+        results = asyncio.run(self.service.process_batch(paths, concurrency=2, timeout=5))
+        self.assertEqual(list(results), paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
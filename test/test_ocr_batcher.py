@@ -0,0 +1,43 @@
+import os
+import sys
+import asyncio
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_batcher import RecognitionBatcher
+
+
+class TestRecognitionBatcher(unittest.TestCase):
+    def test_concurrent_pages_share_one_batch_and_get_own_results(self):
+        batch_sizes = []
+
+        def recognize(crops):
+            batch_sizes.append(len(crops))
+            return [(f"text-{crop}", 0.9) for crop in crops]
+
+        async def run():
+            batcher = RecognitionBatcher(recognize, max_batch_size=32, max_wait_ms=50)
+            try:
+                return await asyncio.gather(
+                    batcher.recognize(["a1", "a2", "a3"]),
+                    batcher.recognize(["b1"]),
+                    batcher.recognize(["c1", "c2"]),
+                ), batcher.stats()
+            finally:
+                batcher.shutdown()
+
+        results, stats = asyncio.run(run())
+
+        self.assertEqual(batch_sizes, [6])
+        self.assertEqual([text for text, _ in results[0]], ["text-a1", "text-a2", "text-a3"])
+        self.assertEqual(results[1], [("text-b1", 0.9)])
+        self.assertEqual([text for text, _ in results[2]], ["text-c1", "text-c2"])
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["requests"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
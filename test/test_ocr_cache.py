@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_cache import OCRResultCache
+
+
+class TestOCRResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def test_key_depends_on_content_and_config(self):
+        cache = OCRResultCache(self.cache_dir, 1024 * 1024)
+        a = self._write("a.pdf", b"same")
+        b = self._write("b.pdf", b"same")
+        c = self._write("c.pdf", b"other")
+
+        self.assertEqual(cache.make_key(a, {"x": 1}), cache.make_key(b, {"x": 1}))
+        self.assertNotEqual(cache.make_key(a, {"x": 1}), cache.make_key(c, {"x": 1}))
+        self.assertNotEqual(cache.make_key(a, {"x": 1}), cache.make_key(a, {"x": 2}))
+
+    def test_hit_miss_and_persistence(self):
+        cache = OCRResultCache(self.cache_dir, 1024 * 1024)
+        result = {"text": "检测报告", "confidence": 0.9, "lines": [], "total_lines": 0}
+
+        self.assertIsNone(cache.get("k1"))
+        cache.put("k1", result)
+        self.assertEqual(cache.get("k1"), result)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        reopened = OCRResultCache(self.cache_dir, 1024 * 1024)
+        self.assertEqual(reopened.get("k1"), result)
+
+    def test_lru_eviction_by_size(self):
+        payload = {"text": "x" * 100}
+        cache = OCRResultCache(self.cache_dir, 250)
+
+        cache.put("k1", payload)
+        cache.put("k2", payload)
+        cache.get("k1")  # k1 变为最近使用
+        cache.put("k3", payload)
+
+        self.assertIsNotNone(cache.get("k1"))
+        self.assertIsNone(cache.get("k2"))
+        self.assertIsNotNone(cache.get("k3"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_registry import EngineRegistry
+
+
+class TestEngineRegistry(unittest.TestCase):
+    def setUp(self):
+        self.built = []
+        self.lock = threading.Lock()
+
+    def factory(self, kwargs):
+        with self.lock:
+            self.built.append(kwargs["lang"])
+        return object()
+
+    def test_lazy_load_and_lru_eviction(self):
+        registry = EngineRegistry(self.factory, max_engines=2)
+
+        ch = registry.get({"lang": "ch"})
+        registry.get({"lang": "en"})
+        self.assertIs(registry.get({"lang": "ch"}), ch)
+        registry.get({"lang": "japan"})  # 淘汰最久未使用的 en
+        registry.get({"lang": "ch"})
+        registry.get({"lang": "en"})
+
+        self.assertEqual(self.built, ["ch", "en", "japan", "en"])
+        stats = registry.stats()
+        self.assertEqual(stats["resident"], 2)
+        self.assertEqual(stats["evictions"], 2)
+
+    def test_memory_budget_and_concurrent_first_use(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ("a", "b"):
+                os.makedirs(os.path.join(tmp_dir, name))
+                with open(os.path.join(tmp_dir, name, "inference.pdiparams"), "wb") as f:
+                    f.write(b"\0" * 600 * 1024)
+
+            registry = EngineRegistry(self.factory, max_engines=4, max_memory_bytes=1024 * 1024)
+            threads = [
+                threading.Thread(target=registry.get, args=({"lang": "a", "rec_model_dir": os.path.join(tmp_dir, "a")},))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            registry.get({"lang": "b", "rec_model_dir": os.path.join(tmp_dir, "b")})
+
+            self.assertEqual(self.built, ["a", "b"])
+            self.assertEqual(registry.stats()["resident"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.ocr_client import OCRClient, OCRRemoteError
+from services.ocr_server import OCRServer
+from services.ocr_service import ocr_service
+
+
+class FakeOCRService:
+    is_ready = True
+
+    async def process_document(self, file_path, regions=None, page_selection=None, ocr_profile=None):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        return {
+            "text": "检测报告" * 20000,
+            "regions": regions,
+            "file_path": file_path,
+            "ocr_profile": ocr_profile,
+            "total_pages": 2,
+            "lines": [
+                {"text": "检测报告", "confidence": 0.9, "page": 1},
+                {"text": "样品名称", "confidence": 0.8, "page": 2},
+            ],
+            "pages": [
+                {"page": 1, "source": "ocr", "tier": "server", "confidence": 0.9, "elapsed_ms": 10},
+                {"page": 2, "source": "ocr", "tier": "server", "confidence": 0.8, "elapsed_ms": 12},
+            ],
+        }
+
+    async def decode_barcodes(self, file_path):
+        return [{"type": "qrcode", "format": "QR_CODE", "value": "SF1234567890", "page": 1}]
+
+    async def stats(self):
+        return {"mode": "thread"}
+
+
+class TestOCRServer(unittest.TestCase):
+    def test_round_trip_over_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = os.path.join(tmp_dir, "ocr.sock")
+            doc_path = os.path.join(tmp_dir, "doc.png")
+            open(doc_path, "wb").close()
+
+            async def run():
+                server = OCRServer(FakeOCRService(), socket_path)
+                await server.start()
+                client = OCRClient(socket_path, timeout=5)
+                try:
+                    ping = await client.ping()
+                    results = await asyncio.gather(*[
+                        client.call("process_document", file_path=doc_path, regions=[{"page": i}],
+                                    ocr_profile="accurate")
+                        for i in range(3)
+                    ])
+                    with self.assertRaises(OCRRemoteError) as missing:
+                        await client.call("process_document", file_path=os.path.join(tmp_dir, "x.png"))
+                    with self.assertRaises(OCRRemoteError):
+                        await client.call("unknown_op")
+                    return ping, results, missing.exception
+                finally:
+                    await server.stop()
+
+            ping, results, missing = asyncio.run(run())
+
+            self.assertEqual(ping["pid"], os.getpid())
+            self.assertEqual([r["regions"] for r in results], [[{"page": i}] for i in range(3)])
+            self.assertEqual(results[0]["ocr_profile"], "accurate")
+            self.assertEqual(len(results[0]["text"]), 80000)
+            self.assertEqual(missing.error_type, "FileNotFoundError")
+            self.assertFalse(os.path.exists(socket_path))
+
+    def test_stream_is_forwarded_in_remote_mode(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = os.path.join(tmp_dir, "ocr.sock")
+            doc_path = os.path.join(tmp_dir, "doc.png")
+            open(doc_path, "wb").close()
+
+            async def run():
+                server = OCRServer(FakeOCRService(), socket_path)
+                await server.start()
+                previous = ocr_service.remote
+                ocr_service.remote = OCRClient(socket_path, timeout=5)
+                try:
+                    pages = [page async for page in ocr_service.process_document_stream(doc_path)]
+                    return pages, await ocr_service.decode_barcodes(doc_path)
+                finally:
+                    ocr_service.remote = previous
+                    await server.stop()
+
+            pages, barcodes = asyncio.run(run())
+
+            self.assertEqual([page["page"] for page in pages], [1, 2])
+            self.assertEqual(pages[1]["text"], "样品名称")
+            self.assertEqual(pages[1]["total_pages"], 2)
+            self.assertEqual(pages[0]["tier"], "server")
+            self.assertEqual([item["value"] for item in barcodes], ["SF1234567890"])
+
+    def test_ping_returns_none_when_server_is_down(self):
+        client = OCRClient(os.path.join(tempfile.gettempdir(), "neoflow-missing.sock"))
+        self.assertIsNone(asyncio.run(client.ping()))
+
+
+if __name__ == "__main__":
+    unittest.main()
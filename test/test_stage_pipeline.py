@@ -0,0 +1,112 @@
+import os
+import sys
+import asyncio
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.stage_pipeline import PipelineStage, StagePipeline
+
+
+class TestStagePipeline(unittest.TestCase):
+    def test_stages_overlap_across_jobs(self):
+        async def run():
+            active = {"ocr": 0, "llm": 0}
+            overlap = []
+
+            def stage(name, delay):
+                async def handler(job):
+                    active[name] += 1
+                    overlap.append(active["ocr"] > 0 and active["llm"] > 0)
+                    await asyncio.sleep(delay)
+                    active[name] -= 1
+                    job.setdefault("trace", []).append(name)
+                return handler
+
+            pipeline = StagePipeline("test", [
+                PipelineStage("ocr", stage("ocr", 0.02), workers=1),
+                PipelineStage("llm", stage("llm", 0.02), workers=4),
+            ])
+            pipeline.start()
+            try:
+                jobs = await asyncio.gather(*(pipeline.submit({"id": i}) for i in range(5)))
+                stats = pipeline.stats()
+            finally:
+                await pipeline.stop()
+            return jobs, overlap, stats
+
+        jobs, overlap, stats = asyncio.run(run())
+        self.assertEqual([job["id"] for job in jobs], list(range(5)))
+        self.assertTrue(all(job["trace"] == ["ocr", "llm"] for job in jobs))
+        self.assertTrue(any(overlap))
+        self.assertEqual(stats["completed"], 5)
+        self.assertEqual(stats["stages"]["ocr"]["processed"], 5)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_failed_job_skips_to_run_on_error_stage(self):
+        async def run():
+            async def ocr(job):
+                if job["id"] == "bad":
+                    raise ValueError("OCR失败")
+
+            async def extract(job):
+                job["extracted"] = True
+
+            async def persist(job):
+                job["persisted"] = True
+
+            pipeline = StagePipeline("test", [
+                PipelineStage("ocr", ocr),
+                PipelineStage("extract", extract),
+                PipelineStage("persist", persist, run_on_error=True),
+            ])
+            pipeline.start()
+            try:
+                good = await pipeline.submit({"id": "good"})
+                bad = await pipeline.submit({"id": "bad"})
+                stats = pipeline.stats()
+            finally:
+                await pipeline.stop()
+            return good, bad, stats
+
+        good, bad, stats = asyncio.run(run())
+        self.assertTrue(good["extracted"] and good["persisted"])
+        self.assertEqual(bad["error"], "OCR失败")
+        self.assertNotIn("extracted", bad)
+        self.assertTrue(bad["persisted"])
+        self.assertEqual(stats["stages"]["ocr"]["failed"], 1)
+        self.assertEqual(stats["stages"]["extract"]["processed"], 1)
+
+    def test_cancelled_handler_fails_job_and_worker_continues(self):
+        async def run():
+            async def ocr(job):
+                if job["id"] == "cancelled":
+                    raise asyncio.CancelledError()
+                job["ocr"] = True
+
+            pipeline = StagePipeline("test", [PipelineStage("ocr", ocr, workers=1)])
+            pipeline.start()
+            try:
+                cancelled = await pipeline.submit({"id": "cancelled"})
+                good = await pipeline.submit({"id": "good"})
+                stats = pipeline.stats()
+            finally:
+                await pipeline.stop()
+            return cancelled, good, stats
+
+        cancelled, good, stats = asyncio.run(run())
+        self.assertEqual(cancelled["error"], "阶段任务被取消")
+        self.assertTrue(good["ocr"])
+        self.assertEqual(stats["stages"]["ocr"]["failed"], 1)
+        self.assertEqual(stats["completed"], 2)
+
+    def test_submit_requires_start(self):
+        pipeline = StagePipeline("test", [PipelineStage("only", lambda job: None)])
+        with self.assertRaises(RuntimeError):
+            asyncio.run(pipeline.submit({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from services.text_compactor import compact_ocr_text, normalize_line, page_lines
+
+
+class TestTextCompactor(unittest.TestCase):
+    def test_normalize_fullwidth_and_whitespace(self):
+        self.assertEqual(normalize_line("型号：ＡＢＣ－１２３　　（样品）"), "型号:ABC-123 (样品)")
+
+    def test_drops_repeated_headers_page_numbers_and_boilerplate(self):
+        pages = [
+            ["XX检测中心 检测报告", "样品名称: 灯具", "结论: 合格", "本报告仅对来样负责", "第 1 页 共 3 页"],
+            ["XX检测中心 检测报告", "光通量: 1200lm", "结论: 合格", "第 2 页 共 3 页"],
+            ["XX检测中心 检测报告", "色温: 4000K", "第 3 页 共 3 页"],
+        ]
+        text = "\n".join(line for page in pages for line in page)
+
+        compacted, stats = compact_ocr_text(text, pages, boilerplate=["^本报告仅对", "[invalid"], edge_lines=1)
+
+        self.assertEqual(compacted.splitlines(), [
+            "XX检测中心 检测报告", "样品名称: 灯具", "结论: 合格",
+            "光通量: 1200lm", "结论: 合格", "色温: 4000K",
+        ])
+        self.assertEqual(stats["repeated_lines"], 2)
+        self.assertEqual(stats["page_number_lines"], 3)
+        self.assertEqual(stats["boilerplate_lines"], 1)
+        self.assertGreater(stats["tokens_saved"], 0)
+
+    def test_keeps_ratio_and_date_values_on_page_edges(self):
+        pages = [["3/4", "配比: 1:2", "2024/5"], ["12 / 5", "数量", "1 / 2"]]
+        text = "\n".join(line for page in pages for line in page)
+
+        compacted, stats = compact_ocr_text(text, pages, edge_lines=1)
+
+        self.assertEqual(compacted.splitlines(), ["3/4", "配比: 1:2", "2024/5", "12 / 5", "数量"])
+        self.assertEqual(stats["page_number_lines"], 1)
+
+    def test_page_lines_groups_by_page(self):
+        result = {"lines": [{"text": "a", "page": 2}, {"text": "b", "page": 1}, {"text": "c", "page": 2}]}
+        self.assertEqual(page_lines(result), [["b"], ["a", "c"]])
+
+
+if __name__ == "__main__":
+    unittest.main()